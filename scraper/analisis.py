@@ -0,0 +1,357 @@
+# scraper/analisis.py
+"""
+Análisis fuera de línea de los eventos estructurados (eventos_*.jsonl, ver
+logger.evento).
+
+Lee uno o más archivos (o directorios, o .jsonl.gz) en una sola pasada,
+línea por línea, sin cargarlos en memoria: por cada corrida (ejecución +
+ciclo) solo guarda histogramas, conteos por ventana de tiempo, los N
+procesos más lentos y los errores agrupados por patrón. Sirve para logs de
+varios GB.
+
+Reporta por corrida:
+- procesos por minuto a lo largo del ciclo;
+- percentiles por etapa y del proceso completo;
+- los procesos más lentos, con su etapa más lenta, salida TOR y reintentos;
+- errores agrupados (números y valores variables reemplazados por #);
+- salidas TOR / circuitos ordenados por p95 de consulta.
+
+Uso:
+    python -m scraper.analisis /app/logs
+    python -m scraper.analisis /app/logs/eventos_20250101_010000.jsonl --top 20 --ventana 300
+    python -m scraper.analisis /app/logs --ciclo 20250101_010000 --json resumen.json
+
+No importa config ni logger: se puede correr en otra máquina sobre logs copiados.
+"""
+import argparse
+import glob
+import gzip
+import heapq
+import itertools
+import json
+import math
+import os
+import re
+import sys
+from collections import Counter, defaultdict
+from datetime import datetime
+
+# Filas máximas del gráfico de procesos por minuto (la ventana se agranda si hace falta)
+MAX_FILAS_RITMO = 48
+
+
+class Distribucion:
+    """
+    Histograma de buckets geométricos (razón 1.1 desde 1 ms): percentiles con
+    error menor al 10% usando memoria constante.
+    """
+
+    MINIMO = 0.001
+    RAZON = 1.1
+
+    def __init__(self):
+        self.conteos = Counter()
+        self.n = 0
+        self.suma = 0.0
+        self.maximo = 0.0
+
+    def agregar(self, valor):
+        indice = 0 if valor <= self.MINIMO else math.ceil(math.log(valor / self.MINIMO, self.RAZON))
+        self.conteos[indice] += 1
+        self.n += 1
+        self.suma += valor
+        self.maximo = max(self.maximo, valor)
+
+    def cuantil(self, q):
+        if not self.n:
+            return 0.0
+        objetivo = q * self.n
+        acumulado = 0
+        for indice in sorted(self.conteos):
+            acumulado += self.conteos[indice]
+            if acumulado >= objetivo:
+                return min(self.maximo, self.MINIMO * self.RAZON ** indice)
+        return self.maximo
+
+    def resumen(self):
+        return {
+            "n": self.n,
+            "media": round(self.suma / self.n, 3) if self.n else 0.0,
+            "p50": round(self.cuantil(0.5), 3),
+            "p95": round(self.cuantil(0.95), 3),
+            "p99": round(self.cuantil(0.99), 3),
+            "max": round(self.maximo, 3),
+        }
+
+
+_VARIABLES = [
+    (re.compile(r"https?://\S+"), "<url>"),
+    (re.compile(r"0x[0-9a-fA-F]+|\b[0-9a-f]{16,}\b"), "<hex>"),
+    (re.compile(r"\d+(\.\d+)?"), "#"),
+]
+
+
+def patron_error(mensaje):
+    """Mensaje de error sin las partes que cambian entre procesos."""
+    for regex, reemplazo in _VARIABLES:
+        mensaje = regex.sub(reemplazo, mensaje)
+    return mensaje.split("\n", 1)[0].strip()[:120]
+
+
+class Corrida:
+    """Acumulados de una ejecución + ciclo."""
+
+    def __init__(self, ejecucion, ciclo, top):
+        self.ejecucion = ejecucion
+        self.ciclo = ciclo
+        self.top = top
+        self.inicio = None
+        self.fin = None
+        self.total = None
+        self.resultados = Counter()
+        self.terminados = Counter()  # int(ts) -> procesos terminados en ese segundo
+        self.proceso = Distribucion()
+        self.etapas = defaultdict(Distribucion)
+        self.reintentos = Counter()
+        self.modales = 0
+        self.renovaciones = Counter()
+        self.errores = {}  # (tipo, patrón) -> [conteo, ejemplo]
+        self.salidas = defaultdict(lambda: {"n": 0, "fallos": 0, "segundos": Distribucion()})
+        self.lentos = []  # heap de (segundos, radicación, orden, detalle)
+        self._orden = itertools.count()  # desempata sin llegar a comparar los detalles (dicts)
+        self._abiertos = {}  # radicación -> etapas, salida y reintentos del proceso en curso
+
+    def _abierto(self, radicacion):
+        if radicacion not in self._abiertos:
+            self._abiertos[radicacion] = {"etapas": Counter(), "salida": None, "reintentos": 0}
+        return self._abiertos[radicacion]
+
+    def agregar(self, e):
+        ts = e.get("ts")
+        if ts is not None:
+            self.inicio = ts if self.inicio is None else min(self.inicio, ts)
+            self.fin = ts if self.fin is None else max(self.fin, ts)
+        tipo = e.get("evento")
+        radicacion = e.get("radicacion")
+
+        if tipo == "etapa":
+            self.etapas[e["etapa"]].agregar(e["segundos"])
+            if radicacion:
+                self._abierto(radicacion)["etapas"][e["etapa"]] += e["segundos"]
+        elif tipo == "consulta":
+            clave = e.get("salida") or f"control {e.get('control')}"
+            salida = self.salidas[clave]
+            salida["n"] += 1
+            if e.get("exito"):
+                salida["segundos"].agregar(e["segundos"])
+            else:
+                salida["fallos"] += 1
+            if radicacion:
+                self._abierto(radicacion)["salida"] = clave
+        elif tipo == "reintento":
+            self.reintentos[e.get("tipo")] += 1
+            if radicacion:
+                self._abierto(radicacion)["reintentos"] += 1
+        elif tipo == "modal":
+            self.modales += 1
+        elif tipo == "renovacion_tor":
+            self.renovaciones["agrupadas" if e.get("agrupada") else "enviadas"] += 1
+        elif tipo == "ciclo":
+            self.total = e.get("total")
+        elif tipo == "proceso":
+            self._proceso(e, radicacion, ts)
+
+    def _proceso(self, e, radicacion, ts):
+        resultado = e.get("resultado")
+        segundos = e.get("segundos") or 0.0
+        self.resultados[resultado] += 1
+        abierto = self._abiertos.pop(radicacion, None) or {"etapas": Counter(), "salida": None, "reintentos": 0}
+        if e.get("circuito"):
+            salida = self.salidas[e["circuito"]]
+            salida["n"] += 1
+            if resultado == "ok":
+                salida["segundos"].agregar(segundos)
+            else:
+                salida["fallos"] += 1
+        if resultado == "aplazado":
+            return
+        if ts is not None:
+            self.terminados[int(ts)] += 1
+        self.proceso.agregar(segundos)
+        if resultado == "error":
+            clave = (e.get("tipo"), patron_error(e.get("error") or ""))
+            if clave not in self.errores:
+                self.errores[clave] = [0, radicacion]
+            self.errores[clave][0] += 1
+        etapa_lenta = abierto["etapas"].most_common(1)
+        detalle = {
+            "radicacion": radicacion,
+            "segundos": segundos,
+            "resultado": resultado,
+            "etapa_lenta": etapa_lenta[0] if etapa_lenta else None,
+            "salida": abierto["salida"] or e.get("circuito"),
+            "reintentos": abierto["reintentos"],
+        }
+        entrada = (segundos, radicacion or "", next(self._orden), detalle)
+        if len(self.lentos) < self.top:
+            heapq.heappush(self.lentos, entrada)
+        elif entrada > self.lentos[0]:
+            heapq.heapreplace(self.lentos, entrada)
+
+    # ========== RESULTADOS ==========
+
+    def ritmo(self, ventana):
+        """[(inicio de la ventana, procesos por minuto)], agrandando la ventana si hay demasiadas filas."""
+        if not self.terminados:
+            return [], ventana
+        desde, hasta = min(self.terminados), max(self.terminados)
+        ventana = max(ventana, math.ceil((hasta - desde + 1) / MAX_FILAS_RITMO))
+        por_ventana = Counter()
+        for segundo, cantidad in self.terminados.items():
+            por_ventana[(segundo - desde) // ventana] += cantidad
+        filas = [(desde + i * ventana, por_ventana[i] * 60 / ventana)
+                 for i in range((hasta - desde) // ventana + 1)]
+        return filas, ventana
+
+    def resumen(self, ventana):
+        duracion = (self.fin - self.inicio) if self.inicio is not None else 0.0
+        terminados = sum(self.terminados.values())
+        ritmo, ventana = self.ritmo(ventana)
+        return {
+            "ejecucion": self.ejecucion,
+            "ciclo": self.ciclo,
+            "inicio": datetime.fromtimestamp(self.inicio).isoformat(timespec="seconds") if self.inicio else None,
+            "duracion_s": round(duracion, 1),
+            "total": self.total,
+            "resultados": dict(self.resultados),
+            "procesos_min": round(terminados / duracion * 60, 1) if duracion else 0.0,
+            "ventana_s": ventana,
+            "ritmo": [(datetime.fromtimestamp(t).strftime("%H:%M:%S"), round(v, 1)) for t, v in ritmo],
+            "proceso": self.proceso.resumen(),
+            "etapas": {nombre: d.resumen() for nombre, d in sorted(self.etapas.items())},
+            "reintentos": dict(self.reintentos),
+            "modales": self.modales,
+            "renovaciones_tor": dict(self.renovaciones),
+            "lentos": [d for *_, d in sorted(self.lentos, reverse=True)],
+            "errores": [{"tipo": t, "patron": p, "conteo": c, "ejemplo": ej}
+                        for (t, p), (c, ej) in sorted(self.errores.items(), key=lambda x: -x[1][0])],
+            "salidas": sorted(({"salida": nombre, "n": s["n"], "fallos": s["fallos"], **s["segundos"].resumen()}
+                               for nombre, s in self.salidas.items()),
+                              key=lambda s: -s["p95"]),
+        }
+
+
+# ========== LECTURA ==========
+
+def archivos(rutas):
+    """Expande directorios y patrones a archivos de eventos, en orden."""
+    for ruta in rutas:
+        if os.path.isdir(ruta):
+            yield from sorted(glob.glob(os.path.join(ruta, "eventos_*.jsonl*")))
+        elif any(c in ruta for c in "*?["):
+            yield from sorted(glob.glob(ruta))
+        else:
+            yield ruta
+
+
+def eventos(rutas):
+    """Eventos de todos los archivos, uno a la vez (las líneas dañadas se saltan)."""
+    for ruta in archivos(rutas):
+        abrir = gzip.open if ruta.endswith(".gz") else open
+        with abrir(ruta, "rt", encoding="utf-8", errors="replace") as f:
+            for linea in f:
+                try:
+                    yield json.loads(linea)
+                except ValueError:
+                    continue
+
+
+def analizar(rutas, top=10, filtro=None):
+    """{(ejecución, ciclo): Corrida} en una pasada sobre los eventos."""
+    corridas = {}
+    for e in eventos(rutas):
+        clave = (e.get("ejecucion"), e.get("ciclo"))
+        if filtro and filtro not in clave:
+            continue
+        if clave not in corridas:
+            corridas[clave] = Corrida(clave[0], clave[1], top)
+        corridas[clave].agregar(e)
+    return corridas
+
+
+# ========== SALIDA ==========
+
+def _tabla_distribuciones(filas):
+    print(f"  {'':<14} {'n':>7} {'media':>7} {'p50':>7} {'p95':>7} {'p99':>7} {'max':>7}")
+    for nombre, d in filas:
+        print(f"  {nombre:<14} {d['n']:>7} {d['media']:>6.2f}s {d['p50']:>6.2f}s {d['p95']:>6.2f}s "
+              f"{d['p99']:>6.2f}s {d['max']:>6.2f}s")
+
+
+def imprimir(r):
+    print(f"\n=== Ejecución {r['ejecucion']} · ciclo {r['ciclo'] or '-'} ({r['inicio']}) ===")
+    resultados = ", ".join(f"{v} {k}" for k, v in sorted(r["resultados"].items()))
+    print(f"Duración {r['duracion_s']:.0f}s · {sum(r['resultados'].values())} procesos ({resultados})"
+          f" de {r['total'] or '?'} · {r['procesos_min']} proc/min")
+    if r["ritmo"]:
+        print(f"\nProcesos por minuto (ventanas de {r['ventana_s']}s):")
+        maximo = max(v for _, v in r["ritmo"]) or 1
+        for hora, valor in r["ritmo"]:
+            print(f"  {hora}  {'█' * round(valor / maximo * 40):<40} {valor:.1f}")
+    print("\nDuraciones:")
+    _tabla_distribuciones([("proceso", r["proceso"])] + list(r["etapas"].items()))
+    if r["reintentos"] or r["modales"] or r["renovaciones_tor"]:
+        reintentos = ", ".join(f"{k}={v}" for k, v in sorted(r["reintentos"].items(), key=str))
+        renovaciones = ", ".join(f"{k}={v}" for k, v in sorted(r["renovaciones_tor"].items()))
+        print(f"\nReintentos: {reintentos or 0} · modales: {r['modales']} · renovaciones TOR: {renovaciones or 0}")
+    if r["lentos"]:
+        print("\nProcesos más lentos:")
+        for d in r["lentos"]:
+            etapa = f"{d['etapa_lenta'][0]} {d['etapa_lenta'][1]:.1f}s" if d["etapa_lenta"] else "-"
+            print(f"  {d['radicacion']:<24} {d['segundos']:>7.1f}s {d['resultado']:<6} etapa más lenta: {etapa:<18}"
+                  f" salida: {d['salida'] or '-':<20} reintentos: {d['reintentos']}")
+    if r["errores"]:
+        print("\nErrores agrupados:")
+        for e in r["errores"]:
+            print(f"  {e['conteo']:>6}  [{e['tipo']}] {e['patron']}  (ej. {e['ejemplo']})")
+    if r["salidas"]:
+        print("\nSalidas / circuitos (peor p95 primero):")
+        print(f"  {'salida':<24} {'n':>6} {'fallos':>6} {'p50':>7} {'p95':>7}")
+        for s in r["salidas"][:15]:
+            print(f"  {s['salida']:<24} {s['n']:>6} {s['fallos']:>6} {s['p50']:>6.2f}s {s['p95']:>6.2f}s")
+
+
+def comparar(resumenes):
+    print("\n=== Comparación de corridas ===")
+    print(f"  {'ejecución':<16} {'ciclo':<16} {'procesos':>8} {'errores':>7} {'proc/min':>8} {'p95':>7}")
+    for r in resumenes:
+        print(f"  {r['ejecucion'] or '-':<16} {r['ciclo'] or '-':<16} {sum(r['resultados'].values()):>8} "
+              f"{r['resultados'].get('error', 0):>7} {r['procesos_min']:>8} {r['proceso']['p95']:>6.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Análisis de eventos del scraper (eventos_*.jsonl)")
+    parser.add_argument("rutas", nargs="+", help="archivos, directorios o patrones de eventos")
+    parser.add_argument("--ciclo", help="solo la ejecución o el ciclo con este identificador")
+    parser.add_argument("--top", type=int, default=10, help="procesos más lentos a mostrar")
+    parser.add_argument("--ventana", type=int, default=60, help="segundos por fila del ritmo")
+    parser.add_argument("--json", help="guardar el resumen en este archivo JSON")
+    args = parser.parse_args()
+
+    corridas = analizar(args.rutas, args.top, args.ciclo)
+    if not corridas:
+        print("No se encontraron eventos", file=sys.stderr)
+        sys.exit(1)
+    resumenes = [c.resumen(args.ventana) for c in sorted(corridas.values(), key=lambda c: c.inicio or 0)]
+    for r in resumenes:
+        imprimir(r)
+    if len(resumenes) > 1:
+        comparar(resumenes)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resumenes, f, ensure_ascii=False, indent=2)
+        print(f"\nResumen guardado en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+# scraper/api_client.py
+"""
+Backend HTTP para Consulta de Procesos.
+
+La página de consulta es una SPA (Vue) que obtiene sus datos de un backend
+JSON. Este módulo llama esos endpoints directamente con un requests.Session
+(keep-alive) a través del proxy SOCKS de TOR, sin abrir Chrome.
+
+Devuelve las mismas tuplas (numero, fecha, actuacion, anotacion, url) que
+produce worker_task, de modo que generar_pdf y exportar_csv no cambian.
+"""
+import time
+from datetime import datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .config import (
+    API_BASE_URL, API_PROXY, API_TIMEOUT, CONSULTA_URL, SITE_URL, TOR_CONTROL_PORT
+)
+from .reintentos import FalloScraper
+from .metricas import METRICAS
+from .logger import log
+import scraper.worker as worker
+
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+
+
+class ApiError(Exception):
+    """Respuesta inesperada del backend (status HTTP o JSON inválido)."""
+
+
+def parse_fecha(valor):
+    """Convierte '2025-06-09T00:00:00' (o '2025-06-09') en date; None si no aplica."""
+    if not valor:
+        return None
+    try:
+        return datetime.strptime(str(valor)[:10], "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def filtrar_actuaciones(numero, actuaciones, cutoff, url=CONSULTA_URL):
+    """
+    Convierte la lista JSON de actuaciones en tuplas para el reporte,
+    conservando solo las que tienen fecha >= cutoff.
+    """
+    filas = []
+    for act in actuaciones:
+        fecha = parse_fecha(act.get("fechaActuacion"))
+        if fecha is None or fecha < cutoff:
+            continue
+        filas.append((
+            numero,
+            fecha.isoformat(),
+            (act.get("actuacion") or "").strip(),
+            (act.get("anotacion") or "").strip(),
+            url
+        ))
+    return filas
+
+
+def filtrar_nuevas(store, numero, filas):
+    """Con StateStore, deja solo las filas no vistas en escaneos anteriores (no registra nada)."""
+    if store is None or not filas:
+        return filas
+    claves = set(store.nuevas(numero, [(f, a, n) for _, f, a, n, _ in filas]))
+    return [fila for fila in filas if (fila[1], fila[2], fila[3]) in claves]
+
+
+def registrar_vistas(store, numero, fecha_ultima, filas):
+    """
+    Marca las filas como vistas en el StateStore. Va después de escribirlas
+    en el journal: si el proceso cae entre ambos pasos, el próximo ciclo las
+    vuelve a reportar en lugar de perderlas.
+    """
+    if store is not None and filas:
+        store.registrar(numero, fecha_ultima, [(f, a, n) for _, f, a, n, _ in filas])
+
+
+class ApiClient:
+    """
+    Cliente del backend JSON con un pool de conexiones reutilizables.
+
+    Expone quit() para poder usarse en lugar de un driver de Chrome dentro
+    del bucle de hilos de ejecutar_ciclo.
+    """
+
+    def __init__(self, base_url=API_BASE_URL, proxy=API_PROXY, timeout=API_TIMEOUT, pool_size=4,
+                 control_port=TOR_CONTROL_PORT, credencial=None):
+        """credencial: usuario/contraseña SOCKS; TOR le asigna circuitos propios."""
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.tor_control_port = control_port
+        self.credencial = credencial if proxy else None
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "User-Agent": USER_AGENT,
+            "Accept": "application/json, text/plain, */*",
+            "Accept-Language": "es-ES,es;q=0.9",
+            "Origin": SITE_URL,
+            "Referer": f"{SITE_URL}/",
+        })
+        if proxy:
+            if self.credencial:
+                p = urlparse(proxy)
+                proxy = p._replace(netloc=f"{self.credencial}:{self.credencial}@{p.netloc}").geturl()
+            self.session.proxies = {"http": proxy, "https": proxy}
+
+    def _get(self, path, params=None):
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        resp = self.session.get(url, params=params, timeout=self.timeout)
+        if resp.status_code == 404:
+            return None
+        if resp.status_code != 200:
+            raise ApiError(f"HTTP {resp.status_code} en {path}")
+        try:
+            return resp.json()
+        except ValueError as e:
+            raise ApiError(f"JSON inválido en {path}: {e}")
+
+    def consultar_proceso(self, numero):
+        """Lista de procesos (dicts) asociados a la radicación; vacía si no existe."""
+        data = self._get("Procesos/Consulta/NumeroRadicacion", {
+            "numero": numero,
+            "SoloActivos": "false",
+            "pagina": 1,
+        })
+        if not data:
+            return []
+        return data.get("procesos") or []
+
+    def obtener_actuaciones(self, id_proceso, cutoff=None):
+        """
+        Descarga las actuaciones del proceso, página por página.
+        El backend las entrega de la más reciente a la más antigua, así que
+        se deja de paginar en cuanto una página llega a fechas < cutoff.
+        """
+        actuaciones = []
+        pagina = 1
+        while True:
+            data = self._get(f"Proceso/Actuaciones/{id_proceso}", {"pagina": pagina})
+            if not data:
+                break
+            lote = data.get("actuaciones") or []
+            actuaciones.extend(lote)
+            paginacion = data.get("paginacion") or {}
+            total_paginas = paginacion.get("cantidadPaginas") or 1
+            if pagina >= total_paginas or not lote:
+                break
+            if cutoff is not None:
+                ultima = parse_fecha(lote[-1].get("fechaActuacion"))
+                if ultima is not None and ultima < cutoff:
+                    break
+            pagina += 1
+        return actuaciones
+
+    def consultar_actuaciones(self, numero, cutoff, store=None):
+        """
+        Flujo completo para una radicación.
+        Retorna (estado, filas, fecha_ultima) con estado 'success' o
+        'no_results'. fecha_ultima acompaña a las filas del detalle para
+        registrarlas luego con registrar_vistas (None si no hay filas).
+        store: StateStore opcional; omite procesos sin cambios. Las filas
+        ya vistas no se filtran aquí (ver filtrar_nuevas).
+        """
+        procesos = self.consultar_proceso(numero)
+        if not procesos:
+            return 'no_results', [], None
+
+        proceso = procesos[0]
+        fecha_ultima = parse_fecha(proceso.get("fechaUltimaActuacion"))
+        log.proceso(f"Fecha: {fecha_ultima}")
+        if fecha_ultima is None or fecha_ultima < cutoff:
+            log.proceso("⏭️ Fuera de período")
+            if store is not None:
+                store.marcar_escaneado(numero, fecha_ultima)
+            return 'success', [], None
+        if store is not None and store.sin_cambios(numero, fecha_ultima):
+            log.proceso("⏭️ Sin cambios desde el último escaneo")
+            store.marcar_escaneado(numero, fecha_ultima)
+            return 'success', [], None
+
+        log.exito("✓ DENTRO del período")
+        actuaciones = self.obtener_actuaciones(proceso.get("idProceso"), cutoff)
+        log.debug("Encontradas %d actuaciones", len(actuaciones))
+        filas = filtrar_actuaciones(numero, actuaciones, cutoff)
+        return 'success', filas, (fecha_ultima if filas else None)
+
+    def quit(self):
+        self.session.close()
+
+
+def api_worker_task(numero, client, results, actes, errors, lock):
+    """
+    Equivalente HTTP de worker_task: misma firma y mismas listas de salida.
+    Como worker_task, retorna la fecha con la que registrar las filas en el
+    StateStore (None si no hay nada que registrar).
+    """
+    idx = next(worker.process_counter)
+    total = worker.TOTAL_PROCESSES or idx
+
+    log.separador()
+    log.progreso(f"[{idx}/{total}] {numero}")
+    log.separador()
+
+    cutoff = worker.cutoff_de(numero)
+    log.debug("Fecha corte: %s", cutoff)
+
+    try:
+        t0 = time.time()
+        estado, filas, pendiente = client.consultar_actuaciones(numero, cutoff, worker.STATE_STORE)
+        segundos = time.time() - t0
+        METRICAS.observar("etapa_segundos", segundos, etapa="api")
+        log.evento("etapa", radicacion=numero, etapa="api", segundos=round(segundos, 3))
+        log.debug("Consulta API en %.2fs", segundos)
+    except (requests.RequestException, ApiError) as e:
+        raise FalloScraper("red", str(e)[:200]) from e
+
+    if estado == 'no_results':
+        log.proceso("No hay resultados para este proceso")
+    elif filas:
+        with lock:
+            actes.extend(filas)
+        for fila in filas:
+            log.debug("✅ %s: %s...", fila[1], fila[2][:50])
+
+    with lock:
+        results.append((numero, CONSULTA_URL))
+    log.exito("Proceso completado")
+    return pendiente
@@ -0,0 +1,139 @@
+# scraper/arranque_tor.py
+"""
+Espera a que una instancia TOR esté lista, guiada por su puerto de control.
+
+En vez de pausas fijas y de consultar un servicio de eco de IP:
+
+- se conecta al ControlPort en cuanto TOR lo abre;
+- se suscribe a los eventos STATUS_CLIENT: BOOTSTRAP informa el progreso
+  y CIRCUIT_ESTABLISHED indica que ya hay un circuito utilizable (si TOR
+  ya estaba listo, lo dice status/circuit-established);
+- opcionalmente (TOR_SONDA) hace una sola petición HEAD al sitio objetivo
+  por el SocksPort para confirmar que la salida llega hasta él.
+"""
+import re
+import threading
+import time
+
+import requests
+from stem import Signal
+from stem.control import Controller, EventType
+
+from .config import TOR_SOCKS_PORT, TOR_CONTROL_PORT, TOR_ESPERA_TIMEOUT, TOR_SONDA, SITE_URL
+from .logger import log
+
+# Ritmo con el que se reintenta abrir el ControlPort mientras TOR arranca
+PAUSA_CONEXION = 0.5
+# Cada cuánto se revisa, sin eventos, que la conexión de control siga viva
+REVISION = 5
+
+
+def _fase(controller):
+    """(progreso, resumen) de status/bootstrap-phase."""
+    texto = controller.get_info("status/bootstrap-phase", "")
+    progreso = re.search(r"PROGRESS=(\d+)", texto)
+    resumen = re.search(r'SUMMARY="([^"]*)"', texto)
+    return (int(progreso.group(1)) if progreso else 0), (resumen.group(1) if resumen else "")
+
+
+def _conectar(control_port, limite):
+    """Controller autenticado; reintenta mientras el puerto no esté abierto. None al vencer el plazo."""
+    error = None
+    while time.monotonic() < limite:
+        try:
+            controller = Controller.from_port(port=control_port)
+        except Exception as e:
+            error = e
+            time.sleep(PAUSA_CONEXION)
+            continue
+        try:
+            controller.authenticate()
+            return controller
+        except Exception as e:
+            controller.close()
+            error = e
+            time.sleep(PAUSA_CONEXION)
+    log.debug("Control %s no disponible: %s", control_port, error)
+    return None
+
+
+def sondear(socks_port=TOR_SOCKS_PORT, url=SITE_URL, timeout=30):
+    """
+    Una petición HEAD al sitio por TOR. Cualquier respuesta HTTP cuenta:
+    solo importa que la salida llegue. Retorna los segundos o None.
+    """
+    proxy = f"socks5h://127.0.0.1:{socks_port}"
+    t0 = time.monotonic()
+    try:
+        requests.head(url, proxies={"http": proxy, "https": proxy}, timeout=timeout, allow_redirects=False)
+    except requests.RequestException as e:
+        log.debug("Sonda por socks %s falló: %s", socks_port, e)
+        return None
+    return time.monotonic() - t0
+
+
+def esperar_tor(control_port=TOR_CONTROL_PORT, socks_port=TOR_SOCKS_PORT, timeout=TOR_ESPERA_TIMEOUT,
+                sonda=TOR_SONDA, nombre="TOR"):
+    """
+    Bloquea hasta que la instancia tenga circuito (y, con sonda, llegue al
+    sitio). Retorna True si lo logró antes del timeout.
+    """
+    inicio = time.monotonic()
+    limite = inicio + timeout
+    controller = _conectar(control_port, limite)
+    if controller is None:
+        log.error(f"❌ {nombre}: puerto de control {control_port} sin respuesta después de {timeout} segundos")
+        return False
+
+    listo = threading.Event()
+    ultimo = [-1]
+
+    def al_estado(evento):
+        if evento.action == "BOOTSTRAP":
+            progreso = int(evento.arguments.get("PROGRESS", 0))
+            if progreso > ultimo[0]:
+                ultimo[0] = progreso
+                log.tor("%s: arranque %d%% (%s)", nombre, progreso, evento.arguments.get('SUMMARY', ''))
+        elif evento.action == "CIRCUIT_ESTABLISHED":
+            listo.set()
+
+    try:
+        controller.add_event_listener(al_estado, EventType.STATUS_CLIENT)
+        # Se consulta después de suscribirse: si ya estaba listo, el evento no volverá a llegar
+        if controller.get_info("status/circuit-established", "0") == "1":
+            listo.set()
+        else:
+            progreso, resumen = _fase(controller)
+            ultimo[0] = progreso
+            log.info(f"Conectando {nombre} a la red ({progreso}%: {resumen})...")
+        while not listo.is_set():
+            restante = limite - time.monotonic()
+            if restante <= 0 or not controller.is_alive():
+                break
+            listo.wait(min(REVISION, restante))
+        if not listo.is_set():
+            motivo = "se cerró el puerto de control" if not controller.is_alive() else \
+                f"sin circuito después de {timeout} segundos ({ultimo[0]}%)"
+            log.error(f"❌ {nombre}: {motivo}")
+            return False
+
+        circuito = time.monotonic() - inicio
+        latencia = None
+        if sonda:
+            latencia = sondear(socks_port, timeout=max(5, min(30, limite - time.monotonic())))
+            if latencia is None:
+                # Una salida que no llega al sitio: se pide otra y se prueba una vez más
+                try:
+                    controller.signal(Signal.NEWNYM)
+                except Exception as e:
+                    log.debug("%s: NEWNYM falló (%s)", nombre, e)
+                latencia = sondear(socks_port, timeout=max(5, min(30, limite - time.monotonic())))
+            if latencia is None:
+                log.advertencia(f"{nombre}: circuito listo pero la sonda a {SITE_URL} falló")
+        log.exito(f"{nombre} listo en {circuito:.1f}s"
+                  + (f" (sitio a {latencia:.1f}s)" if latencia is not None else ""))
+        log.evento("tor_listo", control=control_port, segundos=round(circuito, 3),
+                   sonda=round(latencia, 3) if latencia is not None else None)
+        return True
+    finally:
+        controller.close()
@@ -0,0 +1,281 @@
+# scraper/async_engine.py
+"""
+Motor de ciclo basado en asyncio.
+
+En lugar de un hilo y un Chrome por worker, mantiene cientos de consultas
+en vuelo contra el backend JSON (ver api_client.py) a través del SOCKS de
+TOR. La concurrencia se limita con semáforos:
+
+- global (ASYNC_CONCURRENCIA): consultas simultáneas en total.
+- por circuito (ASYNC_POR_CIRCUITO): cada circuito usa credenciales SOCKS
+  distintas; TOR aísla por credencial (IsolateSOCKSAuth), así que cada una
+  sale por su propio circuito.
+- por host (ASYNC_POR_HOST): peticiones simultáneas a un mismo servidor.
+
+Produce las mismas listas (results, actes, errors) que el motor de hilos.
+"""
+import asyncio
+import itertools
+import random
+import time
+from datetime import date, timedelta
+from urllib.parse import urlparse
+
+import aiohttp
+from aiohttp_socks import ProxyConnector, ProxyType
+
+from .config import (
+    API_BASE_URL, API_PROXY, API_TIMEOUT, CONSULTA_URL, SITE_URL, DIAS_BUSQUEDA,
+    ASYNC_CONCURRENCIA, ASYNC_CIRCUITOS, ASYNC_POR_CIRCUITO, ASYNC_POR_HOST,
+    REINTENTOS_PAUSA_DIFERIDOS
+)
+from .api_client import (ApiError, USER_AGENT, parse_fecha, filtrar_actuaciones, filtrar_nuevas,
+                         registrar_vistas)
+from .logger import log
+from .reintentos import FalloScraper, POLITICAS, Presupuesto, clasificar, espera
+from .metricas import METRICAS
+import scraper.worker as worker
+
+
+def _crear_connector(proxy, credencial, limite):
+    """Connector aiohttp; con proxy SOCKS usa una credencial propia por circuito."""
+    if not proxy:
+        return aiohttp.TCPConnector(limit=limite)
+    p = urlparse(proxy)
+    tipo = ProxyType.HTTP if p.scheme.startswith("http") else ProxyType.SOCKS5
+    return ProxyConnector(
+        proxy_type=tipo,
+        host=p.hostname,
+        port=p.port,
+        username=credencial,
+        password=credencial,
+        rdns=True,
+        limit=limite,
+    )
+
+
+class Circuito:
+    """Sesión HTTP asociada a un circuito TOR y su semáforo."""
+
+    def __init__(self, indice, proxy, limite):
+        self.nombre = f"circ-{indice}"
+        self.semaforo = asyncio.Semaphore(limite)
+        self.session = aiohttp.ClientSession(
+            connector=_crear_connector(proxy, f"scraper-{indice}-{random.randint(0, 1 << 30)}", limite),
+            timeout=aiohttp.ClientTimeout(total=API_TIMEOUT),
+            headers={
+                "User-Agent": USER_AGENT,
+                "Accept": "application/json, text/plain, */*",
+                "Accept-Language": "es-ES,es;q=0.9",
+                "Origin": SITE_URL,
+                "Referer": f"{SITE_URL}/",
+            },
+        )
+
+    async def close(self):
+        await self.session.close()
+
+
+class AsyncApiClient:
+    """Cliente asíncrono del backend JSON repartido entre varios circuitos."""
+
+    def __init__(self, base_url=API_BASE_URL, proxies=None, circuitos=ASYNC_CIRCUITOS,
+                 por_circuito=ASYNC_POR_CIRCUITO, por_host=ASYNC_POR_HOST):
+        """proxies: lista de proxies (p. ej. uno por instancia de la flota TOR);
+        los circuitos se reparten entre ellos."""
+        self.base_url = base_url.rstrip("/")
+        proxies = proxies or [API_PROXY]
+        self.circuitos = [Circuito(i, proxies[i % len(proxies)], por_circuito)
+                          for i in range(max(1, circuitos))]
+        self._turno = itertools.cycle(range(len(self.circuitos)))
+        self._por_host = por_host
+        self._semaforos_host = {}
+
+    def siguiente_circuito(self):
+        return self.circuitos[next(self._turno)]
+
+    def _semaforo_host(self, url):
+        host = urlparse(url).netloc
+        if host not in self._semaforos_host:
+            self._semaforos_host[host] = asyncio.Semaphore(self._por_host)
+        return self._semaforos_host[host]
+
+    async def _get(self, circuito, path, params=None):
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        async with circuito.semaforo, self._semaforo_host(url):
+            async with circuito.session.get(url, params=params) as resp:
+                if resp.status == 404:
+                    return None
+                if resp.status != 200:
+                    raise ApiError(f"HTTP {resp.status} en {path}")
+                try:
+                    return await resp.json(content_type=None)
+                except ValueError as e:
+                    raise ApiError(f"JSON inválido en {path}: {e}")
+
+    async def consultar_actuaciones(self, circuito, numero, cutoff, store=None):
+        """Misma lógica que ApiClient.consultar_actuaciones, sobre un circuito."""
+        data = await self._get(circuito, "Procesos/Consulta/NumeroRadicacion", {
+            "numero": numero,
+            "SoloActivos": "false",
+            "pagina": 1,
+        })
+        procesos = (data or {}).get("procesos") or []
+        if not procesos:
+            return 'no_results', [], None
+
+        proceso = procesos[0]
+        fecha_ultima = parse_fecha(proceso.get("fechaUltimaActuacion"))
+        if fecha_ultima is None or fecha_ultima < cutoff:
+            if store is not None:
+                await asyncio.to_thread(store.marcar_escaneado, numero, fecha_ultima)
+            return 'success', [], None
+        # SQLite bloquea: las consultas al StateStore van en un hilo, fuera del event loop
+        if store is not None and await asyncio.to_thread(store.sin_cambios, numero, fecha_ultima):
+            await asyncio.to_thread(store.marcar_escaneado, numero, fecha_ultima)
+            return 'success', [], None
+
+        actuaciones = []
+        pagina = 1
+        while True:
+            data = await self._get(circuito, f"Proceso/Actuaciones/{proceso.get('idProceso')}",
+                                   {"pagina": pagina})
+            if not data:
+                break
+            lote = data.get("actuaciones") or []
+            actuaciones.extend(lote)
+            total_paginas = (data.get("paginacion") or {}).get("cantidadPaginas") or 1
+            ultima = parse_fecha(lote[-1].get("fechaActuacion")) if lote else None
+            if pagina >= total_paginas or not lote or (ultima is not None and ultima < cutoff):
+                break
+            pagina += 1
+        filas = filtrar_actuaciones(numero, actuaciones, cutoff)
+        return 'success', filas, (fecha_ultima if filas else None)
+
+    async def close(self):
+        await asyncio.gather(*(c.close() for c in self.circuitos))
+
+
+def _guardar(numero, filas, pendiente, store, journal, actes):
+    """
+    Persiste una radicación terminada: journal primero y recién después el
+    StateStore, así una caída entre ambos no deja filas vistas sin reportar.
+    Retorna las filas nuevas. Todo es bloqueante (SQLite, fsync del journal,
+    cola acotada de Salidas): se corre con asyncio.to_thread.
+    """
+    vistas = filas
+    if pendiente is not None:
+        filas = filtrar_nuevas(store, numero, vistas)
+    if journal is not None:
+        journal.registrar(numero, filas)
+    if pendiente is not None:
+        registrar_vistas(store, numero, pendiente, vistas)
+    actes.extend(filas)
+    return filas
+
+
+async def _procesar(client, numero, cutoff, store, journal, limite, presupuesto, aplazados,
+                    results, actes, errors):
+    """
+    Consulta una radicación con la política de reintentos de reintentos.py.
+    Si la agota y se pasa `aplazados`, queda para la pasada diferida.
+    `limite` solo se ocupa durante cada intento: el backoff no gasta cupo.
+    """
+    inicio = time.time()
+    try:
+        # Cada tarea de asyncio tiene su propia copia del contexto de logging
+        with log.contexto(radicacion=numero):
+            idx = next(worker.process_counter)
+            total = worker.TOTAL_PROCESSES or idx
+            circuito = client.siguiente_circuito()
+            intento = 0
+            while True:
+                async with limite:
+                    t0 = time.time()
+                    try:
+                        estado, filas, pendiente = await client.consultar_actuaciones(circuito, numero, cutoff,
+                                                                                       store)
+                        filas = await asyncio.to_thread(_guardar, numero, filas, pendiente, store, journal, actes)
+                        log.progreso(f"[{idx}/{total}] {numero} → {estado}, "
+                                     f"{len(filas)} actuaciones ({time.time() - t0:.2f}s, {circuito.nombre})")
+                        log.evento("etapa", etapa="api", segundos=round(time.time() - t0, 3),
+                                   circuito=circuito.nombre)
+                        log.evento("proceso", resultado="ok", segundos=round(time.time() - inicio, 3),
+                                   actuaciones=len(filas), circuito=circuito.nombre)
+                        results.append((numero, CONSULTA_URL))
+                        return
+                    except (aiohttp.ClientError, asyncio.TimeoutError, ApiError) as e:
+                        fallo = FalloScraper("red", str(e)[:200] or type(e).__name__)
+                    except Exception as e:
+                        # Respuesta inesperada, error del StateStore, etc.: como en el motor de hilos
+                        fallo = clasificar(e)
+                politica = POLITICAS[fallo.tipo]
+                intento += 1
+                if intento >= politica.intentos or not presupuesto.consumir():
+                    if aplazados is not None:
+                        log.evento("proceso", resultado="aplazado", segundos=round(time.time() - inicio, 3),
+                                   tipo=fallo.tipo, error=str(fallo)[:200], circuito=circuito.nombre)
+                        aplazados.append(numero)
+                        return
+                    log.advertencia(f"{numero}: {fallo.tipo} tras {intento} intento(s): {fallo}")
+                    error = f"[{fallo.tipo}] {fallo}"[:200]
+                    log.evento("proceso", resultado="error", segundos=round(time.time() - inicio, 3),
+                               tipo=fallo.tipo, error=str(fallo)[:200], circuito=circuito.nombre)
+                    if journal is not None:
+                        await asyncio.to_thread(journal.registrar, numero, [], error)
+                    errors.append((numero, error))
+                    return
+                log.advertencia(f"{numero}: intento {intento}/{politica.intentos} fallido "
+                                f"en {circuito.nombre}: {fallo}")
+                log.evento("reintento", tipo=fallo.tipo, intento=intento, error=str(fallo)[:200],
+                           circuito=circuito.nombre)
+                # Otro circuito y backoff con jitter antes de reintentar (ya sin cupo tomado)
+                circuito = client.siguiente_circuito()
+                await asyncio.sleep(espera(intento, politica))
+    finally:
+        METRICAS.observar("proceso_segundos", time.time() - inicio)
+
+
+async def _ejecutar(procesos, cutoff, cutoffs, store, journal, proxies, salidas=None):
+    results, errors = [], []
+    actes = salidas if salidas is not None else []
+    client = AsyncApiClient(proxies=proxies)
+    limite = asyncio.Semaphore(ASYNC_CONCURRENCIA)
+
+    async def pasada(numeros, aplazados):
+        presupuesto = Presupuesto(len(numeros))
+        await asyncio.gather(*(
+            _procesar(client, numero, cutoffs.get(numero, cutoff), store, journal, limite,
+                      presupuesto, aplazados, results, actes, errors)
+            for numero in numeros
+        ))
+
+    try:
+        aplazados = []
+        await pasada(procesos, aplazados)
+        if aplazados:
+            # Cola diferida: una vez más, tras la pasada principal
+            log.advertencia(f"Reintentando {len(aplazados)} procesos aplazados "
+                            f"en {REINTENTOS_PAUSA_DIFERIDOS}s")
+            await asyncio.sleep(REINTENTOS_PAUSA_DIFERIDOS)
+            await pasada(aplazados, None)
+    finally:
+        await client.close()
+    return results, actes, errors
+
+
+def ejecutar_async(procesos, proxies=None, cutoff=None, store=None, journal=None, cutoffs=None,
+                   salidas=None):
+    """
+    Escanea todos los procesos con el motor asíncrono.
+    proxies: proxies SOCKS a usar; por defecto API_PROXY.
+    cutoff/store: fecha de corte del ciclo y StateStore (escaneo incremental).
+    journal: Journal donde se registra cada radicación terminada.
+    cutoffs: fecha de corte propia por radicación (ver prioridad.py).
+    salidas: Salidas donde se escriben las actuaciones (en lugar de acumularlas).
+    Retorna (results, actes, errors) con el mismo formato que el motor de hilos.
+    """
+    cutoff = cutoff or date.today() - timedelta(days=DIAS_BUSQUEDA)
+    log.progreso(f"Motor asíncrono: {ASYNC_CONCURRENCIA} consultas en vuelo, "
+                 f"{ASYNC_CIRCUITOS} circuitos")
+    return asyncio.run(_ejecutar(procesos, cutoff, cutoffs or {}, store, journal, proxies, salidas))
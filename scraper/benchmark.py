@@ -0,0 +1,290 @@
+# scraper/benchmark.py
+"""
+Benchmark de rendimiento contra el sitio simulado (mock_sitio.py).
+
+Levanta el sitio local, apunta el scraper a él (SITE_URL, API_BASE_URL,
+sin proxy) y corre el mismo escaneo que ejecutar_ciclo (main._escanear)
+con distintos números de workers. Por cada corrida reporta procesos/min,
+p50/p95 de la duración por proceso (con reintentos), errores y la memoria
+máxima del árbol de procesos (Python + chromedriver + Chrome).
+
+Los resultados se guardan en BENCHMARK_DIR con la versión del código
+(git describe) para comparar entre versiones con --comparar.
+
+Uso:
+    python -m scraper.benchmark --workers 1,2,4 --procesos 40 --backend api
+    python -m scraper.benchmark --workers 2 --backend selenium --latencia 1 --errores 0.05
+    python -m scraper.benchmark --comparar output/benchmarks/<anterior>.json
+
+Con --reporte N mide en cambio generar_pdf con N actuaciones sintéticas
+(secuencial y con REPORTE_PARALELO procesos), sin sitio simulado:
+    python -m scraper.benchmark --reporte 100000 --paralelo 1,4
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import subprocess
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from .mock_sitio import argumentos_mock, mock_desde_args
+
+BENCHMARK_DIR = os.path.join(".", "output", "benchmarks")
+
+
+def _percentil(valores, q):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    posicion = q * (len(ordenados) - 1)
+    bajo = int(posicion)
+    alto = min(bajo + 1, len(ordenados) - 1)
+    return ordenados[bajo] + (ordenados[alto] - ordenados[bajo]) * (posicion - bajo)
+
+
+def _version():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+                              timeout=10, cwd=os.path.dirname(os.path.abspath(__file__))
+                              ).stdout.strip() or "desconocida"
+    except (OSError, subprocess.SubprocessError):
+        return "desconocida"
+
+
+def radicaciones(cantidad, semilla=0):
+    """Números de radicación de 23 dígitos, reproducibles."""
+    rng = random.Random(semilla)
+    return [f"11001{rng.randint(0, 10 ** 18 - 1):018d}" for _ in range(cantidad)]
+
+
+class MonitorMemoria:
+    """Muestrea en un hilo la memoria del árbol de procesos y guarda el máximo."""
+
+    def __init__(self, intervalo=0.5):
+        self.intervalo = intervalo
+        self.maximo_mb = 0
+        self._parar = threading.Event()
+        self._hilo = None
+
+    def __enter__(self):
+        from .driver_pool import _rss_arbol_mb
+
+        def muestrear():
+            while True:
+                self.maximo_mb = max(self.maximo_mb, _rss_arbol_mb(os.getpid()))
+                if self._parar.wait(self.intervalo):
+                    return
+        self._hilo = threading.Thread(target=muestrear, name="benchmark-memoria", daemon=True)
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._parar.set()
+        self._hilo.join()
+
+
+def configurar_entorno(sitio, args):
+    """
+    Apunta la configuración del scraper al sitio simulado. Debe llamarse
+    antes de importar cualquier módulo que lea config.py.
+    """
+    os.environ["SITE_URL"] = sitio.url
+    os.environ["API_BASE_URL"] = f"{sitio.url}/api/v2"
+    os.environ["API_PROXY"] = ""
+    os.environ["BACKEND"] = args.backend
+    os.environ["ENGINE"] = args.engine
+    os.environ["COORDINACION"] = ""
+    os.environ["ESCANEO_INCREMENTAL"] = "0"
+    os.environ["METRICAS_PUERTO"] = "0"
+    os.environ.setdefault("REINTENTOS_PAUSA_DIFERIDOS", "0")
+
+
+def corrida(workers, procesos, args):
+    """Un escaneo completo con `workers` hilos (o consultas en vuelo con ENGINE=async)."""
+    from . import main, worker, async_engine, trafico
+    from .driver_pool import DriverPool
+    from .metricas import METRICAS
+    from .logger import log
+
+    main.NUM_THREADS = workers
+    async_engine.ASYNC_CONCURRENCIA = workers
+    cutoff = date.today() - timedelta(days=args.dias)
+    worker.TOTAL_PROCESSES = len(procesos)
+    worker.process_counter = itertools.count(1)
+    worker.CUTOFF = cutoff
+    worker.CUTOFFS = {}
+    worker.STATE_STORE = None
+    trafico.TOTAL.reiniciar()
+    METRICAS.reiniciar()
+    METRICAS.capturar("proceso_segundos")
+    # Cada corrida queda como un ciclo propio en los eventos (python -m scraper.analisis)
+    log.iniciar_ciclo(time.time())
+
+    pool = None
+    arranque = 0.0
+    with MonitorMemoria() as memoria:
+        if args.backend == "selenium" and args.engine != "async":
+            t0 = time.time()
+            pool = DriverPool(size=workers)
+            pool.iniciar()
+            arranque = time.time() - t0
+        try:
+            t0 = time.time()
+            _, actes, errors = main._escanear(list(procesos), pool, None, None, cutoff, None, {})
+            duracion = time.time() - t0
+        finally:
+            if pool is not None:
+                pool.cerrar()
+
+    tiempos = METRICAS.muestras("proceso_segundos")
+    resumen = METRICAS.resumen()
+    return {
+        "workers": workers,
+        "procesos": len(procesos),
+        "duracion_s": round(duracion, 2),
+        "arranque_s": round(arranque, 2),
+        "procesos_min": round(len(procesos) / duracion * 60, 1) if duracion else 0.0,
+        "p50_s": round(_percentil(tiempos, 0.5), 3),
+        "p95_s": round(_percentil(tiempos, 0.95), 3),
+        "errores": len(errors),
+        "actuaciones": len(actes),
+        "memoria_max_mb": memoria.maximo_mb,
+        "etapas": {k: v for k, v in resumen["histogramas"].items() if k.startswith("etapa_segundos")},
+        "contadores": resumen["contadores"],
+    }
+
+
+def actuaciones_sinteticas(cantidad, semilla=0):
+    """(numero, fecha, actuacion, anotacion, url) repartidas entre procesos de 1 a 300 actuaciones."""
+    from .mock_sitio import ACTUACIONES_BASE
+    rng = random.Random(semilla)
+    hoy = date.today()
+    actes = []
+    while len(actes) < cantidad:
+        numero = f"11001{rng.randint(0, 10 ** 18 - 1):018d}"
+        for _ in range(min(rng.randint(1, 300), cantidad - len(actes))):
+            actuacion, anotacion = rng.choice(ACTUACIONES_BASE)
+            anotacion = (anotacion + " ") * rng.randint(0, 6)
+            fecha = (hoy - timedelta(days=rng.randint(0, 30))).isoformat()
+            actes.append((numero, fecha, actuacion, anotacion.strip(), "http://127.0.0.1/"))
+    return actes
+
+
+def corrida_reporte(actes, paralelo, directorio):
+    """Un generar_pdf completo; mide tiempo, memoria máxima (con los hijos) y tamaño."""
+    from .reporter import generar_pdf
+
+    ruta = os.path.join(directorio, f"reporte_p{paralelo}.pdf")
+    errors = [(f"1100199{i:016d}", "[timeout] Timeout esperando resultados") for i in range(len(actes) // 1000)]
+    with MonitorMemoria() as memoria:
+        t0 = time.time()
+        generar_pdf(len(actes) // 50, actes, errors, t0 - 3600, t0, ruta=ruta, paralelo=paralelo)
+        duracion = time.time() - t0
+    return {
+        "paralelo": paralelo,
+        "actuaciones": len(actes),
+        "duracion_s": round(duracion, 2),
+        "actuaciones_s": round(len(actes) / duracion, 1) if duracion else 0.0,
+        "memoria_max_mb": memoria.maximo_mb,
+        "pdf_mb": round(os.path.getsize(ruta) / 2 ** 20, 1),
+    }
+
+
+def imprimir(resultados, anterior=None):
+    previas = {r["workers"]: r for r in (anterior or {}).get("corridas", [])}
+    print(f"{'workers':>7} {'proc/min':>9} {'p50':>7} {'p95':>7} {'errores':>7} {'mem MB':>7} {'arranque':>8}")
+    for r in resultados:
+        linea = (f"{r['workers']:>7} {r['procesos_min']:>9.1f} {r['p50_s']:>6.2f}s {r['p95_s']:>6.2f}s "
+                 f"{r['errores']:>7} {r['memoria_max_mb']:>7} {r['arranque_s']:>7.1f}s")
+        previa = previas.get(r["workers"])
+        if previa and previa["procesos_min"]:
+            cambio = (r["procesos_min"] / previa["procesos_min"] - 1) * 100
+            linea += f"   {cambio:+.1f}% vs {anterior['version']}"
+        print(linea)
+
+
+def guardar(datos, directorio=BENCHMARK_DIR):
+    os.makedirs(directorio, exist_ok=True)
+    ruta = os.path.join(directorio, f"bench_{datos['fecha'].replace(':', '').replace('-', '')}"
+                                     f"_{datos['backend']}_{datos['version']}.json")
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(datos, f, ensure_ascii=False, indent=2)
+    return ruta
+
+
+def benchmark_reporte(args):
+    actes = actuaciones_sinteticas(args.reporte, args.semilla)
+    directorio = os.path.join(args.salida, "reportes")
+    os.makedirs(directorio, exist_ok=True)
+    resultados = [corrida_reporte(actes, int(p), directorio)
+                  for p in args.paralelo.split(",") if p.strip()]
+    print(f"\n{'paralelo':>8} {'segundos':>9} {'act/s':>9} {'mem MB':>7} {'PDF MB':>7}")
+    for r in resultados:
+        print(f"{r['paralelo']:>8} {r['duracion_s']:>9.1f} {r['actuaciones_s']:>9.1f} "
+              f"{r['memoria_max_mb']:>7} {r['pdf_mb']:>7.1f}")
+    datos = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "version": _version(),
+        "etiqueta": args.etiqueta,
+        "backend": "reporte",
+        "corridas": resultados,
+    }
+    print(f"\nResultado guardado en {guardar(datos, args.salida)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del scraper contra el sitio simulado")
+    parser.add_argument("--workers", default="1,2,4", help="lista de workers a probar, ej. 1,2,4,8")
+    parser.add_argument("--procesos", type=int, default=40, help="radicaciones por corrida")
+    parser.add_argument("--backend", choices=("api", "selenium"), default="api")
+    parser.add_argument("--engine", choices=("threads", "async"), default="threads")
+    parser.add_argument("--dias", type=int, default=1, help="días de búsqueda (fecha de corte)")
+    parser.add_argument("--etiqueta", default="", help="texto libre guardado con el resultado")
+    parser.add_argument("--comparar", help="resultado anterior (JSON) contra el que comparar")
+    parser.add_argument("--salida", default=BENCHMARK_DIR)
+    parser.add_argument("--reporte", type=int, default=0,
+                        help="medir generar_pdf con N actuaciones sintéticas en lugar del scraper")
+    parser.add_argument("--paralelo", default="1,4", help="con --reporte: valores de REPORTE_PARALELO")
+    argumentos_mock(parser)
+    args = parser.parse_args()
+
+    if args.reporte:
+        benchmark_reporte(args)
+        return
+
+    sitio = mock_desde_args(args).iniciar()
+    configurar_entorno(sitio, args)
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            anterior = json.load(f)
+
+    procesos = radicaciones(args.procesos, args.semilla)
+    resultados = []
+    try:
+        for workers in [int(w) for w in args.workers.split(",") if w.strip()]:
+            resultados.append(corrida(workers, procesos, args))
+    finally:
+        sitio.detener()
+
+    datos = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "version": _version(),
+        "etiqueta": args.etiqueta,
+        "backend": args.backend,
+        "engine": args.engine,
+        "mock": {"latencia": args.latencia, "variacion": args.variacion, "errores": args.errores,
+                 "sin_resultados": args.sin_resultados, "activos": args.activos,
+                 "semilla_html": args.semilla_html, "peticiones": sitio.peticiones},
+        "corridas": resultados,
+    }
+    print()
+    imprimir(resultados, anterior)
+    print(f"\nResultado guardado en {guardar(datos, args.salida)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,108 +1,88 @@
 # scraper/browser.py
 import os
 import random
+import shutil
+import threading
 import time
-import requests
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.chrome.service import Service as ChromeService
-from stem import Signal
-from stem.control import Controller
-from .config import ENV, DEBUG_SCRAPER
+from .config import (ENV, DEBUG_SCRAPER, TOR_SOCKS_PORT, TOR_CONTROL_PORT, RECURSOS_POLITICA,
+                     TRAFICO_CONTABILIZAR, PERFILES_PERSISTENTES, SITE_URL, CHROMEDRIVER_PATH,
+                     TOR_ESPERA_TIMEOUT)
 from .logger import log
+from .arranque_tor import esperar_tor
+from .trafico import ContadorTrafico, aplicar_politica
+from . import perfiles
+from . import circuitos
 
 # ========== SILENCIAR LOGS EXTERNOS ==========
 os.environ['WDM_LOG_LEVEL'] = '0'
 os.environ['WDM_PRINT_FIRST_LINE'] = 'False'
 os.environ['TOR_LOG'] = 'notice stderr'
 
+# chromedriver resuelto una vez por proceso (ver ruta_chromedriver)
+_chromedriver = None
+_chromedriver_lock = threading.Lock()
 
-def renew_tor_circuit():
+
+def ruta_chromedriver():
     """
-    Solicita a TOR una nueva identidad (nuevo circuito de salida).
-    Si falla, espera unos segundos como fallback.
+    Ruta de chromedriver, resuelta una sola vez por proceso: CHROMEDRIVER_PATH
+    si está configurada; si no, webdriver-manager (que puede consultar la red
+    por la versión); si eso falla, el chromedriver del PATH. None deja que
+    Selenium lo resuelva por su cuenta.
     """
-    try:
-        with Controller.from_port(port=9051) as controller:
-            controller.authenticate()
-            controller.signal(Signal.NEWNYM)
-            time.sleep(5)
-            log.tor("Circuito TOR renovado exitosamente")
-            return True
-    except Exception as e:
-        log.error(f"Error renovando circuito TOR: {e}")
-        log.info("Fallback: esperando 10 segundos antes de reintentar...")
-        time.sleep(10)
-        return False
+    global _chromedriver
+    with _chromedriver_lock:
+        if _chromedriver is not None:
+            return _chromedriver or None
+        if CHROMEDRIVER_PATH:
+            _chromedriver = CHROMEDRIVER_PATH
+        else:
+            t0 = time.time()
+            try:
+                log.tor("Obteniendo ChromeDriver...")
+                _chromedriver = ChromeDriverManager().install()
+                log.tor("ChromeDriver: %s (%.1fs)", _chromedriver, time.time() - t0)
+            except Exception as e:
+                _chromedriver = shutil.which("chromedriver") or ""
+                log.advertencia(f"webdriver-manager falló ({e}); usando "
+                                f"{_chromedriver or 'la resolución de Selenium'}")
+        return _chromedriver or None
 
 
-def wait_for_tor_circuit(timeout=600):  # Timeout por defecto: 10 minutos
+def renew_tor_circuit(control_port=TOR_CONTROL_PORT, espera=0):
     """
-    Espera ACTIVAMENTE hasta que TOR tenga un circuito de salida funcionando.
-    Reintenta cada 5 segundos hasta que lo consigue o se alcanza el timeout.
+    Solicita a TOR una nueva identidad (nuevo circuito de salida).
+    La renovación pasa por el gestor de circuitos de la instancia, que agrupa
+    los pedidos simultáneos de varios workers en un solo NEWNYM y respeta el
+    límite de TOR (ver circuitos.py).
+    control_port: puerto de control de la instancia TOR que usa el worker.
+    espera: segundos extra tras renovar (0 si quien llama ya hace backoff).
     """
-    start_time = time.time()
-    log.info("Conectando a la red TOR (puede tomar varios minutos en el primer inicio)...")
-    log.tor("Iniciando verificación de circuito TOR")
+    renovado = circuitos.gestor(control_port).renovar()
+    if renovado and espera:
+        time.sleep(espera)
+    return renovado
 
-    # Obtener IP directa
-    direct_ip = None
-    try:
-        direct_response = requests.get('https://api.ipify.org', timeout=10)
-        if direct_response.status_code == 200:
-            direct_ip = direct_response.text.strip()
-            log.tor(f"IP Directa: {direct_ip}")
-    except Exception as e:
-        log.tor(f"No se pudo obtener IP directa: {e}")
-
-    attempts = 0
-    last_log_time = 0
-
-    while time.time() - start_time < timeout:
-        attempts += 1
-        try:
-            session = requests.Session()
-            session.proxies = {
-                'http': 'socks5://127.0.0.1:9050',
-                'https': 'socks5://127.0.0.1:9050'
-            }
-            session.timeout = 15
-
-            response = session.get('https://api.ipify.org', timeout=15)
-
-            if response.status_code == 200:
-                tor_ip = response.text.strip()
-
-                if direct_ip and tor_ip != direct_ip:
-                    elapsed = int(time.time() - start_time)
-                    log.tor(f"✅ TOR LISTO! IP: {tor_ip} (en {elapsed}s)")
-                    log.exito(f"Conexión TOR establecida ({elapsed} segundos)")
-                    return True
-                elif not direct_ip:
-                    log.tor(f"✅ TOR responde con IP: {tor_ip}")
-                    log.exito("Conexión TOR establecida")
-                    return True
-                else:
-                    log.tor(f"⚠️ TOR misma IP que directa ({tor_ip})")
-
-        except Exception as e:
-            # Solo mostramos progreso cada 30 segundos para no saturar
-            current_time = time.time()
-            if current_time - last_log_time > 30:
-                elapsed = int(time.time() - start_time)
-                log.progreso(f"Esperando TOR... {elapsed}s transcurridos")
-                last_log_time = current_time
 
-        time.sleep(5)
+def wait_for_tor_circuit(timeout=TOR_ESPERA_TIMEOUT):
+    """
+    Espera a que el TOR del sistema tenga un circuito de salida (eventos de
+    arranque del puerto de control, ver arranque_tor.py).
+    """
+    return esperar_tor(TOR_CONTROL_PORT, TOR_SOCKS_PORT, timeout=timeout)
 
-    log.error(f"❌ TOR no estableció circuito después de {timeout} segundos")
-    return False
 
-def new_chrome_driver(worker_id=None):
-    """Crea un driver de Chrome configurado para usar TOR."""
+def new_chrome_driver(worker_id=None, socks_port=TOR_SOCKS_PORT, control_port=TOR_CONTROL_PORT):
+    """
+    Crea un driver de Chrome configurado para usar TOR.
+    socks_port/control_port: instancia TOR asignada (ver tor_fleet.py).
+    """
     if worker_id is not None:
         log.progreso(f"Iniciando driver {worker_id}...")
     else:
@@ -120,7 +100,7 @@ def new_chrome_driver(worker_id=None):
         "profile.password_manager_enabled": False,
         "profile.default_content_setting_values.notifications": 2,
         "profile.default_content_setting_values.geolocation": 2,
-        "profile.default_content_setting_values.images": 1,
+        "profile.default_content_setting_values.images": 1 if RECURSOS_POLITICA == "ninguna" else 2,
         "excludeSwitches": ["enable-automation"],
         "useAutomationExtension": False,
     }
@@ -134,7 +114,8 @@ def new_chrome_driver(worker_id=None):
 
     if ENV.upper() == "PRODUCTION":
         options.add_argument("--headless=new")
-        options.add_argument("--remote-debugging-port=9222")
+        # Puerto libre elegido por Chrome: con un puerto fijo los drivers que arrancan a la vez chocan
+        options.add_argument("--remote-debugging-port=0")
 
     user_agents = [
         "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -144,14 +125,14 @@ def new_chrome_driver(worker_id=None):
     ]
     selected_ua = random.choice(user_agents)
     options.add_argument(f"user-agent={selected_ua}")
-    log.tor(f"User-Agent: {selected_ua[:60]}...")
+    log.tor("User-Agent: %s...", selected_ua[:60])
 
     options.add_argument("--window-size=1920,1080")
     options.add_argument("--start-maximized")
     options.add_argument("--lang=es-ES")
     options.add_argument("--accept-lang=es-ES,es;q=0.9")
 
-    options.add_argument('--proxy-server=socks5://127.0.0.1:9050')
+    options.add_argument(f'--proxy-server=socks5://127.0.0.1:{socks_port}')
     options.add_argument('--ignore-certificate-errors')
     options.add_argument('--ignore-ssl-errors')
     options.add_argument('--disable-web-security')
@@ -159,14 +140,31 @@ def new_chrome_driver(worker_id=None):
 
     options.page_load_strategy = "eager"
 
+    # Perfil persistente del worker: la caché conserva el bundle del SPA
+    perfil, caliente = None, False
+    if PERFILES_PERSISTENTES and worker_id is not None:
+        perfil, caliente = perfiles.preparar(worker_id)
+        for arg in perfiles.argumentos(perfil):
+            options.add_argument(arg)
+
+    if TRAFICO_CONTABILIZAR:
+        # Eventos Network.* en el log de rendimiento (ver trafico.drenar)
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": True, "enablePage": False})
+
     try:
-        log.tor("Obteniendo ChromeDriver...")
-        chromedriver_path = ChromeDriverManager().install()
-        service = ChromeService(executable_path=chromedriver_path)
+        service = ChromeService(executable_path=ruta_chromedriver())
 
         driver = webdriver.Chrome(service=service, options=options)
+        # El worker renueva el circuito en la misma instancia TOR que usa el driver
+        driver.tor_control_port = control_port
+        driver.perfil = perfil
+        driver.trafico = ContadorTrafico() if TRAFICO_CONTABILIZAR else None
         log.tor("✅ Driver creado")
 
+        # Bloquear fuentes, imágenes, CSS y analítica antes de la primera carga
+        aplicar_politica(driver)
+
         driver.execute_script("""
             Object.defineProperty(navigator, 'webdriver', {
                 get: () => undefined
@@ -197,22 +195,25 @@ def new_chrome_driver(worker_id=None):
                 driver.get("https://api.ipify.org")
                 time.sleep(2)
                 browser_ip = driver.find_element(By.TAG_NAME, "body").text.strip()
-                log.tor(f"IP del navegador: {browser_ip}")
+                log.tor("IP del navegador: %s", browser_ip)
             except Exception as e:
-                log.tor(f"Error en verificación: {e}")
+                log.tor("Error en verificación: %s", e)
 
-        # Siempre navegar al sitio objetivo
-        try:
-            driver.get("https://consultaprocesos.ramajudicial.gov.co")
-            time.sleep(3)
-        except:
-            pass
+        # Con caché fría se navega al sitio para descargar el bundle del SPA;
+        # con el perfil caliente la primera consulta ya lo encuentra en disco
+        if not caliente:
+            try:
+                driver.get(SITE_URL)
+                time.sleep(3)
+            except:
+                pass
 
         log.exito("Driver listo")
         return driver
 
     except Exception as e:
         log.error(f"Error creando driver: {e}")
+        perfiles.liberar(perfil)
         raise
 
 
@@ -228,7 +229,7 @@ def is_page_maintenance(driver):
                 return True
         return False
     except Exception as e:
-        log.debug(f"Error verificando mantenimiento: {e}")
+        log.debug("Error verificando mantenimiento: %s", e)
         return False
 
 
@@ -247,5 +248,5 @@ def handle_modal_error(driver, numero):
             log.debug("No se encontró botón en el modal")
             return False
     except Exception as e:
-        log.debug(f"No hay modal: {e}")
+        log.debug("No hay modal: %s", e)
         return False
\ No newline at end of file
@@ -0,0 +1,283 @@
+# scraper/circuitos.py
+"""
+Gestión de circuitos TOR con stem: calidad de los nodos de salida y
+renovación coordinada.
+
+- Un GestorCircuitos por instancia TOR (puerto de control) escucha los
+  eventos STREAM para saber por qué nodo de salida van las conexiones al
+  sitio. Los workers reportan cada consulta (éxito y latencia, o fallo) y
+  se acumula un puntaje por salida: latencia y tasa de fallos con media
+  móvil exponencial.
+- Varios workers comparten una instancia con circuitos distintos. Un
+  cliente con credencial SOCKS propia (TOR aísla los circuitos por
+  credencial) se atribuye a la salida de su circuito. El tráfico sin
+  credencial (Chrome) solo puntúa si nadie más consultaba sin credencial
+  en la misma instancia; si no, no se sabe por qué salida fue.
+- Las mejores salidas (CIRCUITOS_BUENAS) se fijan como ExitNodes, así los
+  circuitos nuevos salen por nodos rápidos; las que fallan seguido van a
+  ExcludeExitNodes. En una fracción de las renovaciones se libera ExitNodes
+  para seguir descubriendo salidas nuevas.
+- renovar() agrupa los pedidos de todos los workers de la instancia: TOR
+  limita NEWNYM (uno cada ~10 s) y varios workers renovando a la vez se
+  resetean los circuitos entre sí. Dentro de la ventana se considera que
+  el pedido ya quedó cubierto por la renovación reciente.
+"""
+import random
+import threading
+import time
+
+from stem import Signal
+from stem.control import Controller, EventType
+
+from .config import (
+    TOR_CONTROL_PORT, SITE_URL, CIRCUITOS_SELECCION, CIRCUITOS_MIN_INTERVALO, CIRCUITOS_BUENAS
+)
+from .metricas import METRICAS
+from .logger import log
+
+# Media móvil exponencial (peso de la observación nueva)
+ALFA = 0.3
+# Muestras mínimas para juzgar una salida
+MUESTRAS_MIN = 3
+# Salidas con tasa de fallos mayor a esto se excluyen
+FALLOS_EXCLUIR = 0.6
+# Probabilidad de liberar ExitNodes en una renovación (exploración)
+EXPLORACION = 0.2
+HOST_OBJETIVO = SITE_URL.split("//", 1)[-1].split("/", 1)[0].split(":", 1)[0]
+
+
+class Salida:
+    """Estadísticas de un nodo de salida."""
+
+    def __init__(self, huella, nombre):
+        self.huella = huella
+        self.nombre = nombre
+        self.latencia = None
+        self.fallos = 0.0
+        self.muestras = 0
+
+    def registrar(self, exito, segundos=None):
+        self.muestras += 1
+        self.fallos = (1 - ALFA) * self.fallos + ALFA * (0.0 if exito else 1.0)
+        if exito and segundos is not None:
+            self.latencia = segundos if self.latencia is None else \
+                (1 - ALFA) * self.latencia + ALFA * segundos
+
+    @property
+    def puntaje(self):
+        """Menor es mejor: latencia penalizada por la tasa de fallos."""
+        return (self.latencia or 30.0) * (1 + 4 * self.fallos)
+
+    def __repr__(self):
+        lat = f"{self.latencia:.1f}s" if self.latencia is not None else "-"
+        return f"{self.nombre}({lat}, {self.fallos:.0%} fallos, n={self.muestras})"
+
+
+class GestorCircuitos:
+    def __init__(self, control_port=TOR_CONTROL_PORT):
+        self.control_port = control_port
+        self.salidas = {}
+        self.actuales = {}  # usuario SOCKS (None: sin credencial) -> huella de su salida
+        self._anonimas = []  # consultas sin credencial en curso
+        self.ultima_renovacion = 0.0
+        self.renovaciones = 0
+        self.agrupadas = 0
+        self._exit_nodes = None
+        self._lock = threading.Lock()
+        self._renovando = threading.Lock()
+        # Serializa la conexión: sin él, los workers que llegan a la vez abren cada uno su Controller
+        self._conexion = threading.Lock()
+        self._controller = None
+
+    # ========== CONEXIÓN ==========
+
+    def _conectar(self):
+        """Controller persistente con el listener de STREAM; None si TOR no responde."""
+        with self._conexion:
+            if self._controller is not None and self._controller.is_alive():
+                return self._controller
+            self.cerrar()
+            try:
+                controller = Controller.from_port(port=self.control_port)
+            except Exception as e:
+                log.debug("Gestor de circuitos sin control %s: %s", self.control_port, e)
+                return None
+            try:
+                controller.authenticate()
+                controller.add_event_listener(self._al_stream, EventType.STREAM)
+            except Exception as e:
+                log.debug("Gestor de circuitos sin control %s: %s", self.control_port, e)
+                controller.close()
+                return None
+            self._controller = controller
+            log.debug("Gestor de circuitos conectado al control %s", self.control_port)
+            return controller
+
+    def cerrar(self):
+        if self._controller is not None:
+            try:
+                self._controller.close()
+            except Exception:
+                pass
+            self._controller = None
+
+    def _al_stream(self, evento):
+        """Anota la salida del circuito que lleva las conexiones al sitio."""
+        if evento.status != "SUCCEEDED" or not evento.circ_id:
+            return
+        if not (evento.target_address or "").endswith(HOST_OBJETIVO):
+            return
+        try:
+            circuito = self._controller.get_circuit(evento.circ_id)
+        except Exception:
+            return
+        if not circuito.path:
+            return
+        huella, nombre = circuito.path[-1]
+        with self._lock:
+            if huella not in self.salidas:
+                self.salidas[huella] = Salida(huella, nombre)
+            self.actuales[circuito.socks_username] = huella
+
+    # ========== CALIDAD ==========
+
+    def consulta(self, credencial=None):
+        """
+        Abre una consulta al sitio con esa credencial SOCKS (None: sin
+        credencial). Retorna el dict a pasar a salida() y registrar().
+        """
+        self._conectar()
+        consulta = {"credencial": credencial, "compartida": False}
+        if credencial is None:
+            with self._lock:
+                # Sin credencial no se distingue el circuito de cada una: ninguna puntúa
+                if self._anonimas:
+                    consulta["compartida"] = True
+                    for otra in self._anonimas:
+                        otra["compartida"] = True
+                self._anonimas.append(consulta)
+        return consulta
+
+    def registrar(self, consulta, exito=None, segundos=None):
+        """Cierra la consulta y, si se sabe su salida, le acredita el resultado (exito None: no puntúa)."""
+        with self._lock:
+            if consulta["credencial"] is None:
+                self._anonimas.remove(consulta)
+            huella = self._huella(consulta)
+            if huella is not None and exito is not None:
+                self.salidas[huella].registrar(exito, segundos)
+
+    def _huella(self, consulta):
+        if consulta["compartida"]:
+            return None
+        return self.actuales.get(consulta["credencial"])
+
+    def salida(self, consulta):
+        """Nombre del nodo de salida de la consulta (None si no se sabe)."""
+        with self._lock:
+            huella = self._huella(consulta)
+            salida = self.salidas.get(huella) if huella is not None else None
+        return salida.nombre if salida is not None else None
+
+    def buenas(self):
+        with self._lock:
+            candidatas = [s for s in self.salidas.values()
+                          if s.muestras >= MUESTRAS_MIN and s.fallos < FALLOS_EXCLUIR]
+        return sorted(candidatas, key=lambda s: s.puntaje)[:CIRCUITOS_BUENAS]
+
+    def malas(self):
+        with self._lock:
+            return [s for s in self.salidas.values()
+                    if s.muestras >= MUESTRAS_MIN and s.fallos >= FALLOS_EXCLUIR]
+
+    def _aplicar_seleccion(self, controller):
+        """Fija ExitNodes a las mejores salidas (o lo libera para explorar)."""
+        malas = self.malas()
+        buenas = self.buenas()
+        try:
+            if malas:
+                controller.set_conf("ExcludeExitNodes", ",".join("$" + s.huella for s in malas))
+            if len(buenas) >= max(3, CIRCUITOS_BUENAS // 2) and random.random() >= EXPLORACION:
+                nodos = ",".join("$" + s.huella for s in buenas)
+                if nodos != self._exit_nodes:
+                    controller.set_conf("ExitNodes", nodos)
+                    self._exit_nodes = nodos
+                    log.tor("ExitNodes: %d salidas rápidas (mejor %r)", len(buenas), buenas[0])
+            elif self._exit_nodes is not None:
+                controller.reset_conf("ExitNodes")
+                self._exit_nodes = None
+                log.debug("ExitNodes liberado para explorar salidas nuevas")
+        except Exception as e:
+            log.debug("No se pudo ajustar la selección de salidas: %s", e)
+
+    # ========== RENOVACIÓN ==========
+
+    def renovar(self):
+        """
+        Pide circuitos nuevos (NEWNYM). Los pedidos dentro de la ventana de
+        CIRCUITOS_MIN_INTERVALO, o mientras otro worker ya está renovando,
+        se agrupan en esa renovación. Retorna True si hay una renovación
+        reciente (propia o agrupada), False si TOR no respondió.
+        """
+        if not self._renovando.acquire(blocking=False):
+            with self._lock:
+                self.agrupadas += 1
+            METRICAS.incrementar("renovaciones_agrupadas")
+            log.evento("renovacion_tor", control=self.control_port, agrupada=True)
+            return True
+        try:
+            if time.time() - self.ultima_renovacion < CIRCUITOS_MIN_INTERVALO:
+                with self._lock:
+                    self.agrupadas += 1
+                METRICAS.incrementar("renovaciones_agrupadas")
+                log.evento("renovacion_tor", control=self.control_port, agrupada=True)
+                return True
+            controller = self._conectar()
+            if controller is None:
+                return False
+            if CIRCUITOS_SELECCION:
+                self._aplicar_seleccion(controller)
+            if not controller.is_newnym_available():
+                espera = controller.get_newnym_wait()
+                log.debug("NEWNYM limitado por TOR, esperando %.1fs", espera)
+                time.sleep(espera)
+            controller.signal(Signal.NEWNYM)
+            with self._lock:
+                self.actuales.clear()
+                self.renovaciones += 1
+            self.ultima_renovacion = time.time()
+            METRICAS.incrementar("renovaciones_tor")
+            log.evento("renovacion_tor", control=self.control_port, agrupada=False)
+            log.tor("Circuito TOR renovado (control %s, %d renovaciones, %d agrupadas)",
+                    self.control_port, self.renovaciones, self.agrupadas)
+            return True
+        except Exception as e:
+            log.error(f"Error renovando circuito TOR: {e}")
+            self.cerrar()
+            return False
+        finally:
+            self._renovando.release()
+
+    def resumen(self):
+        buenas = self.buenas()
+        return (f"control {self.control_port}: {len(self.salidas)} salidas vistas, "
+                f"{len(buenas)} buenas, {len(self.malas())} excluidas, "
+                f"{self.renovaciones} renovaciones, {self.agrupadas} agrupadas"
+                + (f", mejor {buenas[0]!r}" if buenas else ""))
+
+
+_gestores = {}
+_gestores_lock = threading.Lock()
+
+
+def gestor(control_port=TOR_CONTROL_PORT):
+    """Gestor compartido de la instancia TOR con ese puerto de control."""
+    with _gestores_lock:
+        if control_port not in _gestores:
+            _gestores[control_port] = GestorCircuitos(control_port)
+        return _gestores[control_port]
+
+
+def gestores():
+    with _gestores_lock:
+        return list(_gestores.values())
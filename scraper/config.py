@@ -1,5 +1,6 @@
 # scraper/config.py
 import os
+import socket
 from dotenv import load_dotenv
 from datetime import datetime
 
@@ -20,6 +21,18 @@ INFORMACION_PATH_DEVELOPMENT = os.getenv('INFORMACION_PATH_DEVELOPMENT', './outp
 # ========== EMAIL ==========
 EMAIL_USER = os.getenv('EMAIL_USER')
 EMAIL_PASS = os.getenv('EMAIL_PASS')
+# Destinatario del reporte (por defecto, la misma cuenta que envía)
+EMAIL_TO = os.getenv('EMAIL_TO') or EMAIL_USER
+SMTP_HOST = os.getenv('SMTP_HOST', 'smtp.gmail.com')
+SMTP_PORT = int(os.getenv('SMTP_PORT', '465'))
+# 1 = SMTP sobre SSL (Gmail); 0 = SMTP sin cifrar (p. ej. python -m scraper.mock_smtp)
+SMTP_SSL = os.getenv('SMTP_SSL', '1') == '1'
+# Solo reportar actuaciones que no se han entregado antes
+ENTREGA_SOLO_NUEVAS = os.getenv('ENTREGA_SOLO_NUEVAS', '1') == '1'
+# Tamaño máximo de cada correo (adjunto codificado incluido); los reportes más grandes se comprimen o dividen
+ENTREGA_MAX_MB = float(os.getenv('ENTREGA_MAX_MB', '24'))
+# Intentos por correo ante errores temporales del servidor SMTP
+ENTREGA_REINTENTOS = int(os.getenv('ENTREGA_REINTENTOS', '3'))
 
 # ========== SCRAPER ==========
 DIAS_BUSQUEDA = int(os.getenv('DIAS_BUSQUEDA', '1'))
@@ -27,11 +40,143 @@ WAIT_TIME = int(os.getenv('WAIT_TIME', '6'))
 NUM_THREADS = int(os.getenv('NUM_THREADS', '1'))
 SCHEDULE_TIME = os.getenv('SCHEDULE_TIME', '01:00')
 
+# ========== SITIO ==========
+SITE_URL = os.getenv('SITE_URL', 'https://consultaprocesos.ramajudicial.gov.co')
+CONSULTA_URL = f"{SITE_URL}/Procesos/NumeroRadicacion"
+
+# ========== TOR ==========
+TOR_SOCKS_PORT = int(os.getenv('TOR_SOCKS_PORT', '9050'))
+TOR_CONTROL_PORT = int(os.getenv('TOR_CONTROL_PORT', '9051'))
+# Espera máxima a que TOR tenga circuito (ver arranque_tor.py)
+TOR_ESPERA_TIMEOUT = int(os.getenv('TOR_ESPERA_TIMEOUT', '600'))
+# Con circuito listo, una petición HEAD al sitio por TOR para confirmar la salida
+TOR_SONDA = os.getenv('TOR_SONDA', '1') == '1'
+# Flota de instancias TOR propias (0 = usar solo el TOR del sistema)
+TOR_BIN = os.getenv('TOR_BIN', 'tor')
+TOR_INSTANCIAS = int(os.getenv('TOR_INSTANCIAS', '0'))
+TOR_FLEET_PUERTO_BASE = int(os.getenv('TOR_FLEET_PUERTO_BASE', '9100'))
+TOR_FLEET_DIR = os.getenv('TOR_FLEET_DIR', './tmp_tor')
+TOR_FLEET_CHEQUEO = int(os.getenv('TOR_FLEET_CHEQUEO', '30'))
+# Circuitos: fijar ExitNodes a las salidas más rápidas (ver circuitos.py)
+CIRCUITOS_SELECCION = os.getenv('CIRCUITOS_SELECCION', '1') == '1'
+CIRCUITOS_BUENAS = int(os.getenv('CIRCUITOS_BUENAS', '10'))
+# Ventana en la que los pedidos de renovación de varios workers se agrupan en un NEWNYM
+CIRCUITOS_MIN_INTERVALO = int(os.getenv('CIRCUITOS_MIN_INTERVALO', '15'))
+
+# ========== BACKEND ==========
+# 'selenium' (Chrome completo) o 'api' (llamadas HTTP directas al backend JSON)
+BACKEND = os.getenv('BACKEND', 'selenium').lower()
+API_BASE_URL = os.getenv('API_BASE_URL', 'https://consultaprocesos.ramajudicial.gov.co:448/api/v2')
+# Proxy para el backend API; vacío = conexión directa (útil contra un servidor local)
+API_PROXY = os.getenv('API_PROXY', f'socks5h://127.0.0.1:{TOR_SOCKS_PORT}')
+API_TIMEOUT = int(os.getenv('API_TIMEOUT', '30'))
+
+# ========== POOL DE DRIVERS ==========
+DRIVER_MAX_TAREAS = int(os.getenv('DRIVER_MAX_TAREAS', '150'))
+DRIVER_MAX_MEMORIA_MB = int(os.getenv('DRIVER_MAX_MEMORIA_MB', '1500'))
+DRIVER_PROBE_TIMEOUT = int(os.getenv('DRIVER_PROBE_TIMEOUT', '10'))
+# Drivers que se crean a la vez al iniciar el pool
+DRIVER_ARRANQUE_PARALELO = int(os.getenv('DRIVER_ARRANQUE_PARALELO', '4'))
+# Ruta fija de chromedriver (sin consultar la red); vacío = resolver con webdriver-manager una vez por proceso
+CHROMEDRIVER_PATH = os.getenv('CHROMEDRIVER_PATH', '')
+
+# ========== MOTOR ==========
+# 'threads' (un hilo por worker) o 'async' (asyncio sobre el backend API)
+ENGINE = os.getenv('ENGINE', 'threads').lower()
+ASYNC_CONCURRENCIA = int(os.getenv('ASYNC_CONCURRENCIA', '200'))
+ASYNC_CIRCUITOS = int(os.getenv('ASYNC_CIRCUITOS', '8'))
+ASYNC_POR_CIRCUITO = int(os.getenv('ASYNC_POR_CIRCUITO', '25'))
+ASYNC_POR_HOST = int(os.getenv('ASYNC_POR_HOST', '100'))
+
+# ========== REINTENTOS ==========
+# Reintentos disponibles por ciclo, como fracción de los procesos a escanear
+REINTENTOS_PRESUPUESTO = float(os.getenv('REINTENTOS_PRESUPUESTO', '0.5'))
+# Pausa antes de la pasada diferida (procesos que agotaron sus reintentos)
+REINTENTOS_PAUSA_DIFERIDOS = int(os.getenv('REINTENTOS_PAUSA_DIFERIDOS', '60'))
+
+# ========== COORDINACIÓN ENTRE NODOS ==========
+# '' (un solo nodo), 'sqlite' o 'archivos': cola compartida en COORDINACION_DIR
+COORDINACION = os.getenv('COORDINACION', '').lower()
+COORDINACION_DIR = os.getenv('COORDINACION_DIR', './output/cola')
+NODO_ID = os.getenv('NODO_ID', socket.gethostname())
+LEASE_SEGUNDOS = int(os.getenv('LEASE_SEGUNDOS', '300'))
+
+# ========== PRIORIDAD ==========
+# Ordena la cola por actividad y espacia el escaneo de procesos inactivos
+PRIORIDAD_ACTIVA = os.getenv('PRIORIDAD_ACTIVA', '1') == '1'
+PRIORIDAD_DIAS_ACTIVO = int(os.getenv('PRIORIDAD_DIAS_ACTIVO', '30'))
+# Máximo de días que un proceso inactivo puede quedar sin escanear
+PRIORIDAD_MAX_ANTIGUEDAD = int(os.getenv('PRIORIDAD_MAX_ANTIGUEDAD', '7'))
+# Día de la semana con barrido completo (0=lunes … 6=domingo, -1=nunca)
+PRIORIDAD_BARRIDO_DIA = int(os.getenv('PRIORIDAD_BARRIDO_DIA', '6'))
+
+# ========== RECURSOS Y TRÁFICO ==========
+# Política de bloqueo de recursos en Chrome: 'estricta' (solo JS y XHR),
+# 'ligera' (conserva CSS) o 'ninguna'
+RECURSOS_POLITICA = os.getenv('RECURSOS_POLITICA', 'estricta').lower()
+# Patrones adicionales a bloquear, separados por coma (ej: "*cdn.ejemplo.com*")
+RECURSOS_BLOQUEO_EXTRA = [p.strip() for p in os.getenv('RECURSOS_BLOQUEO_EXTRA', '').split(',') if p.strip()]
+# Contabilizar peticiones y bytes por driver (log de rendimiento de ChromeDriver)
+TRAFICO_CONTABILIZAR = os.getenv('TRAFICO_CONTABILIZAR', '1') == '1'
+
+# ========== PERFILES DE CHROME ==========
+# Perfil persistente por worker (caché HTTP caliente entre drivers y ciclos)
+PERFILES_PERSISTENTES = os.getenv('PERFILES_PERSISTENTES', '1') == '1'
+PERFILES_DIR = os.getenv('PERFILES_DIR', './tmp_profiles')
+PERFIL_CACHE_MB = int(os.getenv('PERFIL_CACHE_MB', '100'))
+PERFILES_MAX_MB = int(os.getenv('PERFILES_MAX_MB', '2000'))
+PERFILES_MAX_DIAS = int(os.getenv('PERFILES_MAX_DIAS', '14'))
+
+# ========== RITMO (PACING) ==========
+# Adaptativo: las pausas de cada etapa se ajustan según éxitos y modales;
+# en 0 se usan las pausas máximas (equivalentes a los sleeps fijos anteriores)
+PACING_ADAPTATIVO = os.getenv('PACING_ADAPTATIVO', '1') == '1'
+# Entrada rápida: el número se asigna de una vez (setter + evento 'input')
+PACING_INPUT_RAPIDO = os.getenv('PACING_INPUT_RAPIDO', '0') == '1'
+
+# ========== SALIDAS ==========
+# Formatos escritos en streaming durante el ciclo: csv, jsonl, parquet (requiere pyarrow)
+SALIDAS = [f.strip().lower() for f in os.getenv('SALIDAS', 'csv,jsonl').split(',') if f.strip()]
+# Actuaciones en cola antes de que los workers esperen al escritor
+SALIDAS_BUFFER = int(os.getenv('SALIDAS_BUFFER', '10000'))
+SALIDAS_FLUSH_SEGUNDOS = float(os.getenv('SALIDAS_FLUSH_SEGUNDOS', '2'))
+
+# ========== REPORTE PDF ==========
+# Filas por tabla de actuaciones (las tablas grandes se parten en bloques)
+REPORTE_FILAS_TABLA = int(os.getenv('REPORTE_FILAS_TABLA', '200'))
+# Secciones en paralelo (procesos separados) para reportes grandes; 1 = secuencial
+REPORTE_PARALELO = int(os.getenv('REPORTE_PARALELO', '1'))
+# Actuaciones por sección cuando se genera en paralelo
+REPORTE_FILAS_SECCION = int(os.getenv('REPORTE_FILAS_SECCION', '20000'))
+
+# ========== LOGS ==========
+# Nivel mínimo que se registra (DEBUG guarda todo en el archivo de log)
+LOG_NIVEL = os.getenv('LOG_NIVEL', 'DEBUG').upper()
+# Rotación por tamaño del log completo (MB por archivo y archivos anteriores que se conservan)
+LOG_MAX_MB = float(os.getenv('LOG_MAX_MB', '50'))
+LOG_RESPALDOS = int(os.getenv('LOG_RESPALDOS', '5'))
+# Cada cuánto el hilo de logging vacía los archivos a disco (los errores se vacían enseguida)
+LOG_FLUSH_SEGUNDOS = float(os.getenv('LOG_FLUSH_SEGUNDOS', '1'))
+# Eventos estructurados (eventos_<ejecución>.jsonl) para python -m scraper.analisis
+LOG_EVENTOS = os.getenv('LOG_EVENTOS', '1') == '1'
+
 # ========== DIRECTORIOS ==========
 OUTPUT_DIR = "./output"
+
+# ========== MÉTRICAS ==========
+# Endpoint local /metrics (formato Prometheus); 0 = desactivado
+METRICAS_PUERTO = int(os.getenv('METRICAS_PUERTO', '9464'))
+# Resumen JSON por ejecución
+METRICAS_DIR = os.getenv('METRICAS_DIR', os.path.join(OUTPUT_DIR, "metricas"))
 PDF_PATH = INFORMACION_PATH_PRODUCTION if ENV == 'production' else INFORMACION_PATH_DEVELOPMENT
 EXCEL_PATH = EXCEL_PATH_PRODUCTION if ENV == 'production' else EXCEL_PATH_DEVELOPMENT
 
+# Estado incremental por radicación (omite procesos sin cambios)
+ESCANEO_INCREMENTAL = os.getenv('ESCANEO_INCREMENTAL', '1') == '1'
+STATE_DB_PATH = os.getenv('STATE_DB_PATH', os.path.join(OUTPUT_DIR, "estado.db"))
+# Actuaciones ya entregadas por correo (reporte solo con novedades)
+ENTREGAS_DB_PATH = os.getenv('ENTREGAS_DB_PATH', os.path.join(OUTPUT_DIR, "entregas.db"))
+
 # Directorio de logs (montado en /home/logs)
 LOG_DIR = "/app/logs"  # Ruta dentro del contenedor que se monta en /home/logs
 
@@ -0,0 +1,463 @@
+# scraper/coordinacion.py
+"""
+Coordinación de varios nodos (contenedores) sobre una misma lista de procesos.
+
+Una cola de trabajo en almacenamiento compartido (COORDINACION_DIR) reparte
+las radicaciones del ciclo con arrendamientos (leases):
+
+- El primer nodo en llegar publica el plan del ciclo (orden, fecha de corte
+  y cortes por proceso); los demás usan ese mismo plan.
+- Cada nodo toma lotes pequeños y renueva sus leases con un heartbeat. Si
+  un nodo muere, sus leases vencen y otro nodo retoma esos procesos.
+- El resultado de cada radicación (actuaciones o error) se guarda en la
+  cola. Cuando no queda nada pendiente, un solo nodo gana el cierre y genera
+  el PDF, el CSV y el correo con los resultados de todos.
+
+Backends (COORDINACION):
+- 'sqlite': una base SQLite en el directorio compartido (sin WAL, que no
+  funciona sobre sistemas de archivos de red).
+- 'archivos': un archivo por radicación; los cambios de estado son
+  os.rename atómicos y el lease es el mtime del archivo tomado.
+
+El StateStore sigue siendo local de cada nodo: el escaneo incremental solo
+conoce lo que escaneó ese nodo, y en el peor caso reporta como nuevas
+actuaciones que ya estaban dentro del período (el comportamiento sin estado).
+
+Para probar en una sola máquina basta con lanzar varios procesos con el
+mismo COORDINACION_DIR y distinto NODO_ID.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from .config import COORDINACION, COORDINACION_DIR, NODO_ID, LEASE_SEGUNDOS
+from .logger import log
+
+# Espera entre consultas cuando solo quedan procesos arrendados por otros nodos
+ESPERA_OTROS = 15
+# Sin heartbeat durante este tiempo, la marca "publicando" es de un nodo caído
+ESPERA_PUBLICACION = 120
+
+
+def _nombre_seguro(texto):
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", str(texto))
+
+
+# ========== BACKEND SQLITE ==========
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS ciclos (
+    ciclo        TEXT PRIMARY KEY,
+    meta         TEXT NOT NULL,
+    cierre_nodo  TEXT
+);
+CREATE TABLE IF NOT EXISTS items (
+    ciclo   TEXT NOT NULL,
+    numero  TEXT NOT NULL,
+    orden   INTEGER NOT NULL,
+    estado  TEXT NOT NULL DEFAULT 'pendiente',
+    nodo    TEXT,
+    vence   REAL,
+    actes   TEXT,
+    error   TEXT,
+    PRIMARY KEY (ciclo, numero)
+);
+CREATE INDEX IF NOT EXISTS items_estado ON items (ciclo, estado, orden);
+"""
+
+
+class ColaSQLite:
+    def __init__(self, directorio=COORDINACION_DIR):
+        os.makedirs(directorio, exist_ok=True)
+        self.path = os.path.join(directorio, "cola.db")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=60, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=DELETE")
+        self._conn.executescript(ESQUEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _transaccion(self, funcion):
+        """Ejecuta funcion(conn) dentro de BEGIN IMMEDIATE (bloqueo de escritura)."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                resultado = funcion(self._conn)
+                self._conn.execute("COMMIT")
+                return resultado
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def publicar(self, ciclo, procesos, meta):
+        """Publica el ciclo si nadie lo hizo. Retorna el meta vigente (propio o ajeno)."""
+        def _publicar(conn):
+            row = conn.execute("SELECT meta FROM ciclos WHERE ciclo = ?", (ciclo,)).fetchone()
+            if row:
+                return json.loads(row[0])
+            meta_total = dict(meta, total=len(procesos))
+            conn.execute("INSERT INTO ciclos (ciclo, meta) VALUES (?, ?)",
+                         (ciclo, json.dumps(meta_total)))
+            conn.executemany("INSERT INTO items (ciclo, numero, orden) VALUES (?, ?, ?)",
+                             [(ciclo, num, i) for i, num in enumerate(procesos)])
+            return meta_total
+        return self._transaccion(_publicar)
+
+    def tomar(self, ciclo, nodo, n, lease=LEASE_SEGUNDOS):
+        """Arrienda hasta n procesos pendientes o con el lease vencido."""
+        def _tomar(conn):
+            ahora = time.time()
+            numeros = [r[0] for r in conn.execute(
+                """SELECT numero FROM items WHERE ciclo = ?
+                   AND (estado = 'pendiente' OR (estado = 'tomado' AND vence < ?))
+                   ORDER BY orden LIMIT ?""", (ciclo, ahora, n))]
+            conn.executemany(
+                "UPDATE items SET estado = 'tomado', nodo = ?, vence = ? WHERE ciclo = ? AND numero = ?",
+                [(nodo, ahora + lease, ciclo, num) for num in numeros])
+            return numeros
+        return self._transaccion(_tomar)
+
+    def renovar(self, ciclo, nodo, numeros, lease=LEASE_SEGUNDOS):
+        if not numeros:
+            return
+        with self._lock:
+            self._conn.executemany(
+                """UPDATE items SET vence = ? WHERE ciclo = ? AND numero = ?
+                   AND nodo = ? AND estado = 'tomado'""",
+                [(time.time() + lease, ciclo, num, nodo) for num in numeros])
+
+    def completar(self, ciclo, nodo, numero, actes, error=None):
+        with self._lock:
+            self._conn.execute(
+                """UPDATE items SET estado = 'hecho', nodo = ?, actes = ?, error = ?
+                   WHERE ciclo = ? AND numero = ? AND estado != 'hecho'""",
+                (nodo, json.dumps([list(a) for a in actes], ensure_ascii=False), error,
+                 ciclo, numero))
+
+    def estado(self, ciclo):
+        """(total, hechos) del ciclo."""
+        with self._lock:
+            total, hechos = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(estado = 'hecho'), 0) FROM items WHERE ciclo = ?",
+                (ciclo,)).fetchone()
+        return total, hechos
+
+    def resultados(self, ciclo):
+        """(actes, errors) de todas las radicaciones terminadas, en el orden del plan."""
+        actes, errors = [], []
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT numero, actes, error FROM items
+                   WHERE ciclo = ? AND estado = 'hecho' ORDER BY orden""", (ciclo,)).fetchall()
+        for numero, actes_json, error in rows:
+            actes.extend(tuple(a) for a in json.loads(actes_json or "[]"))
+            if error:
+                errors.append((numero, error))
+        return actes, errors
+
+    def reclamar_cierre(self, ciclo, nodo):
+        """True solo para el primer nodo que lo pide: ese genera el reporte."""
+        def _reclamar(conn):
+            cur = conn.execute(
+                "UPDATE ciclos SET cierre_nodo = ? WHERE ciclo = ? AND cierre_nodo IS NULL",
+                (nodo, ciclo))
+            return cur.rowcount == 1
+        return self._transaccion(_reclamar)
+
+
+# ========== BACKEND DE ARCHIVOS ==========
+
+class ColaArchivos:
+    """
+    <dir>/<ciclo>/meta.json              plan publicado
+                  pendiente/<orden>_<numero>
+                  tomado/<orden>_<numero>@<nodo>   (mtime = último heartbeat)
+                  hecho/<numero>.json
+                  publicando                     (O_EXCL; mtime = heartbeat del publicador)
+                  cierre                         (creado con O_EXCL por el nodo que cierra)
+    """
+
+    def __init__(self, directorio=COORDINACION_DIR):
+        self.directorio = directorio
+        os.makedirs(directorio, exist_ok=True)
+
+    def close(self):
+        pass
+
+    def _dir(self, ciclo, sub=""):
+        return os.path.join(self.directorio, _nombre_seguro(ciclo), sub)
+
+    def _escribir_atomico(self, path, datos):
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(datos, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def publicar(self, ciclo, procesos, meta):
+        meta_path = self._dir(ciclo, "meta.json")
+        marca = self._dir(ciclo, "publicando")
+        for sub in ("pendiente", "tomado", "hecho"):
+            os.makedirs(self._dir(ciclo, sub), exist_ok=True)
+        while True:
+            try:
+                fd = os.open(marca, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                # Otro nodo publica: esperar a que aparezca el meta
+                meta_publicado = self._esperar_meta(ciclo, marca, meta_path)
+                if meta_publicado is not None:
+                    return meta_publicado
+        os.close(fd)
+        pendiente = self._dir(ciclo, "pendiente")
+        # Restos de un publicador caído (nadie toma procesos antes de que exista el meta)
+        for nombre in os.listdir(pendiente):
+            os.remove(os.path.join(pendiente, nombre))
+        ancho = len(str(len(procesos)))
+        latido = time.time()
+        for i, numero in enumerate(procesos):
+            open(os.path.join(pendiente, f"{i:0{ancho}d}_{numero}"), "w").close()
+            if time.time() - latido > ESPERA_PUBLICACION / 4:
+                # Heartbeat: que los demás no tomen la marca por vencida
+                latido = time.time()
+                try:
+                    os.utime(marca)
+                except FileNotFoundError:
+                    pass
+        meta_total = dict(meta, total=len(procesos), procesos=list(procesos))
+        self._escribir_atomico(meta_path, meta_total)
+        return meta_total
+
+    def _esperar_meta(self, ciclo, marca, meta_path):
+        """
+        Espera el meta de otro publicador y lo retorna. Retorna None si la
+        marca desaparece o estaba vencida (se retiró): toca volver a intentar.
+        """
+        while not os.path.exists(meta_path):
+            try:
+                vencida = time.time() - os.path.getmtime(marca) > ESPERA_PUBLICACION
+            except FileNotFoundError:
+                return None
+            if vencida:
+                self._retirar_marca(ciclo, marca)
+                return None
+            time.sleep(1)
+        with open(meta_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _retirar_marca(self, ciclo, marca):
+        """Quita la marca de un publicador caído; el rename asegura que la retire un solo nodo."""
+        propia = f"{marca}.{os.getpid()}.{threading.get_ident()}.vencida"
+        try:
+            os.rename(marca, propia)
+        except FileNotFoundError:
+            return  # otro nodo la retiró primero
+        if time.time() - os.path.getmtime(propia) <= ESPERA_PUBLICACION:
+            # Entre la revisión y el rename otro nodo ya la había reemplazado: se devuelve
+            os.rename(propia, marca)
+            return
+        os.remove(propia)
+        log.advertencia(f"Ciclo {ciclo}: marca de publicación vencida, se retoma la publicación")
+
+    @staticmethod
+    def _numero(nombre):
+        return nombre.split("@", 1)[0].split("_", 1)[1]
+
+    def _tomados(self, ciclo, nodo):
+        sufijo = "@" + _nombre_seguro(nodo)
+        return [n for n in os.listdir(self._dir(ciclo, "tomado")) if n.endswith(sufijo)]
+
+    def tomar(self, ciclo, nodo, n, lease=LEASE_SEGUNDOS):
+        sufijo = "@" + _nombre_seguro(nodo)
+        pendiente, tomado = self._dir(ciclo, "pendiente"), self._dir(ciclo, "tomado")
+        numeros = []
+        for nombre in sorted(os.listdir(pendiente)):
+            if len(numeros) >= n:
+                return numeros
+            try:
+                os.rename(os.path.join(pendiente, nombre), os.path.join(tomado, nombre + sufijo))
+            except FileNotFoundError:
+                continue  # otro nodo lo tomó primero
+            numeros.append(self._numero(nombre))
+
+        # Leases vencidos de nodos caídos
+        vencimiento = time.time() - lease
+        for nombre in sorted(os.listdir(tomado)):
+            if len(numeros) >= n:
+                break
+            origen = os.path.join(tomado, nombre)
+            try:
+                if os.path.getmtime(origen) >= vencimiento:
+                    continue
+                numero = self._numero(nombre)
+                if os.path.exists(self._dir(ciclo, os.path.join("hecho", f"{numero}.json"))):
+                    os.remove(origen)
+                    continue
+                destino = os.path.join(tomado, nombre.split("@", 1)[0] + sufijo)
+                os.rename(origen, destino)
+                os.utime(destino)
+            except FileNotFoundError:
+                continue
+            log.advertencia(f"Lease vencido de {nombre.split('@', 1)[1]}: {numero} retomado")
+            numeros.append(numero)
+        return numeros
+
+    def renovar(self, ciclo, nodo, numeros, lease=LEASE_SEGUNDOS):
+        if not numeros:
+            return
+        propios = set(numeros)
+        tomado = self._dir(ciclo, "tomado")
+        for nombre in self._tomados(ciclo, nodo):
+            if self._numero(nombre) in propios:
+                try:
+                    os.utime(os.path.join(tomado, nombre))
+                except FileNotFoundError:
+                    pass
+
+    def completar(self, ciclo, nodo, numero, actes, error=None):
+        self._escribir_atomico(self._dir(ciclo, os.path.join("hecho", f"{numero}.json")), {
+            "numero": numero,
+            "nodo": nodo,
+            "actes": [list(a) for a in actes],
+            "error": error,
+        })
+        tomado = self._dir(ciclo, "tomado")
+        for nombre in self._tomados(ciclo, nodo):
+            if self._numero(nombre) == numero:
+                try:
+                    os.remove(os.path.join(tomado, nombre))
+                except FileNotFoundError:
+                    pass
+
+    def estado(self, ciclo):
+        with open(self._dir(ciclo, "meta.json"), encoding="utf-8") as f:
+            total = json.load(f)["total"]
+        hechos = sum(1 for n in os.listdir(self._dir(ciclo, "hecho")) if n.endswith(".json"))
+        return total, hechos
+
+    def resultados(self, ciclo):
+        hecho = self._dir(ciclo, "hecho")
+        registros = {}
+        for nombre in os.listdir(hecho):
+            if not nombre.endswith(".json"):
+                continue
+            with open(os.path.join(hecho, nombre), encoding="utf-8") as f:
+                reg = json.load(f)
+            registros[reg["numero"]] = reg
+        with open(self._dir(ciclo, "meta.json"), encoding="utf-8") as f:
+            orden = json.load(f).get("procesos") or sorted(registros)
+        actes, errors = [], []
+        for numero in orden:
+            reg = registros.get(numero)
+            if reg is None:
+                continue
+            actes.extend(tuple(a) for a in reg["actes"])
+            if reg.get("error"):
+                errors.append((numero, reg["error"]))
+        return actes, errors
+
+    def reclamar_cierre(self, ciclo, nodo):
+        try:
+            fd = os.open(self._dir(ciclo, "cierre"), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        os.write(fd, str(nodo).encode("utf-8"))
+        os.close(fd)
+        return True
+
+
+def nueva_cola(backend=COORDINACION, directorio=COORDINACION_DIR):
+    if backend == "sqlite":
+        return ColaSQLite(directorio)
+    if backend == "archivos":
+        return ColaArchivos(directorio)
+    raise ValueError(f"Backend de coordinación desconocido: {backend!r}")
+
+
+# ========== VISTA DE UN NODO ==========
+
+class ColaNodo:
+    """
+    Cola de un nodo sobre la cola compartida. Se usa en lugar de la Queue
+    local de _ejecutar_hilos (get/task_done) y del Journal (registrar):
+
+    - get() devuelve la próxima radicación arrendada, o None cuando ya no
+      queda nada pendiente en ningún nodo.
+    - registrar() guarda el resultado en la cola compartida.
+    - Un hilo de heartbeat renueva los leases de lo que el nodo tiene tomado.
+    """
+
+    def __init__(self, cola, ciclo, nodo=NODO_ID, lote=1, lease=LEASE_SEGUNDOS):
+        self.cola = cola
+        self.ciclo = ciclo
+        self.nodo = nodo
+        self.lote = max(1, lote)
+        self.lease = lease
+        self._buffer = deque()
+        self._tomados = set()
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._heartbeat = threading.Thread(target=self._latir, name="heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def _latir(self):
+        while not self._detener.wait(self.lease / 3):
+            with self._lock:
+                numeros = list(self._tomados)
+            try:
+                self.cola.renovar(self.ciclo, self.nodo, numeros, self.lease)
+            except Exception as e:
+                log.advertencia(f"Heartbeat de coordinación falló: {e}")
+
+    def _tomar(self, n):
+        numeros = self.cola.tomar(self.ciclo, self.nodo, n, self.lease)
+        self._tomados.update(numeros)
+        return numeros
+
+    def get(self):
+        while True:
+            with self._lock:
+                if not self._buffer:
+                    self._buffer.extend(self._tomar(self.lote))
+                if self._buffer:
+                    return self._buffer.popleft()
+                total, hechos = self.cola.estado(self.ciclo)
+                if hechos >= total:
+                    return None
+            # Lo que falta lo tienen otros hilos o nodos: esperar a que terminen o venzan
+            log.debug("Coordinación: %d procesos sin terminar, esperando...", total - hechos)
+            time.sleep(ESPERA_OTROS)
+
+    def task_done(self):
+        pass
+
+    def lotes(self, n):
+        """Lotes de hasta n radicaciones (para el motor asíncrono)."""
+        while True:
+            with self._lock:
+                numeros = self._tomar(n)
+                if not numeros:
+                    total, hechos = self.cola.estado(self.ciclo)
+                    if hechos >= total:
+                        return
+            if numeros:
+                yield numeros
+            else:
+                time.sleep(ESPERA_OTROS)
+
+    def registrar(self, numero, actes, error=None):
+        self.cola.completar(self.ciclo, self.nodo, numero, actes, error)
+        with self._lock:
+            self._tomados.discard(numero)
+
+    def cerrar(self):
+        self._detener.set()
+        self._heartbeat.join(timeout=5)
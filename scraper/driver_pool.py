@@ -0,0 +1,219 @@
+# scraper/driver_pool.py
+"""
+Pool persistente de drivers de Chrome.
+
+- checkout(): presta un driver a un hilo y lo devuelve al terminar.
+- Antes de cada préstamo se verifica que la sesión responda; una sesión
+  muerta o colgada se reemplaza automáticamente.
+- Cada navegador se recicla tras DRIVER_MAX_TAREAS procesos o cuando su
+  árbol de procesos supera DRIVER_MAX_MEMORIA_MB.
+
+El pool sobrevive entre iteraciones del scheduler en main(), así el arranque
+en frío de Chrome sobre TOR no se paga cada noche.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from queue import Queue
+
+from .config import (NUM_THREADS, DRIVER_MAX_TAREAS, DRIVER_MAX_MEMORIA_MB, DRIVER_PROBE_TIMEOUT,
+                     DRIVER_ARRANQUE_PARALELO)
+from .browser import new_chrome_driver, ruta_chromedriver
+from . import perfiles
+from .metricas import METRICAS
+from .logger import log
+
+# Errores de Selenium que indican que la sesión ya no sirve
+SESION_MUERTA = ("invalid session id", "session deleted", "disconnected",
+                 "no such window", "chrome not reachable", "target window already closed")
+
+
+def es_sesion_muerta(exc):
+    """True si la excepción indica que el navegador murió o perdió la sesión."""
+    texto = str(exc).lower()
+    return any(k in texto for k in SESION_MUERTA)
+
+
+def _rss_arbol_mb(pid):
+    """Memoria residente (MB) del proceso y todos sus descendientes. Solo Linux."""
+    if not pid or not os.path.isdir("/proc"):
+        return 0
+    hijos = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", encoding="utf-8") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            hijos.setdefault(ppid, []).append(int(entry))
+        except (OSError, ValueError, IndexError):
+            continue
+    total_kb = 0
+    pendientes = [pid]
+    while pendientes:
+        actual = pendientes.pop()
+        try:
+            with open(f"/proc/{actual}/status", encoding="utf-8") as f:
+                for linea in f:
+                    if linea.startswith("VmRSS:"):
+                        total_kb += int(linea.split()[1])
+                        break
+        except OSError:
+            pass
+        pendientes.extend(hijos.get(actual, []))
+    return total_kb // 1024
+
+
+class _Slot:
+    def __init__(self, slot_id):
+        self.id = slot_id
+        self.driver = None
+        self.tareas = 0
+
+
+class DriverPool:
+    def __init__(self, size=NUM_THREADS, factory=new_chrome_driver,
+                 max_tareas=DRIVER_MAX_TAREAS, max_memoria_mb=DRIVER_MAX_MEMORIA_MB,
+                 probe_timeout=DRIVER_PROBE_TIMEOUT, fleet=None):
+        self.size = size
+        self.fleet = fleet
+        self.factory = factory
+        self.max_tareas = max_tareas
+        self.max_memoria_mb = max_memoria_mb
+        self.probe_timeout = probe_timeout
+        self._slots = [_Slot(i) for i in range(size)]
+        self._libres = Queue()
+        for slot in self._slots:
+            self._libres.put(slot)
+        self._probe = ThreadPoolExecutor(max_workers=max(1, size), thread_name_prefix="probe")
+        self._lock = threading.Lock()
+        self.reinicios = 0
+
+    # ========== CICLO DE VIDA ==========
+
+    def iniciar(self):
+        """
+        Crea los drivers que falten (al primer uso o tras un cierre), hasta
+        DRIVER_ARRANQUE_PARALELO a la vez. Si alguno falla, los demás quedan
+        en el pool y se propaga el primer error.
+        """
+        perfiles.limpiar_antiguos()
+        faltantes = [slot for slot in self._slots if slot.driver is None]
+        if not faltantes:
+            return
+        # chromedriver se resuelve una vez, antes de arrancar en paralelo
+        ruta_chromedriver()
+        t0 = time.time()
+        paralelo = max(1, min(DRIVER_ARRANQUE_PARALELO, len(faltantes)))
+        with ThreadPoolExecutor(max_workers=paralelo, thread_name_prefix="arranque") as ex:
+            futuros = [ex.submit(self._crear, slot) for slot in faltantes]
+        errores = [f.exception() for f in futuros if f.exception() is not None]
+        log.info(f"Pool: {len(faltantes) - len(errores)}/{len(faltantes)} drivers listos en "
+                 f"{time.time() - t0:.1f}s ({paralelo} en paralelo)")
+        if errores:
+            raise errores[0]
+
+    def cerrar(self):
+        """Cierra todos los drivers del pool."""
+        for slot in self._slots:
+            self._descartar(slot)
+        log.exito("Pool de drivers cerrado")
+
+    def _crear(self, slot):
+        t0 = time.time()
+        slot.driver = self.factory(slot.id)
+        slot.tareas = 0
+        segundos = time.time() - t0
+        METRICAS.observar("arranque_driver_segundos", segundos)
+        log.evento("arranque_driver", slot=slot.id, segundos=round(segundos, 3))
+        log.debug("Driver %s listo en %.1fs", slot.id, segundos)
+
+    def _descartar(self, slot):
+        driver, slot.driver = slot.driver, None
+        if driver is None:
+            return
+        try:
+            fut = self._probe.submit(driver.quit)
+            fut.result(timeout=self.probe_timeout)
+        except Exception as e:
+            log.debug("Driver %s: quit falló (%s), matando proceso", slot.id, e)
+            try:
+                driver.service.process.kill()
+            except Exception:
+                pass
+        perfiles.liberar(getattr(driver, "perfil", None))
+
+    def reemplazar(self, slot, motivo):
+        log.advertencia(f"Driver {slot.id}: reemplazando ({motivo})")
+        self._descartar(slot)
+        with self._lock:
+            self.reinicios += 1
+        METRICAS.incrementar("reinicios_driver")
+        self._crear(slot)
+
+    # ========== SALUD ==========
+
+    def esta_vivo(self, driver):
+        """Un round-trip barato con límite de tiempo; detecta sesiones muertas o colgadas."""
+        try:
+            fut = self._probe.submit(driver.execute_script, "return document.readyState")
+            fut.result(timeout=self.probe_timeout)
+            return True
+        except FutureTimeout:
+            log.debug("Probe de driver sin respuesta (colgado)")
+            return False
+        except Exception as e:
+            log.debug("Probe de driver falló: %s", e)
+            return False
+
+    def memoria_mb(self, driver):
+        try:
+            return _rss_arbol_mb(driver.service.process.pid)
+        except Exception:
+            return 0
+
+    def _revisar(self, slot):
+        if slot.driver is None:
+            self._crear(slot)
+            return
+        if not self.esta_vivo(slot.driver):
+            self.reemplazar(slot, "sesión muerta")
+            return
+        if self.fleet is not None and not self.fleet.asignacion_sana(slot.id):
+            self.reemplazar(slot, "instancia TOR no sana")
+            return
+        if self.max_tareas and slot.tareas >= self.max_tareas:
+            self.reemplazar(slot, f"{slot.tareas} procesos")
+            return
+        if self.max_memoria_mb:
+            mem = self.memoria_mb(slot.driver)
+            if mem > self.max_memoria_mb:
+                self.reemplazar(slot, f"memoria {mem} MB")
+
+    # ========== PRÉSTAMO ==========
+
+    @contextmanager
+    def checkout(self):
+        """
+        Presta un driver sano. Si la tarea lanza una excepción de sesión
+        muerta, el driver se reemplaza al devolverlo.
+        """
+        slot = self._libres.get()
+        try:
+            self._revisar(slot)
+            yield slot.driver
+            slot.tareas += 1
+        except Exception as e:
+            slot.tareas += 1
+            if es_sesion_muerta(e):
+                # Se descarta ya; el próximo checkout crea uno nuevo
+                log.advertencia(f"Driver {slot.id}: sesión perdida durante la tarea")
+                self._descartar(slot)
+                with self._lock:
+                    self.reinicios += 1
+                METRICAS.incrementar("reinicios_driver")
+            raise
+        finally:
+            self._libres.put(slot)
@@ -0,0 +1,103 @@
+# scraper/entregas.py
+"""
+Registro de actuaciones entregadas por correo (SQLite en output/).
+
+Con DIAS_BUSQUEDA > 1 (o con la fecha de corte ampliada tras un día
+saltado) las mismas actuaciones aparecen en ciclos consecutivos. El
+reporte solo lleva las que todavía no se entregaron:
+
+- pendientes(actes) registra las actuaciones del ciclo y devuelve todas
+  las que no se han entregado, incluidas las de ciclos anteriores cuyo
+  correo falló;
+- marcar(filas) las da por entregadas una vez enviado el correo.
+
+Es independiente de state_store: aquel decide qué se extrae del sitio,
+este qué ya recibió el destinatario.
+"""
+import sqlite3
+import threading
+from datetime import datetime
+
+from .config import ENTREGAS_DB_PATH
+from .state_store import clave_actuacion
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS entregas (
+    numero      TEXT NOT NULL,
+    clave       TEXT NOT NULL,
+    fecha       TEXT NOT NULL,
+    actuacion   TEXT NOT NULL,
+    anotacion   TEXT NOT NULL,
+    url         TEXT,
+    registrada  TEXT NOT NULL,
+    entregada   TEXT,
+    PRIMARY KEY (numero, clave)
+);
+CREATE INDEX IF NOT EXISTS entregas_pendientes ON entregas (entregada, numero);
+"""
+
+
+class Entregas:
+    def __init__(self, path=ENTREGAS_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(ESQUEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def pendientes(self, actes):
+        """
+        Registra las actuaciones del ciclo y retorna (pendientes, omitidas):
+        pendientes: (numero, fecha, actuacion, anotacion, url) sin entregar,
+        ordenadas por radicación; omitidas: cuántas de `actes` ya se habían
+        entregado antes.
+        """
+        ahora = datetime.now().isoformat(timespec="seconds")
+        omitidas = 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for numero, fecha, actu, anota, url in actes:
+                    clave = clave_actuacion(fecha, actu, anota)
+                    cur = self._conn.execute(
+                        """INSERT OR IGNORE INTO entregas
+                           (numero, clave, fecha, actuacion, anotacion, url, registrada)
+                           VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                        (numero, clave, str(fecha), actu, anota, url, ahora)
+                    )
+                    if not cur.rowcount and self._conn.execute(
+                            "SELECT entregada FROM entregas WHERE numero = ? AND clave = ?",
+                            (numero, clave)).fetchone()[0]:
+                        omitidas += 1
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            filas = self._conn.execute(
+                """SELECT numero, fecha, actuacion, anotacion, COALESCE(url, '') FROM entregas
+                   WHERE entregada IS NULL ORDER BY numero, rowid"""
+            ).fetchall()
+        return filas, omitidas
+
+    def marcar(self, filas):
+        """Da por entregadas las actuaciones (numero, fecha, actuacion, anotacion, url)."""
+        ahora = datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "UPDATE entregas SET entregada = ? WHERE numero = ? AND clave = ?",
+                ((ahora, numero, clave_actuacion(fecha, actu, anota))
+                 for numero, fecha, actu, anota, _url in filas)
+            )
+            self._conn.execute("COMMIT")
+
+    def purgar(self, antes_de):
+        """Borra actuaciones con fecha anterior a la dada."""
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM entregas WHERE fecha < ?", (antes_de.isoformat(),))
+        return cur.rowcount
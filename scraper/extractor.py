@@ -0,0 +1,116 @@
+# scraper/extractor.py
+"""
+Extracción de tablas en bloque.
+
+TABLAS_JS serializa todas las tablas de la página a JSON con un solo
+execute_script, en lugar de ~4 round-trips de WebDriver por fila
+(find_elements de las celdas + .text de cada una). El parseo y el filtro
+por fecha se hacen en Python.
+
+Lo usan worker_task y ConsultaProcesosPage.
+"""
+from datetime import datetime
+
+# Cada tabla: lista de filas (tbody tr); cada fila: lista de [texto, texto_boton]
+# por celda td, limitada a las primeras `maxCeldas` celdas.
+TABLAS_JS = r"""
+var maxCeldas = arguments[0] || 3;
+var salida = [];
+var tablas = document.querySelectorAll('table');
+for (var i = 0; i < tablas.length; i++) {
+    var filas = [];
+    var trs = tablas[i].querySelectorAll('tbody tr');
+    for (var j = 0; j < trs.length; j++) {
+        var tds = trs[j].querySelectorAll('td');
+        var celdas = [];
+        for (var k = 0; k < tds.length && k < maxCeldas; k++) {
+            var boton = tds[k].querySelector('button');
+            celdas.push([
+                (tds[k].innerText || '').trim(),
+                boton ? (boton.innerText || '').trim() : null
+            ]);
+        }
+        filas.push(celdas);
+    }
+    salida.push(filas);
+}
+return salida;
+"""
+
+# Click en el botón de la celda `celda` de la primera fila de la tabla `tabla`
+CLICK_BOTON_JS = r"""
+var tabla = document.querySelectorAll('table')[arguments[0]];
+if (!tabla) return false;
+var fila = tabla.querySelector('tbody tr');
+if (!fila) return false;
+var td = fila.querySelectorAll('td')[arguments[1]];
+var boton = td ? td.querySelector('button') : null;
+if (!boton) return false;
+boton.click();
+return true;
+"""
+
+# True si ya hay una tabla cuyas filas empiezan con una fecha (detalle cargado)
+HAY_ACTUACIONES_JS = r"""
+var filas = document.querySelectorAll('table tbody tr');
+for (var i = 0; i < filas.length; i++) {
+    var td = filas[i].querySelector('td');
+    if (td && /^\s*\d{4}-\d{2}-\d{2}\s*$/.test(td.innerText || '')) return true;
+}
+return false;
+"""
+
+
+def extraer_tablas(driver, max_celdas=3):
+    """Todas las tablas de la página en un solo round-trip."""
+    return driver.execute_script(TABLAS_JS, max_celdas) or []
+
+
+def parse_fecha(texto):
+    try:
+        return datetime.strptime(texto.strip(), "%Y-%m-%d").date()
+    except (ValueError, AttributeError):
+        return None
+
+
+def fila_resultado(tablas):
+    """
+    Primera fila de la tabla de resultados (la primera tabla con filas).
+    Retorna (indice_tabla, texto_fecha) o None. La fecha de última
+    actuación es el botón de la tercera celda.
+    """
+    for i, filas in enumerate(tablas):
+        if not filas:
+            continue
+        celdas = filas[0]
+        if len(celdas) >= 3 and celdas[2][1]:
+            return i, celdas[2][1]
+        return None
+    return None
+
+
+def hay_actuaciones(driver):
+    """Condición de espera del detalle: la tabla de actuaciones ya está en la página."""
+    return bool(driver.execute_script(HAY_ACTUACIONES_JS))
+
+
+def click_fecha(driver, indice_tabla):
+    """Abre el detalle del proceso (botón de fecha de la primera fila)."""
+    return driver.execute_script(CLICK_BOTON_JS, indice_tabla, 2)
+
+
+def parse_actuaciones(tablas, cutoff):
+    """
+    Actuaciones (fecha, actuacion, anotacion) con fecha >= cutoff.
+    Se toma la primera tabla cuyas filas empiezan con una fecha; las filas
+    sin fecha válida (encabezados, mensajes) se ignoran.
+    """
+    for filas in tablas:
+        actuaciones = [
+            (celdas[0][0], celdas[1][0], celdas[2][0])
+            for celdas in filas
+            if len(celdas) >= 3 and parse_fecha(celdas[0][0]) is not None
+        ]
+        if actuaciones:
+            return [a for a in actuaciones if parse_fecha(a[0]) >= cutoff]
+    return []
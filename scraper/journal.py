@@ -0,0 +1,146 @@
+# scraper/journal.py
+"""
+Journal de escritura anticipada (write-ahead) del ciclo.
+
+Cada radicación terminada se agrega como una línea JSON a
+output/journal_<fecha>.jsonl, con flush + fsync, junto con las actuaciones
+extraídas o el error final. Si el contenedor se reinicia a mitad del ciclo,
+ejecutar_ciclo lee el journal del mismo día, vuelve a escanear solo lo que
+faltaba y genera el reporte con todo.
+"""
+import glob
+import json
+import os
+import threading
+import time
+from datetime import date, timedelta
+
+from .config import OUTPUT_DIR
+from .logger import log
+
+PREFIJO = "journal_"
+
+
+class EstadoJournal:
+    """Contenido recuperado de un journal existente."""
+
+    def __init__(self):
+        self.start_ts = None
+        self.total = 0
+        self.cutoff = None
+        self.completados = set()
+        self.actes = []
+        self.errors = []
+        self.finalizado = False
+
+
+class Journal:
+    def __init__(self, fecha=None, directorio=OUTPUT_DIR):
+        self.fecha = fecha or date.today()
+        self.directorio = directorio
+        self.path = os.path.join(directorio, f"{PREFIJO}{self.fecha.isoformat()}.jsonl")
+        self._lock = threading.Lock()
+        self._f = None
+
+    # ========== LECTURA ==========
+
+    def cargar(self):
+        """
+        Lee el journal del día. Retorna EstadoJournal, o None si no existe.
+        Una última línea truncada (caída a mitad de escritura) se ignora.
+        """
+        if not os.path.exists(self.path):
+            return None
+        estado = EstadoJournal()
+        with open(self.path, encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    reg = json.loads(linea)
+                except ValueError:
+                    log.advertencia(f"Journal: línea incompleta ignorada en {self.path}")
+                    continue
+                tipo = reg.get("tipo")
+                if tipo == "inicio":
+                    estado.start_ts = reg["start_ts"]
+                    estado.total = reg.get("total", 0)
+                    estado.cutoff = date.fromisoformat(reg["cutoff"]) if reg.get("cutoff") else None
+                elif tipo == "proceso":
+                    numero = reg["numero"]
+                    if numero in estado.completados:
+                        continue
+                    estado.completados.add(numero)
+                    estado.actes.extend(tuple(a) for a in reg.get("actes", []))
+                    if reg.get("error"):
+                        estado.errors.append((numero, reg["error"]))
+                elif tipo == "fin":
+                    estado.finalizado = True
+        return estado
+
+    def pendiente(self):
+        """True si hay un ciclo de esta fecha empezado y sin terminar."""
+        estado = self.cargar()
+        return estado is not None and not estado.finalizado
+
+    # ========== ESCRITURA ==========
+
+    def _escribir(self, registro):
+        linea = json.dumps(registro, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._f is None:
+                self._f = open(self.path, "a", encoding="utf-8")
+                # Si la caída dejó una línea a medias, se cierra antes de seguir
+                if self._f.tell() and not self._termina_en_salto():
+                    self._f.write("\n")
+            self._f.write(linea)
+            self._f.flush()
+            os.fsync(self._f.fileno())
+
+    def _termina_en_salto(self):
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def iniciar(self, start_ts, total, cutoff=None):
+        """Empieza un journal nuevo para la fecha (descarta uno anterior)."""
+        self.cerrar()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self._escribir({
+            "tipo": "inicio",
+            "start_ts": start_ts,
+            "total": total,
+            "cutoff": cutoff.isoformat() if cutoff else None,
+        })
+
+    def registrar(self, numero, actes, error=None):
+        """Marca una radicación como terminada, con sus actuaciones o su error."""
+        self._escribir({
+            "tipo": "proceso",
+            "numero": numero,
+            "ts": time.time(),
+            "actes": [list(a) for a in actes],
+            "error": error,
+        })
+
+    def finalizar(self):
+        """Marca el ciclo como completo (reporte generado) y cierra el archivo."""
+        self._escribir({"tipo": "fin", "ts": time.time()})
+        self.cerrar()
+        self.limpiar_antiguos()
+
+    def cerrar(self):
+        with self._lock:
+            if self._f is not None:
+                self._f.close()
+                self._f = None
+
+    def limpiar_antiguos(self, dias=7):
+        """Borra journals de más de `dias` días."""
+        limite = (self.fecha - timedelta(days=dias)).isoformat()
+        for path in glob.glob(os.path.join(self.directorio, f"{PREFIJO}*.jsonl")):
+            fecha = os.path.basename(path)[len(PREFIJO):-len(".jsonl")]
+            if fecha < limite:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    log.debug("No se pudo borrar %s: %s", path, e)
@@ -1,11 +1,155 @@
-import pandas as pd
-from .config import EXCEL_PATH
-
-def cargar_procesos():
-    df = pd.read_excel(
-        EXCEL_PATH,
-        sheet_name="CONSULTA UNIFICADA DE PROCESOS",
-        usecols="B"
-    )
-    procesos = [str(x).zfill(23) for x in df.iloc[:, 0] if pd.notna(x)]
+# scraper/loader.py
+"""
+Carga de la lista de radicaciones desde el libro de Excel.
+
+- Lee solo la columna B de la hoja con openpyxl en modo read-only (streaming),
+  sin cargar el libro completo.
+- Normaliza y valida cada número (23 dígitos, código de departamento DANE).
+  Los números que Excel guardó como float (ej. 1.10013103010201e+22) perdieron
+  dígitos y se rechazan en lugar de rellenarse con ceros.
+- Elimina duplicados conservando el orden.
+- Guarda la lista en un archivo auxiliar en output/, con el mtime, tamaño y
+  sha256 del libro; mientras el libro no cambie no se vuelve a parsear.
+"""
+import hashlib
+import json
+import os
+import re
+
+from openpyxl import load_workbook
+
+from .config import EXCEL_PATH, OUTPUT_DIR
+from .logger import log
+
+HOJA = "CONSULTA UNIFICADA DE PROCESOS"
+LONGITUD = 23
+# Versión del formato del archivo auxiliar (cambiarla invalida las cachés)
+VERSION_CACHE = 1
+
+# Códigos DANE de departamento (dos primeros dígitos de la radicación)
+DEPARTAMENTOS = {
+    "05", "08", "11", "13", "15", "17", "18", "19", "20", "23", "25", "27", "41",
+    "44", "47", "50", "52", "54", "63", "66", "68", "70", "73", "76", "81", "85",
+    "86", "88", "91", "94", "95", "97", "99",
+}
+
+_NO_DIGITOS = re.compile(r"[\s.\-_/]")
+
+
+def normalizar(valor):
+    """
+    Retorna (numero, motivo): el número de 23 dígitos, o None y el motivo
+    del rechazo. Un número guardado como entero puede haber perdido el
+    cero inicial (departamentos 05 y 08); ese caso se rellena.
+    """
+    if isinstance(valor, bool):
+        return None, "valor no numérico"
+    if isinstance(valor, float):
+        if valor.is_integer() and abs(valor) < 2 ** 53:
+            valor = int(valor)
+        else:
+            return None, "guardado como número decimal (perdió dígitos)"
+    if isinstance(valor, int):
+        texto = str(valor).zfill(LONGITUD)
+    else:
+        texto = _NO_DIGITOS.sub("", str(valor))
+        if texto.isdigit() and len(texto) == LONGITUD - 1 and ("0" + texto[:1]) in ("05", "08"):
+            texto = "0" + texto
+    if not texto.isdigit():
+        return None, "contiene caracteres no numéricos"
+    if len(texto) != LONGITUD:
+        return None, f"tiene {len(texto)} dígitos"
+    if texto[:2] not in DEPARTAMENTOS:
+        return None, f"código de departamento inválido ({texto[:2]})"
+    return texto, None
+
+
+def _leer_columna(path):
+    """Valores de la columna B de la hoja (sin el encabezado)."""
+    wb = load_workbook(path, read_only=True, data_only=True, keep_vba=False)
+    try:
+        ws = wb[HOJA]
+        filas = ws.iter_rows(min_row=2, min_col=2, max_col=2, values_only=True)
+        return [fila[0] for fila in filas if fila and fila[0] not in (None, "")]
+    finally:
+        wb.close()
+
+
+def _sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def _ruta_cache(path):
+    return os.path.join(OUTPUT_DIR, os.path.basename(path) + ".procesos.json")
+
+
+def _leer_cache(ruta):
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return cache if cache.get("version") == VERSION_CACHE else None
+
+
+def _guardar_cache(ruta, cache):
+    tmp = ruta + ".tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False)
+        os.replace(tmp, ruta)
+    except OSError as e:
+        log.debug("No se pudo guardar la caché de procesos: %s", e)
+
+
+def parsear(path):
+    """Lee, normaliza y deduplica. Retorna (procesos, rechazados, duplicados)."""
+    procesos, vistos, rechazados, duplicados = [], set(), [], 0
+    for valor in _leer_columna(path):
+        numero, motivo = normalizar(valor)
+        if numero is None:
+            rechazados.append([str(valor), motivo])
+        elif numero in vistos:
+            duplicados += 1
+        else:
+            vistos.add(numero)
+            procesos.append(numero)
+    return procesos, rechazados, duplicados
+
+
+def cargar_procesos(path=EXCEL_PATH):
+    st = os.stat(path)
+    ruta_cache = _ruta_cache(path)
+    cache = _leer_cache(ruta_cache)
+
+    if cache and cache["mtime"] == st.st_mtime and cache["size"] == st.st_size:
+        log.debug("Procesos desde caché (%d)", len(cache['procesos']))
+        return cache["procesos"]
+
+    sha = _sha256(path)
+    if cache and cache["sha256"] == sha:
+        # Mismo contenido con otro mtime (copiado o tocado): se renueva la clave
+        cache.update(mtime=st.st_mtime, size=st.st_size)
+        _guardar_cache(ruta_cache, cache)
+        return cache["procesos"]
+
+    procesos, rechazados, duplicados = parsear(path)
+    log.info(f"Procesos cargados de {os.path.basename(path)}: {len(procesos)} "
+             f"({duplicados} duplicados, {len(rechazados)} rechazados)")
+    for valor, motivo in rechazados:
+        log.advertencia(f"Radicación rechazada {valor!r}: {motivo}")
+
+    _guardar_cache(ruta_cache, {
+        "version": VERSION_CACHE,
+        "mtime": st.st_mtime,
+        "size": st.st_size,
+        "sha256": sha,
+        "procesos": procesos,
+        "rechazados": rechazados,
+        "duplicados": duplicados,
+    })
     return procesos
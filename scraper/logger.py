@@ -1,10 +1,45 @@
 # scraper/logger.py
+"""
+Logger del scraper.
+
+Los métodos (log.resultado, log.error, log.debug, ...) no escriben nada:
+arman un LogRecord con el mensaje sin formatear y lo ponen en una cola.
+Un único hilo ("logging") la vacía y escribe consola, log completo,
+resultados, errores y el CSV de actuaciones:
+
+- el formato (colores ANSI, emoji, hora) se aplica en ese hilo, y solo si
+  el nivel está habilitado (LOG_NIVEL); los mensajes aceptan argumentos
+  estilo %, p. ej. log.debug("Tabla con %d filas", n), que también se
+  formatean allá;
+- los archivos quedan abiertos y se vacían cada LOG_FLUSH_SEGUNDOS (los
+  errores, enseguida);
+- el log completo rota por tamaño (LOG_MAX_MB, LOG_RESPALDOS);
+- cada línea lleva el contexto del worker que la generó (log.contexto).
+
+Además de las líneas para humanos, log.evento() escribe eventos
+estructurados (JSON, uno por línea) en eventos_<ejecución>.jsonl: etapas,
+reintentos, modales, renovaciones TOR y procesos terminados, con la
+ejecución, el ciclo y el contexto (worker, radicación, puerto de control).
+python -m scraper.analisis los resume.
+
+log.cerrar() escribe lo pendiente; se registra con atexit.
+"""
+import atexit
+import contextvars
+import csv
+import json
 import logging
+import logging.handlers
 import os
+import queue
 import sys
-import csv
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
 
+from .config import LOG_DIR, LOG_NIVEL, LOG_MAX_MB, LOG_RESPALDOS, LOG_FLUSH_SEGUNDOS, LOG_EVENTOS
+
 
 # Colores ANSI para consola
 class Colors:
@@ -22,46 +57,280 @@ class Colors:
     MAGENTA = '\033[95m'
 
 
+# estilo -> (color en consola, prefijo)
+ESTILOS = {
+    'titulo': (Colors.BOLD + Colors.WHITE, ''),
+    'resultado': (Colors.GREEN + Colors.BOLD, '📊 '),
+    'progreso': (Colors.CYAN, '🔄 '),
+    'proceso': (Colors.WHITE, '📋 '),
+    'accion': (Colors.BLUE, '🖱️ '),
+    'exito': (Colors.GREEN, '✅ '),
+    'advertencia': (Colors.YELLOW, '⚠️ '),
+    'error': (Colors.RED, '❌ '),
+    'info': (Colors.CYAN, '📌 '),
+    'separador': (Colors.GRAY, ''),
+    'tor': ('', '🌐 '),
+    'debug': ('', '🔧 '),
+    'detalle': ('', '📋 '),
+}
+
+# Máximo de registros que el hilo de logging procesa por vuelta
+LOTE = 1000
+
+# Contexto del worker actual (se hereda en las tareas de asyncio)
+_contexto = contextvars.ContextVar('log_contexto', default={})
+# Campos del contexto que se anteponen a las líneas para humanos (el resto va solo a los eventos)
+PREFIJO_CONTEXTO = ('worker', 'radicacion')
+# Registros que no son líneas de log
+NO_LINEAS = ('actuacion', 'evento')
+
+
+def _texto(record):
+    """Mensaje del registro con el prefijo del estilo (y la línea extra de los títulos)."""
+    estilo = getattr(record, 'estilo', '')
+    mensaje = record.getMessage()
+    if estilo == 'titulo':
+        return f"\n{mensaje}\n{'=' * 50}"
+    return ESTILOS.get(estilo, ('', ''))[1] + mensaje
+
+
+class ArchivoFormatter(logging.Formatter):
+    """Formato del log completo: hora, nivel, contexto y mensaje con su prefijo."""
+
+    def __init__(self):
+        super().__init__('%(asctime)s [%(levelname)s] %(contexto)s%(texto)s', datefmt='%Y-%m-%d %H:%M:%S')
+
+    def formatMessage(self, record):
+        record.texto = _texto(record)
+        return super().formatMessage(record)
+
+
+class CustomFormatter(logging.Formatter):
+    """Formato sin timestamp para consola"""
+
+    def format(self, record):
+        color = ESTILOS.get(getattr(record, 'estilo', ''), ('', ''))[0]
+        texto = record.contexto + _texto(record)
+        return f"{color}{texto}{Colors.END}" if color else texto
+
+
+class _Diferido:
+    """
+    Mezcla para handlers de stream: no vacían en cada registro (lo hace
+    el hilo de logging con vaciar()).
+    """
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        logging.StreamHandler.flush(self)
+
+
+class _Consola(_Diferido, logging.StreamHandler):
+    """
+    Escribe en el sys.stdout vigente, no en el del momento de crearse: quien
+    lo reemplace (pytest, una redirección) puede cerrarlo antes que el hilo
+    de logging termine.
+    """
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, valor):
+        pass
+
+
+class _Archivo(_Diferido, logging.FileHandler):
+    pass
+
+
+class _ArchivoRotativo(_Diferido, logging.handlers.RotatingFileHandler):
+    """
+    Rotación por tamaño sin consultar el archivo en cada registro (la
+    implementación estándar hace seek/tell, lo que vacía el buffer).
+    """
+
+    def __init__(self, filename, maxBytes, backupCount):
+        super().__init__(filename, mode='a', maxBytes=maxBytes, backupCount=backupCount,
+                         encoding='utf-8', delay=True)
+        self._tamano = os.path.getsize(filename) if os.path.exists(filename) else 0
+
+    def emit(self, record):
+        try:
+            linea = self.format(record) + self.terminator
+            if self.maxBytes > 0 and self._tamano and self._tamano + len(linea) > self.maxBytes:
+                self.doRollover()
+                self._tamano = 0
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(linea)
+            self._tamano += len(linea)
+        except Exception:
+            self.handleError(record)
+
+
+class _ArchivoCSV(_Diferido, logging.FileHandler):
+    """CSV de actuaciones: cada registro trae la fila en record.args."""
+
+    ENCABEZADO = ['ID_Ejecucion', 'Fecha_Ejecucion', 'Numero_Proceso', 'Fecha_Actuacion',
+                  'Actuacion', 'Anotacion', 'URL']
+
+    def __init__(self, filename):
+        super().__init__(filename, mode='a', encoding='utf-8', delay=True)
+        self._writer = None
+
+    def emit(self, record):
+        try:
+            if self.stream is None:
+                nuevo = not os.path.isfile(self.baseFilename)
+                self.stream = self._open()
+                self._writer = csv.writer(self.stream)
+                if nuevo:
+                    self._writer.writerow(self.ENCABEZADO)
+            self._writer.writerow(record.args)
+        except Exception:
+            self.handleError(record)
+
+    def _open(self):
+        return open(self.baseFilename, self.mode, newline='', encoding=self.encoding)
+
+
+class _ArchivoEventos(_Diferido, logging.FileHandler):
+    """Eventos estructurados: un objeto JSON por línea."""
+
+    def emit(self, record):
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            evento = {'ts': round(record.created, 3), 'ejecucion': record.ejecucion, 'ciclo': record.ciclo,
+                      'evento': record.msg, **record.campos_contexto, **record.campos}
+            self.stream.write(json.dumps(evento, ensure_ascii=False, default=str) + '\n')
+        except Exception:
+            self.handleError(record)
+
+
+class _Encolador(logging.handlers.QueueHandler):
+    """
+    Pone el registro en la cola tal cual: el mensaje se formatea en el
+    hilo de logging, no en el worker. Aquí solo se copia el contexto.
+    """
+
+    def prepare(self, record):
+        contexto = _contexto.get()
+        record.contexto = ''.join(f"[{contexto[k]}] " for k in PREFIJO_CONTEXTO if k in contexto)
+        record.campos_contexto = contexto
+        return record
+
+
+class _HiloEscritor(threading.Thread):
+    """Vacía la cola hacia los handlers y los vacía a disco por lotes."""
+
+    def __init__(self, cola, handlers, intervalo):
+        super().__init__(name='logging', daemon=True)
+        self.cola = cola
+        self.handlers = handlers
+        self.intervalo = intervalo
+
+    def run(self):
+        ultimo = time.monotonic()
+        fin = False
+        while not fin:
+            lote = []
+            try:
+                lote.append(self.cola.get(timeout=self.intervalo))
+                while len(lote) < LOTE:
+                    lote.append(self.cola.get_nowait())
+            except queue.Empty:
+                pass
+            urgente = False
+            for record in lote:
+                if record is None:
+                    fin = True
+                    continue
+                urgente = urgente or record.levelno >= logging.ERROR
+                for handler in self.handlers:
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+            if fin or urgente or time.monotonic() - ultimo >= self.intervalo:
+                for handler in self.handlers:
+                    handler.vaciar()
+                ultimo = time.monotonic()
+            elif lote:
+                # La consola se vacía en cada vuelta para que se vea al momento
+                self.handlers[0].vaciar()
+
+
+def _filtro_estilo(*estilos):
+    return lambda record: getattr(record, 'estilo', '') in estilos
+
+
+def _sin_estilo(*estilos):
+    return lambda record: getattr(record, 'estilo', '') not in estilos
+
+
 class ScraperLogger:
     def __init__(self):
         self.logger = logging.getLogger('scraper')
-        self.logger.setLevel(logging.DEBUG)
+        self.logger.setLevel(getattr(logging, LOG_NIVEL, logging.DEBUG))
         self.logger.handlers.clear()
+        self.logger.propagate = False
 
         # ========== TIMESTAMP DE LA EJECUCIÓN ==========
         self.execution_id = datetime.now().strftime('%Y%m%d_%H%M%S')
         self.execution_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
         # ========== DIRECTORIO DE LOGS ==========
-        self.logs_dir = "/app/logs"  # Montado en /home/logs
+        self.logs_dir = LOG_DIR  # Montado en /home/logs
         os.makedirs(self.logs_dir, exist_ok=True)
 
-        # ========== ARCHIVO DE LOG COMPLETO ==========
+        # ========== ARCHIVOS ==========
         self.log_file = os.path.join(self.logs_dir, f'scraper_{self.execution_id}.log')
-
-        # Handler para archivo (guarda TODO)
-        file_handler = logging.FileHandler(self.log_file, encoding='utf-8', mode='w')
-        file_handler.setLevel(logging.DEBUG)
-        file_handler.setFormatter(logging.Formatter(
-            '%(asctime)s [%(levelname)s] %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        ))
-        self.logger.addHandler(file_handler)
-
-        # Handler para consola (solo info importante)
-        console = logging.StreamHandler(sys.stdout)
-        console.setLevel(logging.INFO)
-        console.setFormatter(CustomFormatter())
-        self.logger.addHandler(console)
-
-        # ========== REGISTROS SEPARADOS ==========
         self.results_log_path = os.path.join(self.logs_dir, f'resultados_{self.execution_id}.txt')
         self.errors_log_path = os.path.join(self.logs_dir, f'errores_{self.execution_id}.txt')
         self.actuaciones_log_path = os.path.join(self.logs_dir, f'actuaciones_{self.execution_id}.csv')
+        self.events_log_path = os.path.join(self.logs_dir, f'eventos_{self.execution_id}.jsonl')
+        # Ciclo en curso (lo fija ejecutar_ciclo con iniciar_ciclo)
+        self.ciclo = None
 
         # Escribir encabezado
         self._write_header()
 
+        # Consola (solo info importante); va primero: se vacía en cada vuelta
+        console = _Consola()
+        console.setLevel(logging.INFO)
+        console.setFormatter(CustomFormatter())
+        console.addFilter(_sin_estilo(*NO_LINEAS))
+
+        # Log completo (guarda TODO), con rotación por tamaño
+        file_handler = _ArchivoRotativo(self.log_file, int(LOG_MAX_MB * 2 ** 20), LOG_RESPALDOS)
+        file_handler.setFormatter(ArchivoFormatter())
+        file_handler.addFilter(_sin_estilo(*NO_LINEAS))
+
+        # Registros separados
+        simple = logging.Formatter('%(asctime)s - %(message)s', datefmt='%H:%M:%S')
+        resultados = _Archivo(self.results_log_path, encoding='utf-8', delay=True)
+        resultados.setFormatter(simple)
+        resultados.addFilter(_filtro_estilo('resultado'))
+        errores = _Archivo(self.errors_log_path, encoding='utf-8', delay=True)
+        errores.setFormatter(simple)
+        errores.addFilter(_filtro_estilo('error'))
+        actuaciones = _ArchivoCSV(self.actuaciones_log_path)
+        actuaciones.addFilter(_filtro_estilo('actuacion'))
+
+        self._handlers = [console, file_handler, resultados, errores, actuaciones]
+        if LOG_EVENTOS:
+            eventos = _ArchivoEventos(self.events_log_path, encoding='utf-8', delay=True)
+            eventos.addFilter(_filtro_estilo('evento'))
+            self._handlers.append(eventos)
+        self._cola = queue.SimpleQueue()
+        self.logger.addHandler(_Encolador(self._cola))
+        self._hilo = _HiloEscritor(self._cola, self._handlers, LOG_FLUSH_SEGUNDOS)
+        self._hilo.start()
+        atexit.register(self.cerrar)
+
     def _write_header(self):
         with open(self.log_file, 'a', encoding='utf-8') as f:
             f.write(f"{'=' * 80}\n")
@@ -69,98 +338,124 @@ class ScraperLogger:
             f.write(f" Fecha: {self.execution_date}\n")
             f.write(f"{'=' * 80}\n\n")
 
+    def _emitir(self, nivel, estilo, mensaje, args):
+        """Encola el registro sin formatear (nada si el nivel no está habilitado)."""
+        if not self.logger.isEnabledFor(nivel):
+            return
+        record = self.logger.makeRecord(self.logger.name, nivel, '(scraper)', 0, mensaje, args, None,
+                                        extra={'estilo': estilo})
+        self.logger.handle(record)
+
+    def cerrar(self):
+        """Escribe lo que quede en la cola y cierra los archivos."""
+        if self._hilo is None:
+            return
+        self._cola.put(None)
+        self._hilo.join(timeout=10)
+        self._hilo = None
+        for handler in self._handlers:
+            handler.close()
+
+    def iniciar_ciclo(self, start_ts):
+        """Identifica los eventos siguientes con el ciclo que empieza en start_ts."""
+        self.ciclo = datetime.fromtimestamp(start_ts).strftime('%Y%m%d_%H%M%S')
+
+    def evento(self, nombre, /, **campos):
+        """
+        Evento estructurado para eventos_<ejecución>.jsonl (no sale en
+        consola ni en el log completo). Los campos deben ser serializables.
+        """
+        if not LOG_EVENTOS:
+            return
+        record = self.logger.makeRecord(self.logger.name, logging.INFO, '(scraper)', 0, nombre, (), None,
+                                        extra={'estilo': 'evento', 'campos': campos,
+                                               'ejecucion': self.execution_id, 'ciclo': self.ciclo})
+        self.logger.handle(record)
+
+    @contextmanager
+    def contexto(self, **campos):
+        """
+        Agrega campos (p. ej. worker=2, radicacion=...) a las líneas que se
+        escriban dentro del bloque, en este hilo o tarea.
+        """
+        token = _contexto.set({**_contexto.get(), **campos})
+        try:
+            yield
+        finally:
+            _contexto.reset(token)
+
     # ========== MÉTODOS PRINCIPALES ==========
 
-    def titulo(self, mensaje):
+    def titulo(self, mensaje, *args):
         """📌 TÍTULO - Para secciones importantes"""
-        self.logger.info(f"\n{Colors.BOLD}{Colors.WHITE}{mensaje}{Colors.END}")
-        self.logger.info(f"{Colors.GRAY}{'=' * 50}{Colors.END}")
+        self._emitir(logging.INFO, 'titulo', mensaje, args)
 
-    def resultado(self, mensaje):
+    def resultado(self, mensaje, *args):
         """📊 RESULTADOS - Siempre se muestra."""
-        self.logger.info(f"{Colors.GREEN}{Colors.BOLD}📊 {mensaje}{Colors.END}")
-
-        with open(self.results_log_path, 'a', encoding='utf-8') as f:
-            f.write(f"{datetime.now().strftime('%H:%M:%S')} - {mensaje}\n")
+        self._emitir(logging.INFO, 'resultado', mensaje, args)
 
-    def progreso(self, mensaje):
+    def progreso(self, mensaje, *args):
         """🔄 PROGRESO - Avance del scraper."""
-        self.logger.info(f"{Colors.CYAN}🔄 {mensaje}{Colors.END}")
+        self._emitir(logging.INFO, 'progreso', mensaje, args)
 
-    def proceso(self, mensaje):
+    def proceso(self, mensaje, *args):
         """📋 PROCESO - Detalles del proceso actual."""
-        self.logger.info(f"{Colors.WHITE}📋 {mensaje}{Colors.END}")
+        self._emitir(logging.INFO, 'proceso', mensaje, args)
 
-    def accion(self, mensaje):
+    def accion(self, mensaje, *args):
         """🖱️ ACCIÓN - Clicks, navegación, etc."""
-        self.logger.info(f"{Colors.BLUE}🖱️ {mensaje}{Colors.END}")
+        self._emitir(logging.INFO, 'accion', mensaje, args)
 
-    def exito(self, mensaje):
+    def exito(self, mensaje, *args):
         """✅ ÉXITO - Operaciones exitosas."""
-        self.logger.info(f"{Colors.GREEN}✅ {mensaje}{Colors.END}")
+        self._emitir(logging.INFO, 'exito', mensaje, args)
 
-    def advertencia(self, mensaje):
+    def advertencia(self, mensaje, *args):
         """⚠️ ADVERTENCIA - Problemas no críticos."""
-        self.logger.warning(f"{Colors.YELLOW}⚠️ {mensaje}{Colors.END}")
+        self._emitir(logging.WARNING, 'advertencia', mensaje, args)
 
-    def error(self, mensaje):
+    def error(self, mensaje, *args):
         """❌ ERROR - Problemas críticos (siempre se muestra)."""
-        self.logger.error(f"{Colors.RED}❌ {mensaje}{Colors.END}")
+        self._emitir(logging.ERROR, 'error', mensaje, args)
 
-        with open(self.errors_log_path, 'a', encoding='utf-8') as f:
-            f.write(f"{datetime.now().strftime('%H:%M:%S')} - {mensaje}\n")
-
-    def info(self, mensaje):
+    def info(self, mensaje, *args):
         """📌 Información general"""
-        self.logger.info(f"{Colors.CYAN}📌 {mensaje}{Colors.END}")
+        self._emitir(logging.INFO, 'info', mensaje, args)
 
     def separador(self):
         """Línea separadora."""
-        self.logger.info(f"{Colors.GRAY}{'=' * 50}{Colors.END}")
+        self._emitir(logging.INFO, 'separador', '=' * 50, ())
 
     # ========== MÉTODOS PARA ARCHIVO (NO SALEN EN CONSOLA) ==========
 
-    def tor(self, mensaje):
+    def tor(self, mensaje, *args):
         """🌐 TOR - Solo al archivo"""
-        self.logger.debug(f"🌐 {mensaje}")
+        self._emitir(logging.DEBUG, 'tor', mensaje, args)
 
-    def debug(self, mensaje):
+    def debug(self, mensaje, *args):
         """🔧 Debug - Solo al archivo"""
-        self.logger.debug(f"🔧 {mensaje}")
+        self._emitir(logging.DEBUG, 'debug', mensaje, args)
 
-    def detalle(self, mensaje):
+    def detalle(self, mensaje, *args):
         """📋 Detalles técnicos - Solo al archivo"""
-        self.logger.debug(f"📋 {mensaje}")
+        self._emitir(logging.DEBUG, 'detalle', mensaje, args)
 
     # ========== MÉTODOS PARA GUARDAR RESULTADOS ==========
 
     def guardar_actuacion(self, numero, fecha, actuacion, anotacion, url):
         """Guarda una actuación en el archivo CSV de la ejecución."""
-        file_exists = os.path.isfile(self.actuaciones_log_path)
-
-        with open(self.actuaciones_log_path, 'a', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-
-            if not file_exists:
-                writer.writerow([
-                    'ID_Ejecucion',
-                    'Fecha_Ejecucion',
-                    'Numero_Proceso',
-                    'Fecha_Actuacion',
-                    'Actuacion',
-                    'Anotacion',
-                    'URL'
-                ])
-
-            writer.writerow([
-                self.execution_id,
-                self.execution_date,
-                numero,
-                fecha,
-                actuacion.replace('\n', ' ').replace('\r', ''),
-                anotacion.replace('\n', ' ').replace('\r', ''),
-                url
-            ])
+        fila = (
+            self.execution_id,
+            self.execution_date,
+            numero,
+            fecha,
+            actuacion.replace('\n', ' ').replace('\r', ''),
+            anotacion.replace('\n', ' ').replace('\r', ''),
+            url
+        )
+        record = self.logger.makeRecord(self.logger.name, logging.INFO, '(scraper)', 0, 'actuacion',
+                                        fila, None, extra={'estilo': 'actuacion'})
+        self.logger.handle(record)
 
     def guardar_resumen(self, total_procesos, exitosos, errores, total_actuaciones):
         """Guarda un resumen de la ejecución."""
@@ -195,17 +490,11 @@ class ScraperLogger:
             'results_log': self.results_log_path,
             'errors_log': self.errors_log_path,
             'actuaciones_log': self.actuaciones_log_path,
+            'events_log': self.events_log_path,
             'logs_dir': self.logs_dir
         }
 
 
-class CustomFormatter(logging.Formatter):
-    """Formato sin timestamp para consola"""
-
-    def format(self, record):
-        return super().format(record).split('] ', 1)[-1]
-
-
 # Instancia global
 log = ScraperLogger()
 
@@ -214,4 +503,4 @@ logging.getLogger('selenium').setLevel(logging.ERROR)
 logging.getLogger('urllib3').setLevel(logging.ERROR)
 logging.getLogger('webdriver_manager').setLevel(logging.ERROR)
 logging.getLogger('requests').setLevel(logging.ERROR)
-logging.getLogger('charset_normalizer').setLevel(logging.ERROR)
\ No newline at end of file
+logging.getLogger('charset_normalizer').setLevel(logging.ERROR)
@@ -1,47 +1,260 @@
 # scraper/mailer.py
+"""
+Entrega del reporte por correo.
 
+- Una sola conexión SMTP para todos los correos del reporte, con
+  reconexión y reintentos ante errores temporales (ConexionSMTP).
+- Si el PDF no cabe en ENTREGA_MAX_MB (contando la codificación base64),
+  se comprime en ZIP; si aun así no cabe, se divide por páginas en varias
+  partes, una por correo.
+- El cuerpo es un resumen corto; sin actuaciones nuevas no se adjunta nada.
+- Si un envío en varias partes falla a mitad, se informa qué radicaciones
+  ya salieron completas (índice del PDF), para no reenviarlas.
+
+Para probar sin Gmail: python -m scraper.mock_smtp y SMTP_HOST=127.0.0.1,
+SMTP_PORT=2525, SMTP_SSL=0.
+"""
+import io
 import os
 import smtplib
+import time
+import zipfile
 from datetime import datetime
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.application import MIMEApplication
+from email.message import EmailMessage
+
+from .config import (EMAIL_USER, EMAIL_PASS, EMAIL_TO, PDF_PATH, SMTP_HOST, SMTP_PORT, SMTP_SSL,
+                     ENTREGA_MAX_MB, ENTREGA_REINTENTOS)
+from .logger import log
+from .reporter import radicaciones_hasta
+
+ASUNTO = "Reporte Diario de Actuaciones"
+# Margen para encabezados y cuerpo del correo
+MARGEN_BYTES = 64 * 1024
+
+
+def limite_adjunto(max_mb=ENTREGA_MAX_MB):
+    """Bytes de adjunto que caben en un correo de max_mb (base64 ocupa 4/3)."""
+    return max(MARGEN_BYTES, int(max_mb * 2 ** 20 * 3 / 4) - MARGEN_BYTES)
 
-from .config import EMAIL_USER, EMAIL_PASS, PDF_PATH
 
-def send_report_email():
+class ConexionSMTP:
     """
-    Envía un correo con el PDF generado como adjunto.
-    Usa las credenciales y rutas definidas en config.py.
+    Conexión SMTP reutilizable. enviar() reintenta los errores temporales
+    (desconexión, códigos 4xx, red) reconectando; los permanentes (5xx,
+    autenticación) se propagan enseguida.
     """
-    # Formatear fecha y hora para el cuerpo del mensaje
-    now = datetime.now()
-    fecha_str = now.strftime("%A %d-%m-%Y a las %I:%M %p").capitalize()
 
-    # Crear mensaje multipart
-    msg = MIMEMultipart()
-    msg["Subject"] = "Reporte Diario de Actuaciones"
+    def __init__(self, host=SMTP_HOST, port=SMTP_PORT, ssl=SMTP_SSL, usuario=EMAIL_USER, clave=EMAIL_PASS,
+                 intentos=ENTREGA_REINTENTOS, timeout=60):
+        self.host = host
+        self.port = port
+        self.ssl = ssl
+        self.usuario = usuario
+        self.clave = clave
+        self.intentos = max(1, intentos)
+        self.timeout = timeout
+        self._smtp = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def _conectar(self):
+        clase = smtplib.SMTP_SSL if self.ssl else smtplib.SMTP
+        smtp = clase(self.host, self.port, timeout=self.timeout)
+        if self.usuario and self.clave:
+            smtp.login(self.usuario, self.clave)
+        self._smtp = smtp
+
+    def enviar(self, msg):
+        for intento in range(1, self.intentos + 1):
+            try:
+                if self._smtp is None:
+                    self._conectar()
+                self._smtp.send_message(msg)
+                return
+            except smtplib.SMTPResponseException as e:
+                self._descartar()
+                if not 400 <= e.smtp_code < 500 or intento == self.intentos:
+                    raise
+                motivo = f"{e.smtp_code} {e.smtp_error!r}"
+            except (smtplib.SMTPException, OSError) as e:
+                self._descartar()
+                if intento == self.intentos:
+                    raise
+                motivo = str(e) or type(e).__name__
+            pausa = min(60, 5 * 2 ** (intento - 1))
+            log.advertencia(f"SMTP: {motivo}; reintento {intento}/{self.intentos - 1} en {pausa}s")
+            time.sleep(pausa)
+
+    def _descartar(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.close()
+            except Exception:
+                pass
+            self._smtp = None
+
+    def cerrar(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+
+
+# ========== ADJUNTOS ==========
+
+def _comprimir(ruta):
+    destino = os.path.splitext(ruta)[0] + ".zip"
+    with zipfile.ZipFile(destino, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=9) as z:
+        z.write(ruta, os.path.basename(ruta))
+    return destino
+
+
+def _dividir_pdf(ruta, limite):
+    """Partes (rutas) del PDF de a lo sumo `limite` bytes cada una (salvo páginas sueltas más grandes)."""
+    from pypdf import PdfReader, PdfWriter
+
+    lector = PdfReader(ruta)
+    paginas = len(lector.pages)
+    base = os.path.splitext(ruta)[0]
+    # Primera estimación proporcional al tamaño; se reduce a la mitad si alguna parte no cabe
+    por_parte = max(1, int(paginas * limite / os.path.getsize(ruta) * 0.9))
+    while True:
+        partes = []
+        for i, inicio in enumerate(range(0, paginas, por_parte), 1):
+            escritor = PdfWriter()
+            for pagina in lector.pages[inicio:inicio + por_parte]:
+                escritor.add_page(pagina)
+            parte = f"{base}_parte{i}.pdf"
+            with open(parte, "wb") as f:
+                escritor.write(f)
+            partes.append(parte)
+        if por_parte == 1 or all(os.path.getsize(p) <= limite for p in partes):
+            return partes
+        for parte in partes:
+            os.remove(parte)
+        por_parte = max(1, por_parte // 2)
+
+
+def preparar_adjuntos(ruta, limite=None):
+    """
+    Archivos a adjuntar, uno por correo: el PDF si cabe; si no, el ZIP;
+    si tampoco, el PDF dividido en partes (comprimidas si ayuda).
+    """
+    limite = limite or limite_adjunto()
+    if os.path.getsize(ruta) <= limite:
+        return [ruta]
+    comprimido = _comprimir(ruta)
+    if os.path.getsize(comprimido) <= limite:
+        log.info(f"Reporte comprimido: {os.path.getsize(ruta) / 2 ** 20:.1f} MB → "
+                 f"{os.path.getsize(comprimido) / 2 ** 20:.1f} MB")
+        return [comprimido]
+    os.remove(comprimido)
+    try:
+        partes = _dividir_pdf(ruta, limite)
+    except ImportError:
+        log.advertencia("pypdf no está instalado; el reporte se envía en un solo adjunto")
+        return [ruta]
+    adjuntos = []
+    for parte in partes:
+        if os.path.getsize(parte) > limite:
+            zip_parte = _comprimir(parte)
+            if os.path.getsize(zip_parte) < os.path.getsize(parte):
+                os.remove(parte)
+                parte = zip_parte
+            else:
+                os.remove(zip_parte)
+        adjuntos.append(parte)
+    log.info(f"Reporte dividido en {len(adjuntos)} partes")
+    return adjuntos
+
+
+def _paginas(adjunto):
+    """Páginas de una parte del reporte (PDF, o PDF dentro de un ZIP)."""
+    from pypdf import PdfReader
+
+    if not adjunto.endswith(".zip"):
+        return len(PdfReader(adjunto).pages)
+    with zipfile.ZipFile(adjunto) as z:
+        return len(PdfReader(io.BytesIO(z.read(z.namelist()[0]))).pages)
+
+
+# ========== CORREO ==========
+
+def _mensaje(asunto, cuerpo, adjunto=None):
+    msg = EmailMessage()
+    msg["Subject"] = asunto
     msg["From"] = EMAIL_USER
-    msg["To"] = EMAIL_USER
-
-    # Cuerpo del correo
-    cuerpo = f"Adjunto encontrarás el reporte de actuaciones generado el {fecha_str}."
-    msg.attach(MIMEText(cuerpo, "plain"))
-
-    # Adjuntar el PDF
-    with open(PDF_PATH, "rb") as f:
-        part = MIMEApplication(f.read(), Name=os.path.basename(PDF_PATH))
-        part.add_header(
-            "Content-Disposition",
-            "attachment",
-            filename=os.path.basename(PDF_PATH)
-        )
-        msg.attach(part)
-
-    # Enviar por SMTP SSL
-    smtp = smtplib.SMTP_SSL("smtp.gmail.com", 465)
-    smtp.login(EMAIL_USER, EMAIL_PASS)
-    smtp.sendmail(EMAIL_USER, [EMAIL_USER], msg.as_string())
-    smtp.quit()
-
-    print("Correo enviado exitosamente.")
+    msg["To"] = EMAIL_TO
+    msg.set_content(cuerpo)
+    if adjunto is not None:
+        subtipo = "zip" if adjunto.endswith(".zip") else "pdf"
+        with open(adjunto, "rb") as f:
+            msg.add_attachment(f.read(), maintype="application", subtype=subtipo,
+                               filename=os.path.basename(adjunto))
+    return msg
+
+
+def enviar_reporte(resumen, ruta=PDF_PATH, conexion=None, entregadas=None):
+    """
+    Envía el reporte. resumen: dict con 'nuevas', 'procesos', 'omitidas' y
+    'errores' (para el cuerpo). Sin actuaciones nuevas ni errores va un
+    correo corto sin adjunto. Retorna True si se enviaron todos los correos.
+    entregadas: lista opcional; si un reporte en varias partes falla a
+    mitad, recibe las radicaciones que ya salieron completas.
+    """
+    fecha_str = datetime.now().strftime("%A %d-%m-%Y a las %I:%M %p").capitalize()
+    asunto = f"{ASUNTO} - {fecha_str}"
+    cuerpo = (f"Reporte de actuaciones generado el {fecha_str}.\n\n"
+              f"Actuaciones nuevas: {resumen['nuevas']} en {resumen['procesos']} procesos\n"
+              f"Ya enviadas antes (omitidas): {resumen['omitidas']}\n"
+              f"Procesos con error: {resumen['errores']}\n")
+
+    con_adjunto = (resumen["nuevas"] or resumen["errores"]) and os.path.exists(ruta)
+    if not con_adjunto:
+        cuerpo += "\nNo hay actuaciones nuevas ni errores: el correo no lleva adjunto.\n"
+
+    propia = conexion is None
+    conexion = conexion or ConexionSMTP()
+    adjuntos = []
+    enviados = 0
+    try:
+        adjuntos = preparar_adjuntos(ruta) if con_adjunto else [None]
+        for i, adjunto in enumerate(adjuntos, 1):
+            if len(adjuntos) > 1:
+                msg = _mensaje(f"{asunto} (parte {i}/{len(adjuntos)})",
+                               cuerpo + f"\nParte {i} de {len(adjuntos)} del reporte.\n", adjunto)
+            else:
+                msg = _mensaje(asunto, cuerpo, adjunto)
+            conexion.enviar(msg)
+            enviados = i
+    except Exception as e:
+        log.error(f"Error enviando correo: {e}")
+        if enviados and entregadas is not None:
+            _entregadas(ruta, adjuntos[:enviados], len(adjuntos), entregadas)
+        return False
+    finally:
+        if propia:
+            conexion.cerrar()
+        for adjunto in adjuntos:
+            if adjunto is not None and adjunto != ruta and os.path.exists(adjunto):
+                os.remove(adjunto)
+    log.exito(f"Correo enviado ({len(adjuntos)} mensaje{'s' if len(adjuntos) > 1 else ''})")
+    return True
+
+
+def _entregadas(ruta, enviados, total, entregadas):
+    """Agrega a `entregadas` las radicaciones completas en las partes ya enviadas."""
+    try:
+        radicaciones = radicaciones_hasta(ruta, sum(_paginas(a) for a in enviados))
+    except Exception as e:
+        log.advertencia(f"No se pudo leer el índice del reporte: {e}")
+        return
+    entregadas.extend(radicaciones)
+    log.advertencia(f"Salieron {len(enviados)}/{total} partes: {len(radicaciones)} radicaciones "
+                    "ya entregadas no se reenviarán")
@@ -1,7 +1,6 @@
 # scraper/main.py
 import os
-import csv
-import smtplib
+import atexit
 import time
 import threading
 import itertools
@@ -9,9 +8,6 @@ import sys
 from queue import Queue
 from datetime import date, datetime, timedelta
 from zoneinfo import ZoneInfo
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.application import MIMEApplication
 
 # Importar nuestro logger primero
 from .logger import log
@@ -28,16 +24,41 @@ from .config import (
     OUTPUT_DIR,
     NUM_THREADS,
     PDF_PATH,
-    EMAIL_USER,
-    EMAIL_PASS,
     SCHEDULE_TIME,
     ENV,
     DEBUG_SCRAPER,
-    DIAS_BUSQUEDA
+    DIAS_BUSQUEDA,
+    BACKEND,
+    ENGINE,
+    TOR_INSTANCIAS,
+    ESCANEO_INCREMENTAL,
+    ASYNC_CONCURRENCIA,
+    COORDINACION,
+    NODO_ID,
+    REINTENTOS_PAUSA_DIFERIDOS,
+    SALIDAS,
+    ENTREGA_SOLO_NUEVAS
 )
 from .loader import cargar_procesos
-from .browser import new_chrome_driver, wait_for_tor_circuit
+from .browser import new_chrome_driver, wait_for_tor_circuit, renew_tor_circuit
 from .worker import worker_task
+from .api_client import ApiClient, api_worker_task, filtrar_nuevas, registrar_vistas
+from .async_engine import ejecutar_async
+from .driver_pool import DriverPool
+from .tor_fleet import TorFleet
+from .state_store import StateStore, calcular_cutoff
+from .journal import Journal
+from .salidas import Salidas, exportar
+from .entregas import Entregas
+from .mailer import enviar_reporte
+from .prioridad import planificar
+from .coordinacion import nueva_cola, ColaNodo
+from .reintentos import Presupuesto, ejecutar_con_reintentos, clasificar, POLITICAS
+from .pacing import pacer
+from . import trafico
+from . import perfiles
+from . import circuitos
+from .metricas import METRICAS, iniciar_servidor
 import scraper.worker as worker
 from .reporter import generar_pdf
 
@@ -50,8 +71,8 @@ def setup_environment():
     os.environ.pop('SE_BINARY_PATH', None)
     display = os.environ.get('DISPLAY', ':99')
     os.environ['DISPLAY'] = display
-    log.debug(f"DISPLAY configurado: {display}")
-    log.debug(f"Entorno Python: {sys.version}")
+    log.debug("DISPLAY configurado: %s", display)
+    log.debug("Entorno Python: %s", sys.version)
 
 
 def save_debug_page(driver, step_name="step", numero="unknown"):
@@ -66,7 +87,7 @@ def save_debug_page(driver, step_name="step", numero="unknown"):
         driver.save_screenshot(ss_path)
         with open(html_path, "w", encoding="utf-8") as f:
             f.write(driver.page_source)
-        log.debug(f"Captura guardada: {step_name} para {numero}")
+        log.debug("Captura guardada: %s para %s", step_name, numero)
     except Exception as e:
         log.error(f"Error guardando debug: {e}")
 
@@ -82,7 +103,7 @@ def probar_procesos(lista_procesos):
     log.progreso("Verificando TOR (puede tardar varios minutos)...")
     log.info("Esto es normal en la primera ejecución del día")
 
-    # Usamos el timeout por defecto de wait_for_tor_circuit (600s)
+    # Usamos el timeout por defecto de wait_for_tor_circuit (TOR_ESPERA_TIMEOUT)
     if not wait_for_tor_circuit():
         log.error("❌ TOR no está listo. Abortando prueba.")
         return
@@ -113,7 +134,7 @@ def probar_procesos(lista_procesos):
                 log.error(f"Error en proceso {i}: {e}")
                 save_debug_page(driver, f"error_{i}", numero)
 
-            time.sleep(2)
+            pacer.pausa("entre_procesos")
 
         log.titulo("RESULTADOS FINALES")
         log.resultado(f"Total procesos: {len(lista_procesos)}")
@@ -134,122 +155,452 @@ def probar_procesos(lista_procesos):
         log.error(f"Error general en prueba: {e}")
     finally:
         driver.quit()
+        perfiles.liberar(driver.perfil)
         log.exito("Driver cerrado")
 
 
-def exportar_csv(actes, start_ts):
-    fecha_registro = date.fromtimestamp(start_ts).isoformat()
-    csv_path = os.path.join(OUTPUT_DIR, "actuaciones.csv")
-    headers = ["idInterno", "quienRegistro", "fechaRegistro", "fechaEstado", "etapa", "actuacion", "observacion"]
-    with open(csv_path, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(headers)
-        for numero, fecha, actu, anota, _url in actes:
-            writer.writerow([numero, "Sistema", fecha_registro, fecha, "", actu, anota])
-    log.resultado(f"CSV generado: {csv_path}")
+def _nuevo_cliente_api(worker_id, fleet=None):
+    # Credencial SOCKS por worker: circuito propio y salida atribuible
+    if fleet is None:
+        return ApiClient(credencial=f"w{worker_id}")
+    inst = fleet.asignar(worker_id)
+    return ApiClient(proxy=inst.proxy, control_port=inst.control_port, credencial=f"w{worker_id}")
 
 
-def send_report_email():
-    now = datetime.now()
-    fecha_str = now.strftime("%A %d-%m-%Y a las %I:%M %p").capitalize()
-    try:
-        smtp = smtplib.SMTP_SSL("smtp.gmail.com", 465)
-        smtp.login(EMAIL_USER, EMAIL_PASS)
-        msg = MIMEMultipart()
-        msg["Subject"] = f"Reporte Diario de Actuaciones - {fecha_str}"
-        msg["From"] = EMAIL_USER
-        msg["To"] = EMAIL_USER
-        cuerpo = f"Adjunto encontrarás el reporte de actuaciones generado el {fecha_str}."
-        msg.attach(MIMEText(cuerpo, "plain"))
-        if os.path.exists(PDF_PATH):
-            with open(PDF_PATH, "rb") as f:
-                part = MIMEApplication(f.read(), Name=os.path.basename(PDF_PATH))
-                part.add_header('Content-Disposition', 'attachment', filename=os.path.basename(PDF_PATH))
-                msg.attach(part)
-        smtp.sendmail(EMAIL_USER, [EMAIL_USER], msg.as_string())
-        smtp.quit()
-        log.exito("Correo enviado")
-    except Exception as e:
-        log.error(f"Error enviando correo: {e}")
+def _medir_circuito(control_port, funcion, credencial=None):
+    """
+    Corre funcion() y reporta al gestor de circuitos de la instancia el
+    resultado de la consulta: latencia si tuvo éxito, fallo si el error es
+    de los que se atribuyen al circuito (los que piden renovarlo).
+    credencial: usuario SOCKS del cliente, para atribuir la consulta a la
+    salida de su propio circuito (ver circuitos.py).
+    """
+    if not control_port:
+        return funcion()
+    gestor = circuitos.gestor(control_port)
+    consulta = gestor.consulta(credencial)
+    t0 = time.time()
+    with log.contexto(control=control_port):
+        try:
+            resultado = funcion()
+        except Exception as exc:
+            tipo = clasificar(exc).tipo
+            log.evento("consulta", exito=False, tipo=tipo, segundos=round(time.time() - t0, 3),
+                       salida=gestor.salida(consulta))
+            gestor.registrar(consulta, False if POLITICAS[tipo].renovar_circuito else None)
+            raise
+        segundos = time.time() - t0
+        log.evento("consulta", exito=True, segundos=round(segundos, 3), salida=gestor.salida(consulta))
+    gestor.registrar(consulta, True, segundos)
+    return resultado
+
+
+def _cola_local(procesos):
+    q = Queue()
+    for num in procesos:
+        q.put(num)
+    for _ in range(NUM_THREADS):
+        q.put(None)
+    return q
 
 
-def ejecutar_ciclo():
-    """Ejecuta un ciclo completo de scraping (producción)."""
+def _ejecutar_hilos(procesos, pool=None, fleet=None, journal=None, salidas=None):
+    """
+    Escanea los procesos con NUM_THREADS hilos.
+    Con Selenium, cada tarea toma un driver sano del pool; con el backend
+    API cada hilo usa su propio cliente HTTP (en su instancia TOR si hay flota).
+    Cada radicación terminada se registra en el journal, si se pasa uno.
+    salidas: Salidas donde se escriben las actuaciones (en lugar de acumularlas).
+    procesos: lista, o una coordinacion.ColaNodo cuyo get() da None al terminar.
+
+    Los reintentos siguen la política de reintentos.py. Con una lista local,
+    los procesos que la agotan se aplazan y se reintentan en una segunda
+    pasada al final; con la cola distribuida el error se registra enseguida
+    (el proceso no puede quedar arrendado hasta el final).
+    """
+    results, errors = [], []
+    actes = salidas if salidas is not None else []
+    lock = threading.Lock()
+    aplazados = []
+
+    def procesar(numero, ejecutar, presupuesto, al_renovar, final):
+        # Actuaciones de esta radicación; se pasan al journal antes de unirlas al ciclo
+        propias = []
+        # Fecha con la que registrar `propias` en el StateStore (la fija worker_task)
+        pendiente = [None]
+        # Todas las filas del detalle, para marcarlas como vistas tras el journal
+        vistas = []
+
+        def intento():
+            del propias[:]
+            pendiente[0] = ejecutar(numero, propias)
+        t0 = time.time()
+        with log.contexto(radicacion=numero):
+            fallo = ejecutar_con_reintentos(numero, intento, presupuesto, al_renovar)
+            if fallo is None and pendiente[0] is not None and worker.STATE_STORE is not None:
+                # Recién ahora el intento terminó bien: quedan solo las nuevas
+                vistas = list(propias)
+                propias[:] = filtrar_nuevas(worker.STATE_STORE, numero, propias)
+                log.debug("%d/%d actuaciones nuevas", len(propias), len(vistas))
+        segundos = time.time() - t0
+        METRICAS.observar("proceso_segundos", segundos)
+        if fallo is not None and not final:
+            METRICAS.incrementar("procesos", resultado="aplazado")
+            log.evento("proceso", radicacion=numero, resultado="aplazado", segundos=round(segundos, 3),
+                       tipo=fallo.tipo, error=str(fallo)[:200])
+            with lock:
+                aplazados.append(numero)
+            return
+        METRICAS.incrementar("procesos", resultado="ok" if fallo is None else "error")
+        error = f"[{fallo.tipo}] {fallo}"[:200] if fallo is not None else None
+        log.evento("proceso", radicacion=numero, resultado="ok" if fallo is None else "error",
+                   segundos=round(segundos, 3), actuaciones=len(propias),
+                   tipo=fallo.tipo if fallo is not None else None, error=str(fallo)[:200] if fallo else None)
+        if journal is not None:
+            journal.registrar(numero, propias, error)
+        # Solo con las filas ya en el journal se marcan como vistas
+        registrar_vistas(worker.STATE_STORE, numero, pendiente[0], vistas)
+        with lock:
+            actes.extend(propias)
+            if error is not None:
+                errors.append((numero, error))
+
+    def loop_api(worker_id, q, presupuesto, final):
+        with log.contexto(worker=f"w{worker_id}"):
+            _loop_api(worker_id, q, presupuesto, final)
+
+    def _loop_api(worker_id, q, presupuesto, final):
+        cliente = [_nuevo_cliente_api(worker_id, fleet)]
+
+        def ejecutar(numero, propias):
+            return _medir_circuito(cliente[0].tor_control_port,
+                                   lambda: api_worker_task(numero, cliente[0], results, propias, errors, lock),
+                                   cliente[0].credencial)
+
+        def al_renovar(fallo):
+            renew_tor_circuit(cliente[0].tor_control_port, espera=0)
+        while True:
+            numero = q.get()
+            q.task_done()
+            if numero is None:
+                break
+            if fleet is not None and not fleet.asignacion_sana(worker_id):
+                # Su instancia TOR cayó: rebalancear a otra
+                cliente[0].quit()
+                cliente[0] = _nuevo_cliente_api(worker_id, fleet)
+            procesar(numero, ejecutar, presupuesto, al_renovar, final)
+        cliente[0].quit()
+
+    def loop_pool(worker_id, q, presupuesto, final):
+        with log.contexto(worker=f"w{worker_id}"):
+            _loop_pool(q, presupuesto, final)
+
+    def _loop_pool(q, presupuesto, final):
+        # Puerto de control del último driver usado (para renovar su circuito)
+        ultimo = {}
+
+        def ejecutar(numero, propias):
+            with pool.checkout() as driver:
+                ultimo["control_port"] = getattr(driver, "tor_control_port", None)
+                return _medir_circuito(ultimo["control_port"],
+                                       lambda: worker_task(numero, driver, results, propias, errors, lock))
+
+        def al_renovar(fallo):
+            if ultimo.get("control_port"):
+                renew_tor_circuit(ultimo["control_port"], espera=0)
+        while True:
+            numero = q.get()
+            q.task_done()
+            if numero is None:
+                break
+            procesar(numero, ejecutar, presupuesto, al_renovar, final)
+
+    def pasada(q, cantidad, final):
+        presupuesto = Presupuesto(cantidad)
+        threads = []
+        for i in range(NUM_THREADS):
+            if BACKEND == 'api':
+                t = threading.Thread(target=loop_api, args=(i, q, presupuesto, final), daemon=True)
+            else:
+                t = threading.Thread(target=loop_pool, args=(i, q, presupuesto, final), daemon=True)
+            t.start()
+            threads.append(t)
+        for t in threads:
+            t.join()
+
+    if hasattr(procesos, "get"):
+        pasada(procesos, worker.TOTAL_PROCESSES, final=True)
+        return results, actes, errors
+
+    pasada(_cola_local(procesos), len(procesos), final=False)
+    if aplazados:
+        # Cola diferida: los que fallaron, una vez más tras la pasada principal
+        diferidos = list(aplazados)
+        log.advertencia(f"Reintentando {len(diferidos)} procesos aplazados "
+                        f"en {REINTENTOS_PAUSA_DIFERIDOS}s")
+        time.sleep(REINTENTOS_PAUSA_DIFERIDOS)
+        pasada(_cola_local(diferidos), len(diferidos), final=True)
+    return results, actes, errors
+
+
+def _nuevo_pool(fleet=None):
+    if fleet is None:
+        return DriverPool()
+    return DriverPool(factory=fleet.driver_factory(), fleet=fleet)
+
+
+def ejecutar_ciclo(pool=None, fleet=None):
+    """
+    Ejecuta un ciclo completo de scraping (producción).
+    pool: DriverPool persistente; si no se pasa, se crea uno solo para este ciclo.
+    fleet: TorFleet en ejecución; None = TOR del sistema.
+    """
     log.titulo("INICIANDO CICLO DE SCRAPING")
     log.resultado(f"📅 Fecha: {datetime.now().strftime('%d/%m/%Y')}")
     log.resultado(f"🎯 Período: últimos {DIAS_BUSQUEDA} días")
     log.resultado(f"🔄 Hilos: {NUM_THREADS}")
+    log.resultado(f"🧭 Backend: {BACKEND} ({ENGINE})")
     log.separador()
 
     # Verificar TOR antes de crear los drivers (por si es el primer inicio del día)
     log.progreso("Verificando TOR antes del ciclo...")
-    if not wait_for_tor_circuit():
+    tor_listo = fleet.esperar_listas() if fleet is not None else wait_for_tor_circuit()
+    if not tor_listo:
         log.error("❌ TOR no está listo. Cancelando ciclo.")
         return
 
-    start_ts = time.time()
-    worker.process_counter = itertools.count(1)
+    procesos = cargar_procesos()
+
+    store = StateStore() if ESCANEO_INCREMENTAL else None
+
+    if COORDINACION:
+        salida = _escanear_distribuido(procesos, store, pool, fleet)
+        if salida is not None:
+            _cerrar_ciclo(*salida, store)
+        elif store is not None:
+            store.registrar_ejecucion()
+            store.close()
+        worker.STATE_STORE = None
+        worker.CUTOFFS = {}
+        return
 
-    # Limpiar archivos antiguos
-    if os.path.exists(PDF_PATH):
-        os.remove(PDF_PATH)
-    csv_old = os.path.join(OUTPUT_DIR, "actuaciones.csv")
-    if os.path.exists(csv_old):
-        os.remove(csv_old)
+    journal = Journal()
+    previo = journal.cargar()
+    reanudar = previo is not None and not previo.finalizado and previo.start_ts is not None
+    cutoff = (previo.cutoff if reanudar else None) or calcular_cutoff(store)
+
+    # Orden y cadencia según la actividad de cada proceso
+    plan = planificar(procesos, store, cutoff)
+
+    if reanudar:
+        # Reanudar tras una caída: solo lo que faltaba, con el mismo inicio y corte
+        start_ts = previo.start_ts
+        TOTAL = previo.total or len(plan.procesos)
+        pendientes = [num for num in plan.procesos if num not in previo.completados]
+        log.advertencia(f"Reanudando ciclo del {journal.fecha}: "
+                        f"{TOTAL - len(pendientes)}/{TOTAL} procesos ya completados")
+    else:
+        start_ts = time.time()
+        TOTAL = len(plan.procesos)
+        pendientes = plan.procesos
+
+        # Limpiar archivos antiguos (las salidas se recrean vacías al iniciarlas)
+        if os.path.exists(PDF_PATH):
+            os.remove(PDF_PATH)
+        journal.iniciar(start_ts, TOTAL, cutoff)
+
+    # Actuaciones a disco a medida que se encuentran; al reanudar se parte de lo que tiene el journal
+    salidas = Salidas(start_ts).iniciar(previo.actes if reanudar else ())
 
-    procesos = cargar_procesos()
-    TOTAL = len(procesos)
     worker.TOTAL_PROCESSES = TOTAL
-    log.progreso(f"Procesos a escanear: {TOTAL}")
+    worker.process_counter = itertools.count(TOTAL - len(pendientes) + 1)
+    trafico.TOTAL.reiniciar()
+    METRICAS.reiniciar()
+    log.iniciar_ciclo(start_ts)
+    log.evento("ciclo", total=TOTAL, pendientes=len(pendientes), cutoff=cutoff.isoformat(),
+               reanudado=bool(reanudar))
+    worker.STATE_STORE = store
+    worker.CUTOFF = cutoff
+    worker.CUTOFFS = plan.cutoffs
+    log.progreso(f"Procesos a escanear: {len(pendientes)}")
+    log.resultado(f"✂️ Fecha de corte: {cutoff}")
 
-    q = Queue()
-    for num in procesos:
-        q.put(num)
-    for _ in range(NUM_THREADS):
-        q.put(None)
+    try:
+        _, _, errors = _escanear(pendientes, pool, fleet, journal, cutoff, store, plan.cutoffs, salidas)
+    finally:
+        salidas.cerrar()
+    _guardar_metricas()
 
-    drivers = [new_chrome_driver(i) for i in range(NUM_THREADS)]
-    results, actes, errors = [], [], []
-    lock = threading.Lock()
-    threads = []
+    if reanudar:
+        errors = previo.errors + errors
+
+    # El reporte se arma desde las salidas; el journal queda de respaldo
+    actes = salidas.leer()
+    if actes is None:
+        log.advertencia("Salidas ilegibles: el reporte se arma desde el journal")
+        actes = journal.cargar().actes
+    _cerrar_ciclo(TOTAL, actes, errors, start_ts, cutoff, store, exportado=True)
+    journal.finalizar()
+
+
+def _escanear(pendientes, pool, fleet, journal, cutoff, store, cutoffs, salidas=None):
+    """
+    Corre el motor configurado (ENGINE/BACKEND) sobre los procesos pendientes.
+    salidas: Salidas que recibe las actuaciones; sin ella se devuelven en una lista.
+    """
+    if ENGINE == 'async':
+        proxies = fleet.proxies() if fleet is not None else None
+        if not hasattr(pendientes, "lotes"):
+            return ejecutar_async(pendientes, proxies, cutoff, store, journal, cutoffs, salidas)
+        results, errors = [], []
+        actes = salidas if salidas is not None else []
+        for lote in pendientes.lotes(ASYNC_CONCURRENCIA):
+            r, a, e = ejecutar_async(lote, proxies, cutoff, store, journal, cutoffs, salidas)
+            results += r
+            if salidas is None:
+                actes += a
+            errors += e
+        return results, actes, errors
+    if BACKEND == 'api':
+        resultado = _ejecutar_hilos(pendientes, fleet=fleet, journal=journal, salidas=salidas)
+        _log_circuitos()
+        return resultado
+
+    pool_propio = pool is None
+    if pool_propio:
+        pool = _nuevo_pool(fleet)
+    pool.iniciar()
+    try:
+        resultado = _ejecutar_hilos(pendientes, pool, fleet, journal, salidas)
+    finally:
+        if pool_propio:
+            pool.cerrar()
+    log.resultado(f"♻️ Reinicios de driver: {pool.reinicios}")
+    log.resultado(f"📶 Tráfico: {trafico.TOTAL}")
+    _log_circuitos()
+    return resultado
 
-    def loop(driver):
-        while True:
-            numero = q.get()
-            q.task_done()
-            if numero is None:
-                break
-            for intento in range(10):
-                try:
-                    worker_task(numero, driver, results, actes, errors, lock)
-                    break
-                except Exception as exc:
-                    log.advertencia(f"{numero}: intento {intento + 1}/10 fallido")
-                    if intento == 9:
-                        with lock:
-                            errors.append((numero, str(exc)[:200]))
-        driver.quit()
 
-    for drv in drivers:
-        t = threading.Thread(target=loop, args=(drv,), daemon=True)
-        t.start()
-        threads.append(t)
+def _log_circuitos():
+    for gestor in circuitos.gestores():
+        log.resultado(f"🧅 Circuitos {gestor.resumen()}")
 
-    q.join()
-    for t in threads:
-        t.join()
 
-    generar_pdf(TOTAL, actes, errors, start_ts, time.time())
-    exportar_csv(actes, start_ts)
+def _guardar_metricas():
+    """Tiempos por etapa al log y resumen JSON de la ejecución."""
+    etapas = METRICAS.resumen_etapas()
+    if etapas:
+        log.resultado(f"⏱️ Etapas: {etapas}")
+    try:
+        log.resultado(f"📈 Métricas: {METRICAS.guardar_resumen()}")
+    except OSError as e:
+        log.error(f"No se pudo guardar el resumen de métricas: {e}")
+
 
+def _escanear_distribuido(procesos, store, pool, fleet):
+    """
+    Ciclo repartido entre nodos (ver coordinacion.py). Retorna
+    (TOTAL, actes, errors, start_ts, cutoff) si este nodo ganó el cierre y
+    debe generar el reporte; None si lo genera otro nodo.
+    """
+    cola = nueva_cola()
+    ciclo = date.today().isoformat()
+    cutoff = calcular_cutoff(store)
+    plan = planificar(procesos, store, cutoff)
+    meta = cola.publicar(ciclo, plan.procesos, {
+        "nodo": NODO_ID,
+        "start_ts": time.time(),
+        "cutoff": cutoff.isoformat(),
+        "cutoffs": {num: f.isoformat() for num, f in plan.cutoffs.items()},
+    })
+    # El plan vigente es el del nodo que publicó primero
+    start_ts = meta["start_ts"]
+    cutoff = date.fromisoformat(meta["cutoff"])
+    cutoffs = {num: date.fromisoformat(f) for num, f in meta["cutoffs"].items()}
+    TOTAL = meta["total"]
+    log.resultado(f"🛰️ Nodo {NODO_ID} en ciclo {ciclo} (publicado por {meta['nodo']}, {TOTAL} procesos)")
+
+    worker.TOTAL_PROCESSES = TOTAL
+    worker.process_counter = itertools.count(1)
+    trafico.TOTAL.reiniciar()
+    METRICAS.reiniciar()
+    log.iniciar_ciclo(start_ts)
+    log.evento("ciclo", total=TOTAL, cutoff=cutoff.isoformat(), nodo=NODO_ID)
+    worker.STATE_STORE = store
+    worker.CUTOFF = cutoff
+    worker.CUTOFFS = cutoffs
+    log.resultado(f"✂️ Fecha de corte: {cutoff}")
+
+    nodo = ColaNodo(cola, ciclo, NODO_ID, lote=NUM_THREADS)
+    try:
+        _, propias, propios_err = _escanear(nodo, pool, fleet, nodo, cutoff, store, cutoffs)
+    finally:
+        nodo.cerrar()
+    log.resultado(f"Nodo {NODO_ID}: {len(propias)} actuaciones, {len(propios_err)} errores")
+    _guardar_metricas()
+
+    if not cola.reclamar_cierre(ciclo, NODO_ID):
+        log.info("Otro nodo genera el reporte del ciclo")
+        cola.close()
+        return None
+    actes, errors = cola.resultados(ciclo)
+    cola.close()
+    return TOTAL, actes, errors, start_ts, cutoff
+
+
+def _cerrar_ciclo(TOTAL, actes, errors, start_ts, cutoff, store, exportado=False):
+    """
+    Reporte, estado y correo al final del ciclo.
+    exportado: las salidas (CSV/JSONL/Parquet) ya se escribieron durante el ciclo.
+
+    Con ENTREGA_SOLO_NUEVAS el PDF y el correo llevan solo las actuaciones
+    que aún no se entregaron (las de este ciclo y las de correos fallidos);
+    las salidas conservan todas las del ciclo.
+    """
+    entregas = Entregas() if ENTREGA_SOLO_NUEVAS else None
+    if entregas is not None:
+        reporte, omitidas = entregas.pendientes(actes)
+        log.resultado(f"Actuaciones a reportar: {len(reporte)} nuevas ({omitidas} ya enviadas)")
+    else:
+        reporte, omitidas = actes, 0
+    generar_pdf(TOTAL, reporte, errors, start_ts, time.time(), cutoff, omitidas=omitidas)
+    if not exportado:
+        exportar(actes, start_ts)
+    log.resultado(f"Salidas generadas en {OUTPUT_DIR}: {', '.join(SALIDAS)}")
+
+    if store is not None:
+        store.registrar_ejecucion()
+        store.purgar(cutoff - timedelta(days=90))
+        store.close()
+        worker.STATE_STORE = None
+    worker.CUTOFFS = {}
+
+    # Fuera de producción no hay correo: el PDF generado cuenta como entrega
+    entregado = True
+    # Radicaciones que salieron completas en un envío por partes que falló a mitad
+    parciales = []
     if ENV == 'production':
-        try:
-            send_report_email()
-        except Exception as e:
-            log.error(f"Error enviando correo: {e}")
+        entregado = enviar_reporte({
+            "nuevas": len(reporte),
+            "procesos": len({fila[0] for fila in reporte}),
+            "omitidas": omitidas,
+            "errores": len(errors),
+        }, entregadas=parciales)
+    if entregas is not None:
+        if entregado:
+            entregas.marcar(reporte)
+        else:
+            salieron = set(parciales)
+            entregas.marcar([fila for fila in reporte if fila[0] in salieron])
+            pendientes = sum(1 for fila in reporte if fila[0] not in salieron)
+            log.advertencia(f"{pendientes} actuaciones quedan pendientes para el próximo reporte")
+        entregas.purgar(cutoff - timedelta(days=90))
+        entregas.close()
 
     err = len(errors)
     esc = TOTAL - err
+    log.evento("fin_ciclo", total=TOTAL, errores=err, actuaciones=len(actes),
+               segundos=round(time.time() - start_ts, 1))
     log.titulo("RESUMEN DEL CICLO")
     log.resultado(f"✅ Escaneados: {esc}")
     log.resultado(f"❌ Errores: {err}")
@@ -261,15 +612,6 @@ def ejecutar_ciclo():
     log.separador()
 
 
-def log_ip_salida():
-    try:
-        import requests
-        ip = requests.get("https://api.ipify.org", timeout=10).text.strip()
-        log.info(f"IP Saliente: {ip}")
-    except Exception as e:
-        log.debug(f"No se pudo obtener IP de salida: {e}")
-
-
 # ---------------- MAIN ---------------- #
 
 def main():
@@ -280,7 +622,7 @@ def main():
     log.separador()
 
     setup_environment()
-    log_ip_salida()
+    iniciar_servidor()
 
     if DEBUG_SCRAPER:
         # Modo prueba: lista de procesos
@@ -297,6 +639,18 @@ def main():
         log.progreso(f"Scheduler iniciado. Próxima ejecución: {SCHEDULE_TIME}")
         bogota_tz = ZoneInfo("America/Bogota")
         hh, mm = map(int, SCHEDULE_TIME.split(":"))
+        fleet = None
+        if TOR_INSTANCIAS > 0:
+            fleet = TorFleet()
+            fleet.iniciar()
+            atexit.register(fleet.detener)
+        # Los drivers se reutilizan entre ciclos (solo backend Selenium)
+        pool = _nuevo_pool(fleet) if BACKEND != 'api' and ENGINE != 'async' else None
+
+        # Si el contenedor se reinició a mitad de un ciclo de hoy, se retoma ya
+        if Journal().pendiente():
+            log.advertencia("Ciclo de hoy sin terminar: reanudando antes del scheduler")
+            ejecutar_ciclo(pool, fleet)
 
         while True:
             now = datetime.now(bogota_tz)
@@ -320,7 +674,7 @@ def main():
                     time.sleep(remaining)
                     remaining = 0
 
-            ejecutar_ciclo()
+            ejecutar_ciclo(pool, fleet)
 
 
 if __name__ == "__main__":
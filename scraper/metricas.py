@@ -0,0 +1,227 @@
+# scraper/metricas.py
+"""
+Métricas de rendimiento del scraper.
+
+Hasta ahora solo se conocía la duración total del ciclo (encabezado del PDF)
+y líneas sueltas en el log. Aquí se acumulan:
+
+- histogramas de duración por etapa de worker_task (carga, input, consultar,
+  espera, detalle, extraccion, volver) y por proceso completo;
+- contadores de reintentos, modales, renovaciones TOR y reinicios de driver.
+
+Todo se expone en formato de texto de Prometheus en un endpoint local
+(http://127.0.0.1:METRICAS_PUERTO/metrics) y, al final de cada ciclo, se
+escribe un resumen JSON en METRICAS_DIR. ejecutar_ciclo reinicia los valores
+al empezar, así cada resumen corresponde a una sola ejecución; para
+Prometheus eso cuenta como un reinicio de contador, que rate() ya tolera.
+
+Se implementa con la biblioteca estándar para no sumar dependencias.
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .config import METRICAS_PUERTO, METRICAS_DIR
+from .logger import log
+
+PREFIJO = "scraper_"
+# Límites superiores (segundos) de los buckets de los histogramas
+BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+
+DESCRIPCIONES = {
+    "etapa_segundos": "Duración de cada etapa de worker_task",
+    "proceso_segundos": "Duración de un proceso completo, con reintentos",
+    "procesos": "Procesos terminados por resultado",
+    "reintentos": "Reintentos por tipo de fallo",
+    "modales": "Modales de error del sitio",
+    "renovaciones_tor": "Señales NEWNYM enviadas",
+    "renovaciones_agrupadas": "Pedidos de renovación cubiertos por otra renovación",
+    "reinicios_driver": "Drivers reemplazados",
+    "arranque_driver_segundos": "Tiempo de creación de cada driver",
+}
+
+
+class Histograma:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.conteos = [0] * len(buckets)
+        self.total = 0
+        self.suma = 0.0
+        self.maximo = 0.0
+
+    def observar(self, valor):
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                self.conteos[i] += 1
+        self.total += 1
+        self.suma += valor
+        self.maximo = max(self.maximo, valor)
+
+    def cuantil(self, q):
+        """Estimación a partir de los buckets (interpolación lineal)."""
+        if not self.total:
+            return 0.0
+        objetivo = q * self.total
+        anterior_limite, anterior_conteo = 0.0, 0
+        for limite, conteo in zip(self.buckets, self.conteos):
+            if conteo >= objetivo:
+                fraccion = (objetivo - anterior_conteo) / max(1, conteo - anterior_conteo)
+                return min(self.maximo, anterior_limite + (limite - anterior_limite) * fraccion)
+            anterior_limite, anterior_conteo = limite, conteo
+        return self.maximo
+
+    def resumen(self):
+        return {
+            "n": self.total,
+            "suma": round(self.suma, 3),
+            "media": round(self.suma / self.total, 3) if self.total else 0.0,
+            "p50": round(self.cuantil(0.5), 3),
+            "p95": round(self.cuantil(0.95), 3),
+            "max": round(self.maximo, 3),
+        }
+
+
+def _etiquetas(etiquetas):
+    return tuple(sorted((k, str(v)) for k, v in etiquetas.items()))
+
+
+def _formato_etiquetas(etiquetas, extra=()):
+    pares = list(etiquetas) + list(extra)
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pares) + "}"
+
+
+class Metricas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self.inicio = time.time()
+            self._histogramas = {}
+            self._contadores = {}
+            self._capturas = {}
+
+    def observar(self, nombre, segundos, **etiquetas):
+        clave = (nombre, _etiquetas(etiquetas))
+        with self._lock:
+            if clave not in self._histogramas:
+                self._histogramas[clave] = Histograma()
+            self._histogramas[clave].observar(segundos)
+            if nombre in self._capturas:
+                self._capturas[nombre].append(segundos)
+
+    def capturar(self, nombre):
+        """Guarda además los valores crudos de `nombre` (percentiles exactos en el benchmark)."""
+        with self._lock:
+            self._capturas.setdefault(nombre, [])
+
+    def muestras(self, nombre):
+        with self._lock:
+            return list(self._capturas.get(nombre, []))
+
+    def incrementar(self, nombre, cantidad=1, **etiquetas):
+        clave = (nombre, _etiquetas(etiquetas))
+        with self._lock:
+            self._contadores[clave] = self._contadores.get(clave, 0) + cantidad
+
+    # ========== SALIDA ==========
+
+    def exposicion(self):
+        """Texto en el formato de exposición de Prometheus (versión 0.0.4)."""
+        lineas = []
+        with self._lock:
+            histogramas = sorted(self._histogramas.items())
+            contadores = sorted(self._contadores.items())
+        vistos = set()
+        for (nombre, etiquetas), h in histogramas:
+            metrica = PREFIJO + nombre
+            if nombre not in vistos:
+                vistos.add(nombre)
+                lineas.append(f"# HELP {metrica} {DESCRIPCIONES.get(nombre, nombre)}")
+                lineas.append(f"# TYPE {metrica} histogram")
+            for limite, conteo in zip(h.buckets, h.conteos):
+                lineas.append(f"{metrica}_bucket{_formato_etiquetas(etiquetas, [('le', limite)])} {conteo}")
+            lineas.append(f"{metrica}_bucket{_formato_etiquetas(etiquetas, [('le', '+Inf')])} {h.total}")
+            lineas.append(f"{metrica}_sum{_formato_etiquetas(etiquetas)} {h.suma:.6f}")
+            lineas.append(f"{metrica}_count{_formato_etiquetas(etiquetas)} {h.total}")
+        for (nombre, etiquetas), valor in contadores:
+            metrica = PREFIJO + nombre + "_total"
+            if nombre not in vistos:
+                vistos.add(nombre)
+                lineas.append(f"# HELP {metrica} {DESCRIPCIONES.get(nombre, nombre)}")
+                lineas.append(f"# TYPE {metrica} counter")
+            lineas.append(f"{metrica}{_formato_etiquetas(etiquetas)} {valor}")
+        return "\n".join(lineas) + "\n"
+
+    def resumen(self):
+        """Diccionario serializable con los valores de la ejecución actual."""
+        def nombre(n, etiquetas):
+            return n + "".join(f"[{v}]" for _, v in etiquetas)
+        with self._lock:
+            return {
+                "inicio": datetime.fromtimestamp(self.inicio).isoformat(timespec="seconds"),
+                "duracion": round(time.time() - self.inicio, 1),
+                "histogramas": {nombre(n, e): h.resumen()
+                                for (n, e), h in sorted(self._histogramas.items())},
+                "contadores": {nombre(n, e): v
+                               for (n, e), v in sorted(self._contadores.items())},
+            }
+
+    def guardar_resumen(self, directorio=METRICAS_DIR):
+        """Escribe el resumen de la ejecución en metricas_<inicio>.json."""
+        os.makedirs(directorio, exist_ok=True)
+        ruta = os.path.join(
+            directorio, f"metricas_{datetime.fromtimestamp(self.inicio).strftime('%Y%m%d_%H%M%S')}.json"
+        )
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(self.resumen(), f, ensure_ascii=False, indent=2)
+        return ruta
+
+    def resumen_etapas(self):
+        """Una línea con la media y el p95 de cada etapa (para el log)."""
+        with self._lock:
+            etapas = [(dict(e).get("etapa"), h) for (n, e), h in sorted(self._histogramas.items())
+                      if n == "etapa_segundos"]
+        return ", ".join(f"{etapa}={h.suma / h.total:.2f}s (p95 {h.cuantil(0.95):.1f}s)"
+                         for etapa, h in etapas if h.total)
+
+
+# Métricas globales (las reinicia ejecutar_ciclo)
+METRICAS = Metricas()
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        cuerpo = METRICAS.exposicion().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, formato, *args):
+        pass
+
+
+def iniciar_servidor(puerto=METRICAS_PUERTO):
+    """Sirve /metrics en 127.0.0.1:puerto en un hilo daemon. None si está desactivado."""
+    if not puerto:
+        return None
+    try:
+        servidor = ThreadingHTTPServer(("127.0.0.1", puerto), _Manejador)
+    except OSError as e:
+        log.advertencia(f"No se pudo abrir el endpoint de métricas en {puerto}: {e}")
+        return None
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, name="metricas", daemon=True).start()
+    log.info(f"Métricas en http://127.0.0.1:{puerto}/metrics")
+    return servidor
@@ -0,0 +1,358 @@
+# scraper/mock_sitio.py
+"""
+Imitación local de Consulta de Procesos, para medir el scraper sin TOR.
+
+Sirve las dos caras del sitio real sobre la misma base de datos simulada:
+
+- la página /Procesos/NumeroRadicacion: campo de 23 caracteres, radio
+  "Todos los Procesos", botón Consultar, tabla de resultados con la fecha
+  como botón, detalle con la tabla de actuaciones (con "Regresar" vía
+  history), modal de error (div.v-dialog--active) y el mensaje
+  "No se encontraron resultados". La página obtiene sus datos del backend
+  JSON como la SPA real, así que worker_task funciona sin cambios;
+- el backend /api/v2/... que usan ApiClient y el motor async.
+
+Cada radicación se genera de forma determinista a partir del número: si
+existe, su fecha de última actuación y sus actuaciones. Las actuaciones
+pueden sembrarse desde una página de detalle guardada (por ejemplo
+debug_last_page.html). La latencia, su variación y las tasas de error y de
+"sin resultados" son configurables.
+
+Uso: python -m scraper.mock_sitio --puerto 8800 --latencia 0.5 --errores 0.05
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from datetime import date, timedelta
+from html.parser import HTMLParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from .extractor import parse_fecha
+
+POR_PAGINA = 40
+
+# Actuaciones de relleno cuando no se siembra desde una página guardada
+ACTUACIONES_BASE = [
+    ("Fijacion estado", "Actuación registrada automáticamente."),
+    ("Auto resuelve solicitud", ""),
+    ("Al despacho", "EXPEDIENTE INGRESA AL DESPACHO"),
+    ("Constancia secretarial", "Se elabora documento para retirar"),
+    ("Recepción memorial", "Memorial allegado por correo electrónico"),
+    ("Auto fija fecha audiencia y/o diligencia", ""),
+]
+
+PAGINA = r"""<!DOCTYPE html>
+<html lang="es"><head><meta charset="utf-8">
+<title>Consulta de Procesos por Número de Radicación (local)</title></head>
+<body><div id="app"></div>
+<script>
+var app = document.getElementById('app');
+var API = '/api/v2';
+
+function formulario() {
+    app.innerHTML =
+        '<div class="v-input"><input type="text" maxlength="23" id="numero">' +
+        '<div class="v-counter">0 / 23</div></div>' +
+        '<div class="v-radio"><label>Todos los Procesos</label></div>' +
+        '<button type="button" id="consultar"><span class="v-btn__content">Consultar</span></button>' +
+        '<div id="salida"></div>';
+    var input = document.getElementById('numero');
+    input.addEventListener('input', function () {
+        document.querySelector('.v-counter').innerText = input.value.length + ' / 23';
+    });
+    document.getElementById('consultar').addEventListener('click', consultar);
+}
+
+function cargando() {
+    document.getElementById('salida').innerHTML = '<div class="v-progress-circular"></div>';
+}
+
+function modal(mensaje) {
+    document.getElementById('salida').innerHTML =
+        '<div class="v-dialog__content"><div class="v-dialog v-dialog--active">' +
+        '<p>' + mensaje + '</p><button type="button">Volver</button></div></div>';
+    document.querySelector('.v-dialog--active button').addEventListener('click', function () {
+        document.getElementById('salida').innerHTML = '';
+    });
+}
+
+function consultar() {
+    var numero = document.getElementById('numero').value;
+    cargando();
+    fetch(API + '/Procesos/Consulta/NumeroRadicacion?numero=' + encodeURIComponent(numero) +
+          '&SoloActivos=false&pagina=1')
+        .then(function (r) { if (!r.ok) throw new Error(r.status); return r.json(); })
+        .then(function (data) {
+            var procesos = data.procesos || [];
+            if (!procesos.length) {
+                document.getElementById('salida').innerHTML = '<p>No se encontraron resultados</p>';
+                return;
+            }
+            var p = procesos[0];
+            document.getElementById('salida').innerHTML =
+                '<table><thead><tr><th>Radicación</th><th>Despacho</th><th>Fecha</th></tr></thead>' +
+                '<tbody><tr><td>' + p.llaveProceso + '</td><td>' + p.despacho + '</td>' +
+                '<td><button type="button">' + p.fechaUltimaActuacion.substring(0, 10) +
+                '</button></td></tr></tbody></table>';
+            document.querySelector('#salida tbody button').addEventListener('click', function () {
+                history.pushState({detalle: p.idProceso}, '', location.pathname + '#detalle');
+                detalle(p.idProceso);
+            });
+        })
+        .catch(function () { modal('Error consultando el proceso'); });
+}
+
+function detalle(id) {
+    app.innerHTML = '<div class="v-progress-circular"></div>';
+    fetch(API + '/Proceso/Actuaciones/' + id + '?pagina=1')
+        .then(function (r) { if (!r.ok) throw new Error(r.status); return r.json(); })
+        .then(function (data) {
+            var filas = (data.actuaciones || []).map(function (a) {
+                return '<tr><td>' + a.fechaActuacion.substring(0, 10) + '</td><td>' + a.actuacion +
+                       '</td><td>' + a.anotacion + '</td></tr>';
+            }).join('');
+            app.innerHTML =
+                '<button type="button" onclick="history.back()">Regresar al listado</button>' +
+                '<table><thead><tr><th>Fecha</th><th>Actuación</th><th>Anotación</th></tr></thead>' +
+                '<tbody>' + filas + '</tbody></table>';
+        })
+        .catch(function () { formulario(); modal('Error consultando las actuaciones'); });
+}
+
+window.addEventListener('popstate', formulario);
+formulario();
+</script></body></html>
+"""
+
+
+class _FilasDetalle(HTMLParser):
+    """Filas (fecha, actuación, anotación) de las tablas de una página de detalle guardada."""
+
+    def __init__(self):
+        super().__init__()
+        self.filas = []
+        self._fila = None
+        self._celda = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "tr":
+            self._fila = []
+        elif tag == "td" and self._fila is not None:
+            self._celda = []
+
+    def handle_data(self, data):
+        if self._celda is not None:
+            self._celda.append(data)
+
+    def handle_endtag(self, tag):
+        if tag == "td" and self._celda is not None:
+            self._fila.append(" ".join("".join(self._celda).split()))
+            self._celda = None
+        elif tag == "tr" and self._fila is not None:
+            if len(self._fila) >= 3 and parse_fecha(self._fila[0]) is not None:
+                self.filas.append((self._fila[1], self._fila[2]))
+            self._fila = None
+
+
+def actuaciones_semilla(ruta):
+    """(actuacion, anotacion) de una página de detalle guardada; vacío si no tiene."""
+    parser = _FilasDetalle()
+    with open(ruta, encoding="utf-8") as f:
+        parser.feed(f.read())
+    return parser.filas
+
+
+class Catalogo:
+    """Procesos simulados, deterministas por número de radicación."""
+
+    def __init__(self, semilla=0, sin_resultados=0.1, activos=0.3, dias_activo=3,
+                 max_actuaciones=60, actuaciones=None, hoy=None):
+        self.semilla = semilla
+        self.sin_resultados = sin_resultados
+        self.activos = activos
+        self.dias_activo = dias_activo
+        self.max_actuaciones = max_actuaciones
+        self.actuaciones = actuaciones or ACTUACIONES_BASE
+        self.hoy = hoy or date.today()
+        self._ids = {}
+        self._lock = threading.Lock()
+
+    def _rng(self, numero):
+        return random.Random(zlib.crc32(numero.encode("utf-8")) ^ self.semilla)
+
+    def proceso(self, numero):
+        """Dict con el formato del backend, o None si la radicación no existe."""
+        rng = self._rng(numero)
+        if rng.random() < self.sin_resultados:
+            return None
+        if rng.random() < self.activos:
+            ultima = self.hoy - timedelta(days=rng.randint(0, self.dias_activo))
+        else:
+            ultima = self.hoy - timedelta(days=rng.randint(self.dias_activo + 1, 400))
+        id_proceso = zlib.crc32(f"{numero}:{self.semilla}".encode("utf-8"))
+        with self._lock:
+            self._ids[id_proceso] = numero
+        return {
+            "idProceso": id_proceso,
+            "llaveProceso": numero,
+            "despacho": f"JUZGADO {rng.randint(1, 60):03d} CIVIL",
+            "fechaUltimaActuacion": f"{ultima.isoformat()}T00:00:00",
+        }
+
+    def actuaciones_de(self, id_proceso):
+        """Actuaciones del proceso, de la más reciente a la más antigua."""
+        with self._lock:
+            numero = self._ids.get(id_proceso)
+        if numero is None:
+            return None
+        proceso = self.proceso(numero)
+        rng = self._rng(numero + ":actuaciones")
+        fecha = date.fromisoformat(proceso["fechaUltimaActuacion"][:10])
+        salida = []
+        for _ in range(rng.randint(1, self.max_actuaciones)):
+            actuacion, anotacion = rng.choice(self.actuaciones)
+            salida.append({
+                "fechaActuacion": f"{fecha.isoformat()}T00:00:00",
+                "actuacion": actuacion,
+                "anotacion": anotacion,
+            })
+            fecha -= timedelta(days=rng.choice((0, 0, 1, 3, 7, 15)))
+        return salida
+
+
+class MockSitio:
+    """Servidor HTTP local (hilo daemon) con la página y el backend simulados."""
+
+    def __init__(self, puerto=0, latencia=0.3, variacion=0.5, errores=0.0, catalogo=None):
+        self.latencia = latencia
+        self.variacion = variacion
+        self.errores = errores
+        self.catalogo = catalogo or Catalogo()
+        self.peticiones = 0
+        self._lock = threading.Lock()
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", puerto), self._manejador())
+        self._servidor.daemon_threads = True
+        self._hilo = None
+
+    @property
+    def puerto(self):
+        return self._servidor.server_address[1]
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.puerto}"
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, name="mock-sitio", daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def _demora(self):
+        """Latencia simulada: la base ± variacion (fracción), nunca negativa."""
+        if self.latencia > 0:
+            time.sleep(max(0.0, self.latencia * (1 + random.uniform(-self.variacion, self.variacion))))
+
+    def _manejador(self):
+        sitio = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with sitio._lock:
+                    sitio.peticiones += 1
+                url = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                ruta = url.path.rstrip("/")
+                if ruta in ("", "/Procesos/NumeroRadicacion"):
+                    self._responder(200, PAGINA.encode("utf-8"), "text/html; charset=utf-8")
+                    return
+                if not ruta.startswith("/api/v2/"):
+                    self._responder(404, b"", "text/plain")
+                    return
+                sitio._demora()
+                if random.random() < sitio.errores:
+                    self._responder(500, b'{"error": "simulado"}', "application/json")
+                    return
+                self._api(ruta[len("/api/v2/"):], params)
+
+            def _api(self, ruta, params):
+                if ruta == "Procesos/Consulta/NumeroRadicacion":
+                    proceso = sitio.catalogo.proceso(params.get("numero", ""))
+                    self._json({"procesos": [proceso] if proceso else [],
+                                "paginacion": {"cantidadPaginas": 1}})
+                    return
+                if ruta.startswith("Proceso/Actuaciones/"):
+                    try:
+                        actuaciones = sitio.catalogo.actuaciones_de(int(ruta.rsplit("/", 1)[1]))
+                    except ValueError:
+                        actuaciones = None
+                    if actuaciones is None:
+                        self._responder(404, b"", "application/json")
+                        return
+                    pagina = max(1, int(params.get("pagina", 1)))
+                    paginas = max(1, -(-len(actuaciones) // POR_PAGINA))
+                    inicio = (pagina - 1) * POR_PAGINA
+                    self._json({"actuaciones": actuaciones[inicio:inicio + POR_PAGINA],
+                                "paginacion": {"cantidadPaginas": paginas}})
+                    return
+                self._responder(404, b"", "application/json")
+
+            def _json(self, datos):
+                self._responder(200, json.dumps(datos, ensure_ascii=False).encode("utf-8"),
+                                "application/json; charset=utf-8")
+
+            def _responder(self, status, cuerpo, tipo):
+                self.send_response(status)
+                self.send_header("Content-Type", tipo)
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, formato, *args):
+                pass
+
+        return Manejador
+
+
+def argumentos_mock(parser):
+    """Opciones del sitio simulado (compartidas con el benchmark)."""
+    parser.add_argument("--latencia", type=float, default=0.3, help="segundos por llamada al backend")
+    parser.add_argument("--variacion", type=float, default=0.5, help="variación de la latencia (fracción)")
+    parser.add_argument("--errores", type=float, default=0.0, help="probabilidad de HTTP 500 / modal")
+    parser.add_argument("--sin-resultados", type=float, default=0.1, help="fracción de radicaciones inexistentes")
+    parser.add_argument("--activos", type=float, default=0.3, help="fracción con actuaciones recientes")
+    parser.add_argument("--semilla-html", help="página de detalle guardada para sembrar las actuaciones")
+    parser.add_argument("--semilla", type=int, default=0, help="semilla del catálogo")
+
+
+def mock_desde_args(args, puerto=0):
+    actuaciones = actuaciones_semilla(args.semilla_html) if args.semilla_html else None
+    catalogo = Catalogo(semilla=args.semilla, sin_resultados=args.sin_resultados,
+                        activos=args.activos, actuaciones=actuaciones)
+    return MockSitio(puerto, args.latencia, args.variacion, args.errores, catalogo)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sitio simulado de Consulta de Procesos")
+    parser.add_argument("--puerto", type=int, default=8800)
+    argumentos_mock(parser)
+    args = parser.parse_args()
+    sitio = mock_desde_args(args, args.puerto).iniciar()
+    print(f"Sitio simulado en {sitio.url}/Procesos/NumeroRadicacion (API en {sitio.url}/api/v2)")
+    print(f"Para el scraper: SITE_URL={sitio.url} API_BASE_URL={sitio.url}/api/v2 API_PROXY=")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        sitio.detener()
+
+
+if __name__ == "__main__":
+    main()
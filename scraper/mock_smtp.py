@@ -0,0 +1,162 @@
+# scraper/mock_smtp.py
+"""
+Servidor SMTP local para probar la entrega del reporte sin Gmail.
+
+Implementa lo que usa smtplib: EHLO/HELO (anuncia SIZE y AUTH), AUTH PLAIN
+y LOGIN (acepta cualquier credencial), MAIL/RCPT/DATA, RSET, NOOP y QUIT.
+Los mensajes recibidos quedan en memoria (MockSMTP.mensajes, como
+email.message.EmailMessage) y, si se indica un directorio, en archivos .eml.
+
+Para ejercitar los reintentos puede cortar las primeras N conexiones
+(--fallos) y rechazar con 552 los mensajes mayores que --max-mb.
+
+Uso:
+    python -m scraper.mock_smtp --puerto 2525 --directorio output/correos
+    SMTP_HOST=127.0.0.1 SMTP_PORT=2525 SMTP_SSL=0 ENVIRONMENT=production python -m scraper.main
+"""
+import argparse
+import base64
+import os
+import socketserver
+import threading
+import time
+from email import message_from_bytes, policy
+
+
+class MockSMTP:
+    """Servidor en un hilo; iniciar() retorna self, detener() lo cierra."""
+
+    def __init__(self, puerto=0, max_mb=25, fallos=0, directorio=None):
+        self.max_bytes = int(max_mb * 2 ** 20)
+        self.fallos = fallos
+        self.directorio = directorio
+        self.mensajes = []
+        self.conexiones = 0
+        self._lock = threading.Lock()
+        self._servidor = socketserver.ThreadingTCPServer(("127.0.0.1", puerto), self._manejador())
+        self._servidor.daemon_threads = True
+
+    @property
+    def puerto(self):
+        return self._servidor.server_address[1]
+
+    def iniciar(self):
+        if self.directorio:
+            os.makedirs(self.directorio, exist_ok=True)
+        threading.Thread(target=self._servidor.serve_forever, name="mock-smtp", daemon=True).start()
+        return self
+
+    def detener(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def _guardar(self, datos, remitente, destinatarios):
+        msg = message_from_bytes(datos, policy=policy.default)
+        with self._lock:
+            self.mensajes.append(msg)
+            n = len(self.mensajes)
+        if self.directorio:
+            with open(os.path.join(self.directorio, f"correo_{n:04d}.eml"), "wb") as f:
+                f.write(datos)
+        print(f"[mock-smtp] {remitente} → {', '.join(destinatarios)}: {msg['Subject']} "
+              f"({len(datos) / 2 ** 20:.2f} MB)")
+
+    def _manejador(self):
+        mock = self
+
+        class Manejador(socketserver.StreamRequestHandler):
+            def responder(self, linea):
+                self.wfile.write(linea.encode("ascii") + b"\r\n")
+
+            def leer(self):
+                return self.rfile.readline().decode("utf-8", "replace").rstrip("\r\n")
+
+            def handle(self):
+                with mock._lock:
+                    mock.conexiones += 1
+                    cortar = mock.conexiones <= mock.fallos
+                if cortar:
+                    self.responder("421 mock-smtp: servicio no disponible, intente mas tarde")
+                    return
+                self.responder("220 mock-smtp listo")
+                remitente, destinatarios = None, []
+                while True:
+                    linea = self.leer()
+                    comando, _, argumento = linea.partition(" ")
+                    comando = comando.upper()
+                    if comando == "EHLO":
+                        self.responder("250-mock-smtp")
+                        self.responder(f"250-SIZE {mock.max_bytes}")
+                        self.responder("250-8BITMIME")
+                        self.responder("250 AUTH PLAIN LOGIN")
+                    elif comando == "HELO":
+                        self.responder("250 mock-smtp")
+                    elif comando == "AUTH":
+                        metodo = argumento.split(" ", 1)[0].upper()
+                        if metodo == "LOGIN":
+                            self.responder("334 " + base64.b64encode(b"Username:").decode())
+                            self.leer()
+                            self.responder("334 " + base64.b64encode(b"Password:").decode())
+                            self.leer()
+                        elif metodo == "PLAIN" and " " not in argumento:
+                            self.responder("334 ")
+                            self.leer()
+                        self.responder("235 autenticado")
+                    elif comando == "MAIL":
+                        remitente, destinatarios = argumento.split(":", 1)[-1].split(" ")[0].strip("<>"), []
+                        self.responder("250 ok")
+                    elif comando == "RCPT":
+                        destinatarios.append(argumento.split(":", 1)[-1].strip().strip("<>"))
+                        self.responder("250 ok")
+                    elif comando == "DATA":
+                        self.responder("354 terminar con <CRLF>.<CRLF>")
+                        partes, tamano = [], 0
+                        while True:
+                            crudo = self.rfile.readline()
+                            if not crudo or crudo in (b".\r\n", b".\n"):
+                                break
+                            if crudo.startswith(b".."):
+                                crudo = crudo[1:]
+                            partes.append(crudo)
+                            tamano += len(crudo)
+                        if tamano > mock.max_bytes:
+                            self.responder("552 mensaje demasiado grande")
+                        else:
+                            mock._guardar(b"".join(partes), remitente, destinatarios)
+                            self.responder("250 recibido")
+                        remitente, destinatarios = None, []
+                    elif comando == "RSET":
+                        remitente, destinatarios = None, []
+                        self.responder("250 ok")
+                    elif comando == "NOOP":
+                        self.responder("250 ok")
+                    elif comando == "QUIT":
+                        self.responder("221 adios")
+                        return
+                    elif not linea:
+                        return
+                    else:
+                        self.responder("502 comando no implementado")
+
+        return Manejador
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor SMTP local para probar el envío del reporte")
+    parser.add_argument("--puerto", type=int, default=2525)
+    parser.add_argument("--max-mb", type=float, default=25, help="tamaño máximo por mensaje")
+    parser.add_argument("--fallos", type=int, default=0, help="conexiones iniciales que se rechazan con 421")
+    parser.add_argument("--directorio", help="guardar cada mensaje como .eml en este directorio")
+    args = parser.parse_args()
+    servidor = MockSMTP(args.puerto, args.max_mb, args.fallos, args.directorio).iniciar()
+    print(f"SMTP simulado en 127.0.0.1:{servidor.puerto}")
+    print(f"Para el scraper: SMTP_HOST=127.0.0.1 SMTP_PORT={servidor.puerto} SMTP_SSL=0")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        servidor.detener()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# scraper/pacing.py
+"""
+Ritmo adaptativo de las etapas del worker.
+
+Cada etapa (carga, tecleo, input, radio, detalle, volver, entre_procesos) se
+define como "esperar una condición o timeout" más una pausa de asentamiento.
+La pausa arranca en un valor conservador y se ajusta según el resultado de
+cada intento: baja un poco con cada éxito y sube con cada modal o timeout,
+así converge al mínimo que el sitio tolera.
+
+También ofrece un modo de entrada rápida (PACING_INPUT_RAPIDO) que escribe
+el número de una vez en lugar de tecla por tecla.
+"""
+import random
+import threading
+import time
+
+from selenium.webdriver.support.ui import WebDriverWait
+
+from .config import PACING_ADAPTATIVO, PACING_INPUT_RAPIDO
+from .logger import log
+
+# Ajuste de la pausa aprendida
+FACTOR_EXITO = 0.9
+FACTOR_FALLO = 1.5
+INCREMENTO_FALLO = 0.25
+
+# JS: asigna el valor con el setter nativo y emite 'input' para que Vue lo registre
+SET_VALUE_JS = r"""
+var el = arguments[0], valor = arguments[1];
+var setter = Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, 'value').set;
+el.focus();
+setter.call(el, valor);
+el.dispatchEvent(new Event('input', {bubbles: true}));
+el.dispatchEvent(new Event('change', {bubbles: true}));
+"""
+
+
+class Etapa:
+    def __init__(self, nombre, inicial, minimo, maximo, timeout):
+        self.nombre = nombre
+        self.inicial = inicial
+        self.actual = inicial
+        self.minimo = minimo
+        self.maximo = maximo
+        self.timeout = timeout
+        self.exitos = 0
+        self.fallos = 0
+
+    def __repr__(self):
+        return f"{self.nombre}={self.actual:.2f}s ({self.exitos}✓/{self.fallos}✗)"
+
+
+class Pacer:
+    def __init__(self, adaptativo=PACING_ADAPTATIVO, input_rapido=PACING_INPUT_RAPIDO):
+        self.adaptativo = adaptativo
+        self.input_rapido = input_rapido
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # nombre: pausa inicial, mínima, máxima, timeout de la condición (segundos)
+        self.etapas = {e.nombre: e for e in (
+            Etapa("carga", 1.0, 0.0, 5.0, 20),
+            Etapa("tecleo", 0.075, 0.0, 0.1, 0),
+            Etapa("input", 1.0, 0.0, 2.0, 0),
+            Etapa("radio", 0.5, 0.0, 1.0, 0),
+            Etapa("detalle", 1.0, 0.0, 8.0, 30),
+            Etapa("volver", 0.5, 0.0, 5.0, 15),
+            Etapa("entre_procesos", 1.0, 0.0, 2.0, 0),
+        )}
+
+    # ========== ESPERAS ==========
+
+    def _usadas(self):
+        if not hasattr(self._local, "usadas"):
+            self._local.usadas = set()
+        return self._local.usadas
+
+    def pausa(self, nombre):
+        """Pausa de asentamiento aprendida para la etapa (con jitter ±20%)."""
+        etapa = self.etapas[nombre]
+        self._usadas().add(nombre)
+        segundos = etapa.actual if self.adaptativo else etapa.maximo
+        if segundos > 0:
+            time.sleep(segundos * random.uniform(0.8, 1.2))
+
+    def esperar(self, nombre, driver, condicion=None):
+        """
+        Espera la condición de la etapa (hasta su timeout) y luego la pausa
+        aprendida. Lanza TimeoutException si la condición no se cumple.
+        Retorna el valor de la condición (None si no hay condición).
+        """
+        valor = None
+        etapa = self.etapas[nombre]
+        if condicion is not None and etapa.timeout:
+            valor = WebDriverWait(driver, etapa.timeout, poll_frequency=0.25).until(condicion)
+        self.pausa(nombre)
+        return valor
+
+    # ========== APRENDIZAJE ==========
+
+    def resultado(self, exito):
+        """
+        Ajusta las etapas usadas en el intento actual del hilo: un éxito
+        reduce su pausa; un modal o timeout la aumenta.
+        """
+        usadas = self._usadas()
+        with self._lock:
+            for nombre in usadas:
+                etapa = self.etapas[nombre]
+                if exito:
+                    etapa.exitos += 1
+                    etapa.actual = max(etapa.minimo, etapa.actual * FACTOR_EXITO)
+                else:
+                    etapa.fallos += 1
+                    etapa.actual = min(etapa.maximo, etapa.actual * FACTOR_FALLO + INCREMENTO_FALLO)
+        if not exito and usadas:
+            log.debug("Pacing ajustado tras fallo: %s", self.resumen())
+        usadas.clear()
+
+    def resumen(self):
+        with self._lock:
+            return ", ".join(repr(e) for e in self.etapas.values())
+
+    # ========== ENTRADA ==========
+
+    def escribir(self, driver, elemento, texto):
+        """Escribe el texto en el input: de una vez (modo rápido) o tecla por tecla."""
+        if self.input_rapido:
+            try:
+                elemento.clear()
+                driver.execute_script(SET_VALUE_JS, elemento, str(texto))
+                if elemento.get_attribute("value") == str(texto):
+                    return
+            except Exception as e:
+                log.debug("Entrada rápida falló, se teclea: %s", e)
+        elemento.clear()
+        etapa = self.etapas["tecleo"]
+        self._usadas().add("tecleo")
+        for char in str(texto):
+            elemento.send_keys(char)
+            if etapa.actual > 0:
+                time.sleep(etapa.actual * random.uniform(0.67, 1.33))
+
+
+# Instancia global (el aprendizaje se comparte entre workers)
+pacer = Pacer()
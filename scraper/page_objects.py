@@ -3,6 +3,8 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+from .extractor import extraer_tablas, fila_resultado, click_fecha, parse_actuaciones
+
 class ConsultaProcesosPage:
     URL = "https://consultaprocesos.ramajudicial.gov.co/Procesos/NumeroRadicacion"
 
@@ -46,3 +48,21 @@ class ConsultaProcesosPage:
             self._find("btn_volver", timeout=5).click()
         except:
             pass
+
+    def extraer_tablas(self):
+        """Todas las tablas de la página como listas de filas (un solo round-trip)."""
+        return extraer_tablas(self.driver)
+
+    def fecha_ultima_actuacion(self):
+        """Texto de la fecha de la primera fila de resultados, o None."""
+        resultado = fila_resultado(self.extraer_tablas())
+        return resultado[1] if resultado else None
+
+    def abrir_detalle(self):
+        """Click en la fecha de la primera fila de resultados."""
+        resultado = fila_resultado(self.extraer_tablas())
+        return bool(resultado) and click_fecha(self.driver, resultado[0])
+
+    def actuaciones(self, cutoff):
+        """Actuaciones (fecha, actuacion, anotacion) del detalle con fecha >= cutoff."""
+        return parse_actuaciones(self.extraer_tablas(), cutoff)
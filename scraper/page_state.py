@@ -0,0 +1,111 @@
+# scraper/page_state.py
+"""
+Detección del estado de la página con JavaScript dentro del navegador.
+
+PROBE_JS devuelve en una sola llamada lo que antes requería varias
+búsquedas por XPath (modal, tablas y sus filas, texto "No se encontraron",
+spinner). WAIT_JS instala un MutationObserver y resuelve en cuanto aparece
+la tabla, el modal o el mensaje de "sin resultados", sin sondear cada 2 s.
+"""
+import time
+
+from selenium.common.exceptions import TimeoutException, JavascriptException
+
+from .logger import log
+
+# Estados que terminan la espera
+FINALES = ('success', 'no_results', 'modal')
+
+_PROBE_BODY = r"""
+function probe() {
+    if (document.querySelector('div.v-dialog--active')) {
+        return {estado: 'modal', filas: 0};
+    }
+    var tablas = document.querySelectorAll('table');
+    for (var i = 0; i < tablas.length; i++) {
+        var filas = tablas[i].querySelectorAll('tbody tr').length;
+        if (filas) {
+            return {estado: 'success', filas: filas};
+        }
+    }
+    var texto = document.body ? document.body.innerText : '';
+    if (texto.indexOf('No se encontraron') !== -1 || texto.indexOf('Sin resultados') !== -1) {
+        return {estado: 'no_results', filas: 0};
+    }
+    if (document.querySelector('.v-progress-circular')) {
+        return {estado: 'loading', filas: 0};
+    }
+    return {estado: 'idle', filas: 0};
+}
+"""
+
+PROBE_JS = _PROBE_BODY + "return probe();"
+
+WAIT_JS = _PROBE_BODY + r"""
+var done = arguments[arguments.length - 1];
+var timeoutMs = arguments[0];
+var t0 = performance.now();
+var finales = {success: 1, no_results: 1, modal: 1};
+var actual = probe();
+if (finales[actual.estado]) {
+    actual.ms = 0;
+    done(actual);
+    return;
+}
+var pendiente = false;
+var terminado = false;
+var timer = null;
+var obs = new MutationObserver(function () {
+    if (pendiente || terminado) return;
+    pendiente = true;
+    // Agrupa las mutaciones de un mismo render de Vue en un solo probe
+    setTimeout(function () {
+        pendiente = false;
+        var s = probe();
+        if (finales[s.estado]) terminar(s);
+    }, 0);
+});
+function terminar(s) {
+    if (terminado) return;
+    terminado = true;
+    obs.disconnect();
+    clearTimeout(timer);
+    s.ms = Math.round(performance.now() - t0);
+    done(s);
+}
+obs.observe(document.documentElement, {
+    childList: true, subtree: true, characterData: true,
+    attributes: true, attributeFilter: ['class']
+});
+timer = setTimeout(function () { terminar(probe()); }, timeoutMs);
+"""
+
+
+def probe_estado(driver):
+    """Estado actual de la página en un solo round-trip."""
+    return driver.execute_script(PROBE_JS)
+
+
+def esperar_estado(driver, timeout=60, tramo=20):
+    """
+    Espera hasta que la página muestre resultados, modal o "sin resultados".
+    Usa execute_async_script en tramos de `tramo` segundos (por debajo del
+    script timeout del driver). Retorna (estado, segundos); estado es
+    'success', 'no_results', 'modal' o 'timeout'.
+    """
+    inicio = time.time()
+    while True:
+        restante = timeout - (time.time() - inicio)
+        if restante <= 0:
+            return 'timeout', time.time() - inicio
+        espera_ms = int(min(restante, tramo) * 1000)
+        try:
+            resultado = driver.execute_async_script(WAIT_JS, espera_ms) or {}
+        except (TimeoutException, JavascriptException) as e:
+            # Navegación o recarga durante la espera: se vuelve a instalar el observer
+            log.debug("Observer interrumpido: %s", e.__class__.__name__)
+            time.sleep(0.5)
+            continue
+        estado = resultado.get('estado')
+        if estado in FINALES:
+            return estado, time.time() - inicio
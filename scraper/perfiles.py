@@ -0,0 +1,178 @@
+# scraper/perfiles.py
+"""
+Perfiles persistentes de Chrome por worker (tmp_profiles/profile_<id>).
+
+Cada driver arranca con --user-data-dir apuntando al perfil de su worker,
+así la caché HTTP en disco conserva el bundle del SPA (JS, CSS) entre
+reinicios del driver y entre ciclos: un driver.get de la consulta solo paga
+las llamadas XHR.
+
+- Un perfil nuevo se siembra copiando la caché de la plantilla (_plantilla),
+  que se actualiza con la caché de un perfil al cerrar su driver.
+- Chrome limita la caché de cada perfil (--disk-cache-size); además podar()
+  vacía la caché de los perfiles menos usados si el total supera
+  PERFILES_MAX_MB.
+- limpiar_antiguos() borra perfiles sin uso y los bloqueos Singleton* que
+  deja un Chrome que murió sin cerrar.
+
+Chrome no permite que dos procesos compartan el mismo directorio de caché,
+por eso la caché se comparte por copia y no con un --disk-cache-dir común.
+"""
+import os
+import shutil
+import threading
+import time
+
+from .config import PERFILES_DIR, PERFIL_CACHE_MB, PERFILES_MAX_MB, PERFILES_MAX_DIAS
+from .logger import log
+
+PLANTILLA = "_plantilla"
+# Directorios de caché dentro del perfil (HTTP y código JS compilado)
+CACHES = (os.path.join("Default", "Cache"), os.path.join("Default", "Code Cache"))
+BLOQUEOS = ("SingletonLock", "SingletonSocket", "SingletonCookie")
+# La plantilla se renueva como mucho una vez por este intervalo
+PLANTILLA_VIGENCIA = 24 * 3600
+
+_lock = threading.Lock()
+_en_uso = set()
+
+
+def _tamano_mb(ruta):
+    total = 0
+    for raiz, _, archivos in os.walk(ruta):
+        for nombre in archivos:
+            try:
+                total += os.lstat(os.path.join(raiz, nombre)).st_size
+            except OSError:
+                pass
+    return total / (1024 * 1024)
+
+
+def _copiar_caches(origen, destino):
+    for sub in CACHES:
+        src = os.path.join(origen, sub)
+        if not os.path.isdir(src):
+            continue
+        dst = os.path.join(destino, sub)
+        shutil.rmtree(dst, ignore_errors=True)
+        # Una entrada a medio escribir se ignora; Chrome la trata como fallo de caché
+        shutil.copytree(src, dst, ignore_dangling_symlinks=True,
+                        copy_function=_copiar_tolerante)
+
+
+def _copiar_tolerante(src, dst):
+    try:
+        shutil.copy2(src, dst)
+    except OSError:
+        pass
+
+
+def limpiar_bloqueos(ruta):
+    """Borra los Singleton* de un Chrome anterior que no cerró bien."""
+    for nombre in BLOQUEOS:
+        path = os.path.join(ruta, nombre)
+        if os.path.lexists(path):
+            try:
+                os.remove(path)
+            except OSError as e:
+                log.debug("No se pudo borrar %s: %s", path, e)
+
+
+def preparar(worker_id, base=PERFILES_DIR):
+    """
+    Deja listo el perfil del worker y lo marca en uso.
+    Retorna (ruta, caliente): caliente=True si ya tenía caché del sitio.
+    """
+    ruta = os.path.abspath(os.path.join(base, f"profile_{worker_id}"))
+    os.makedirs(ruta, exist_ok=True)
+    limpiar_bloqueos(ruta)
+    caliente = any(os.path.isdir(os.path.join(ruta, sub)) for sub in CACHES)
+    plantilla = os.path.join(base, PLANTILLA)
+    if not caliente and os.path.isdir(plantilla):
+        _copiar_caches(plantilla, ruta)
+        caliente = True
+        log.debug("Perfil %s: caché sembrada desde la plantilla", worker_id)
+    with _lock:
+        _en_uso.add(ruta)
+    os.utime(ruta)
+    return ruta, caliente
+
+
+def argumentos(ruta):
+    """Argumentos de Chrome para usar el perfil con la caché acotada."""
+    return [
+        f"--user-data-dir={ruta}",
+        f"--disk-cache-size={PERFIL_CACHE_MB * 1024 * 1024}",
+    ]
+
+
+def liberar(ruta, base=PERFILES_DIR):
+    """
+    Llamar después de driver.quit(): el perfil deja de estar en uso y, si la
+    plantilla falta o está vencida, se renueva con su caché.
+    """
+    if not ruta:
+        return
+    with _lock:
+        _en_uso.discard(ruta)
+    plantilla = os.path.join(base, PLANTILLA)
+    try:
+        edad = time.time() - os.path.getmtime(plantilla)
+    except OSError:
+        edad = None
+    if edad is None or edad > PLANTILLA_VIGENCIA:
+        try:
+            os.makedirs(plantilla, exist_ok=True)
+            _copiar_caches(ruta, plantilla)
+            os.utime(plantilla)
+            log.debug("Plantilla de caché actualizada desde %s", os.path.basename(ruta))
+        except OSError as e:
+            log.debug("No se pudo actualizar la plantilla de caché: %s", e)
+    podar(base)
+
+
+def _perfiles(base):
+    if not os.path.isdir(base):
+        return []
+    return [os.path.abspath(os.path.join(base, d)) for d in os.listdir(base)
+            if d.startswith("profile_") and os.path.isdir(os.path.join(base, d))]
+
+
+def podar(base=PERFILES_DIR, max_mb=PERFILES_MAX_MB):
+    """Si los perfiles superan max_mb, vacía la caché de los menos usados (no en uso)."""
+    if not max_mb:
+        return
+    perfiles = [(os.path.getmtime(p), p, _tamano_mb(p)) for p in _perfiles(base)]
+    total = sum(t for _, _, t in perfiles)
+    if total <= max_mb:
+        return
+    with _lock:
+        en_uso = set(_en_uso)
+    for _, ruta, tamano in sorted(perfiles):
+        if total <= max_mb:
+            break
+        if ruta in en_uso:
+            continue
+        for sub in CACHES:
+            shutil.rmtree(os.path.join(ruta, sub), ignore_errors=True)
+        total -= tamano - _tamano_mb(ruta)
+        log.debug("Caché de %s liberada (total %.0f MB)", os.path.basename(ruta), total)
+
+
+def limpiar_antiguos(base=PERFILES_DIR, dias=PERFILES_MAX_DIAS):
+    """Borra perfiles sin uso hace más de `dias` días y los bloqueos huérfanos."""
+    limite = time.time() - dias * 86400
+    with _lock:
+        en_uso = set(_en_uso)
+    borrados = 0
+    for ruta in _perfiles(base):
+        if ruta in en_uso:
+            continue
+        if os.path.getmtime(ruta) < limite:
+            shutil.rmtree(ruta, ignore_errors=True)
+            borrados += 1
+        else:
+            limpiar_bloqueos(ruta)
+    if borrados:
+        log.info(f"Perfiles de Chrome antiguos borrados: {borrados}")
+    return borrados
@@ -0,0 +1,85 @@
+# scraper/prioridad.py
+"""
+Planificación de la cola de escaneo según la actividad de cada proceso.
+
+Con el historial del StateStore (fecha de última actuación y último
+escaneo) se ordena y se reduce la lista del libro:
+
+1. Procesos nunca escaneados.
+2. Procesos activos (actuación en los últimos PRIORIDAD_DIAS_ACTIVO días),
+   del más reciente al más antiguo.
+3. Procesos inactivos, solo si les toca: la cadencia crece con los meses
+   sin actuaciones (un día por mes) hasta PRIORIDAD_MAX_ANTIGUEDAD días.
+   Van del que lleva más tiempo sin escanear al que menos.
+
+El día PRIORIDAD_BARRIDO_DIA (0=lunes … 6=domingo; -1 desactiva) se
+escanean todos, en el mismo orden.
+
+Como un proceso puede pasar varios días sin escanear, su fecha de corte es
+la menor entre la del ciclo y la de su último escaneo; así no se pierden
+actuaciones de los días que se saltó.
+"""
+from datetime import date
+
+from .config import (PRIORIDAD_ACTIVA, PRIORIDAD_DIAS_ACTIVO, PRIORIDAD_MAX_ANTIGUEDAD,
+                     PRIORIDAD_BARRIDO_DIA)
+from .logger import log
+
+
+class Plan:
+    def __init__(self):
+        self.procesos = []
+        self.cutoffs = {}
+        self.nuevos = 0
+        self.activos = 0
+        self.inactivos = 0
+        self.omitidos = 0
+        self.barrido = False
+
+
+def cadencia(fecha_ultima, hoy, max_antiguedad=PRIORIDAD_MAX_ANTIGUEDAD):
+    """Días entre escaneos de un proceso inactivo: uno por mes sin actuaciones, con tope."""
+    meses = (hoy - fecha_ultima).days // 30 if fecha_ultima else max_antiguedad
+    return max(1, min(max_antiguedad, meses))
+
+
+def planificar(procesos, store, cutoff, hoy=None):
+    """
+    Ordena y filtra `procesos` (orden del libro) con el historial de `store`.
+    Retorna un Plan con la lista a escanear y la fecha de corte por proceso
+    (solo las que difieren de `cutoff`).
+    """
+    hoy = hoy or date.today()
+    plan = Plan()
+    if store is None or not PRIORIDAD_ACTIVA:
+        plan.procesos = list(procesos)
+        return plan
+
+    plan.barrido = PRIORIDAD_BARRIDO_DIA >= 0 and hoy.weekday() == PRIORIDAD_BARRIDO_DIA
+    estados = store.estados()
+    nuevos, activos, inactivos = [], [], []
+
+    for numero in procesos:
+        fecha_ultima, escaneo = estados.get(numero, (None, None))
+        if escaneo is None:
+            nuevos.append(numero)
+            continue
+        if escaneo < cutoff:
+            plan.cutoffs[numero] = escaneo
+        if fecha_ultima and (hoy - fecha_ultima).days <= PRIORIDAD_DIAS_ACTIVO:
+            activos.append((fecha_ultima, numero))
+        elif plan.barrido or (hoy - escaneo).days >= cadencia(fecha_ultima, hoy):
+            inactivos.append((escaneo, numero))
+        else:
+            plan.omitidos += 1
+            plan.cutoffs.pop(numero, None)
+
+    activos.sort(key=lambda x: x[0], reverse=True)
+    inactivos.sort(key=lambda x: x[0])
+    plan.procesos = nuevos + [n for _, n in activos] + [n for _, n in inactivos]
+    plan.nuevos, plan.activos, plan.inactivos = len(nuevos), len(activos), len(inactivos)
+
+    log.info(f"Plan de escaneo: {plan.nuevos} nuevos, {plan.activos} activos, "
+             f"{plan.inactivos} inactivos, {plan.omitidos} omitidos por cadencia"
+             + (" (barrido completo)" if plan.barrido else ""))
+    return plan
@@ -0,0 +1,136 @@
+# scraper/reintentos.py
+"""
+Política única de reintentos para los motores de escaneo.
+
+Antes los reintentos estaban anidados (10 en el ciclo × 3 en worker_task,
+cada uno con una renovación de circuito): un número sin remedio podía
+consumir 30 cargas de página. Ahora:
+
+- worker_task y api_worker_task hacen un solo intento y lanzan FalloScraper
+  (o dejan pasar la excepción original, que se clasifica aquí).
+- Cada tipo de fallo tiene su política: cuántos intentos, si renueva el
+  circuito TOR y el backoff exponencial con jitter.
+- Un presupuesto por ciclo limita los reintentos totales; agotado, los
+  fallos ya no se reintentan y pasan a la cola diferida.
+- La cola diferida (dead-letter) se vuelve a correr una vez al terminar la
+  pasada principal, para que los números problemáticos no le quiten
+  capacidad a los sanos.
+"""
+import random
+import threading
+import time
+
+import requests
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
+
+from .config import REINTENTOS_PRESUPUESTO
+from .driver_pool import es_sesion_muerta
+from .metricas import METRICAS
+from .logger import log
+
+
+class FalloScraper(Exception):
+    """Fallo clasificado de un intento. tipo: ver POLITICAS."""
+
+    def __init__(self, tipo, mensaje=""):
+        super().__init__(mensaje or tipo)
+        self.tipo = tipo
+
+
+class Politica:
+    def __init__(self, intentos, base, tope, renovar_circuito):
+        self.intentos = intentos
+        self.base = base
+        self.tope = tope
+        self.renovar_circuito = renovar_circuito
+
+
+POLITICAS = {
+    # El sitio rechazó la consulta (suele ser el circuito): otro circuito y reintento
+    "modal": Politica(3, 2.0, 20.0, True),
+    "timeout": Politica(3, 2.0, 20.0, True),
+    "red": Politica(3, 2.0, 20.0, True),
+    # Página incompleta o cambiada: un reintento basta para saberlo
+    "selector": Politica(2, 1.0, 5.0, False),
+    # El pool reemplaza el driver; reintentar enseguida con otro
+    "sesion": Politica(2, 0.0, 0.0, False),
+    # Sitio en mantenimiento: no insistir ahora, queda para la pasada diferida
+    "mantenimiento": Politica(1, 0.0, 0.0, False),
+    "desconocido": Politica(2, 1.0, 10.0, False),
+}
+
+
+def clasificar(exc):
+    """Convierte cualquier excepción de un intento en FalloScraper."""
+    if isinstance(exc, FalloScraper):
+        return exc
+    mensaje = str(exc)[:200] or type(exc).__name__
+    if es_sesion_muerta(exc):
+        return FalloScraper("sesion", mensaje)
+    if isinstance(exc, TimeoutException):
+        return FalloScraper("timeout", mensaje)
+    if isinstance(exc, NoSuchElementException):
+        return FalloScraper("selector", mensaje)
+    if isinstance(exc, (requests.RequestException, ConnectionError, TimeoutError)):
+        return FalloScraper("red", mensaje)
+    if isinstance(exc, WebDriverException):
+        return FalloScraper("red" if "net::" in mensaje else "desconocido", mensaje)
+    return FalloScraper("desconocido", mensaje)
+
+
+def espera(intento, politica):
+    """Backoff exponencial con jitter completo: uniforme en [0, min(tope, base·2^intento)]."""
+    return random.uniform(0, min(politica.tope, politica.base * (2 ** intento)))
+
+
+class Presupuesto:
+    """Reintentos disponibles en el ciclo (compartido entre hilos)."""
+
+    def __init__(self, procesos, fraccion=REINTENTOS_PRESUPUESTO, minimo=10):
+        self.total = max(minimo, int(procesos * fraccion))
+        self.restante = self.total
+        self._lock = threading.Lock()
+        self._avisado = False
+
+    def consumir(self):
+        with self._lock:
+            if self.restante > 0:
+                self.restante -= 1
+                return True
+            if not self._avisado:
+                self._avisado = True
+                log.advertencia(f"Presupuesto de reintentos agotado ({self.total}); "
+                                "los fallos pasan a la cola diferida")
+            return False
+
+
+def ejecutar_con_reintentos(numero, funcion, presupuesto, al_renovar=None):
+    """
+    Llama funcion() hasta que tenga éxito o se agote su política o el
+    presupuesto. Retorna None si tuvo éxito, o el FalloScraper final.
+    al_renovar(fallo): se llama antes de reintentar los fallos que piden
+    un circuito TOR nuevo.
+    """
+    intento = 0
+    while True:
+        try:
+            funcion()
+            return None
+        except Exception as exc:
+            fallo = clasificar(exc)
+        politica = POLITICAS[fallo.tipo]
+        intento += 1
+        if intento >= politica.intentos:
+            log.advertencia(f"{numero}: {fallo.tipo} tras {intento} intento(s): {fallo}")
+            return fallo
+        if not presupuesto.consumir():
+            return fallo
+        METRICAS.incrementar("reintentos", tipo=fallo.tipo)
+        pausa = espera(intento, politica)
+        log.evento("reintento", radicacion=numero, tipo=fallo.tipo, intento=intento, pausa=round(pausa, 2),
+                   error=str(fallo)[:200])
+        log.advertencia(f"{numero}: {fallo.tipo} (intento {intento}/{politica.intentos}), "
+                        f"reintento en {pausa:.1f}s")
+        if politica.renovar_circuito and al_renovar is not None:
+            al_renovar(fallo)
+        time.sleep(pausa)
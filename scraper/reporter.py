@@ -1,22 +1,77 @@
 # scraper/reporter.py
+"""
+Reporte PDF de actuaciones.
 
+Para volúmenes grandes (días de recuperación con decenas de miles de
+actuaciones) el reporte no arma la lista completa de flowables:
+
+- las actuaciones se ordenan por radicación y se recorren por grupos; los
+  flowables se generan a medida que ReportLab los consume (_Perezosa), así
+  en memoria solo hay unas decenas a la vez;
+- cada proceso se parte en tablas de REPORTE_FILAS_TABLA filas (con el
+  encabezado repetido), que ReportLab maqueta y divide entre páginas sin
+  problemas;
+- los estilos de párrafo y de tabla se crean una sola vez;
+- con REPORTE_PARALELO > 1 y más de REPORTE_FILAS_SECCION actuaciones, el
+  reporte se divide en secciones que se generan en procesos separados y
+  luego se concatenan (pypdf);
+- cada radicación tiene su entrada en el índice (outline) del PDF: además
+  de navegar, permite saber en qué páginas está (ver radicaciones_hasta).
+"""
 import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby, islice
+from operator import itemgetter
 from xml.sax.saxutils import escape
 from datetime import datetime, date, timedelta
-from collections import defaultdict
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.platypus import (
-    SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Flowable
 )
 
-from .config import PDF_PATH, DIAS_BUSQUEDA  # Eliminado LOG_TXT_PATH
+from .config import (PDF_PATH, DIAS_BUSQUEDA, REPORTE_FILAS_TABLA, REPORTE_PARALELO,
+                     REPORTE_FILAS_SECCION)
 from .logger import log  # Añadido logger
 
 # Nombres de los días de la semana en español
 DIAS_SEMANA = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
 
+# Estilos de tabla compartidos por todas las tablas del reporte
+ESTILO_ACTUACIONES = TableStyle([
+    ('BACKGROUND', (0,0), (-1,0), colors.lightblue),
+    ('LINEBELOW',  (0,0), (-1,0), 1, colors.grey),
+    ('LINEBELOW',  (0,1), (-1,-1), 0.5, colors.grey),
+    ('VALIGN',     (0,0), (-1,-1), 'TOP'),
+])
+ESTILO_ERRORES = TableStyle([
+    ('BACKGROUND', (0,0), (-1,0), colors.pink),
+    ('LINEBELOW',  (0,0), (-1,0), 1, colors.grey),
+    ('LINEBELOW',  (0,1), (-1,-1), 0.5, colors.grey),
+    ('VALIGN',     (0,0), (-1,-1), 'TOP'),
+])
+
+_estilos = None
+
+
+def estilos():
+    """Hoja de estilos del reporte (se crea una vez por proceso)."""
+    global _estilos
+    if _estilos is None:
+        styles = getSampleStyleSheet()
+        # Estilo que envuelve texto y permite celdas altas
+        styles.add(ParagraphStyle(
+            'wrap',
+            parent=styles['Normal'],
+            wordWrap='LTR',      # envuelve en espacios
+            leading=12           # espacio entre líneas
+        ))
+        _estilos = styles
+    return _estilos
+
+
 def format_datetime(dt: datetime) -> str:
     """Devuelve 'DíaSemana, YYYY-MM-DD HH:MM:SS AM/PM'."""
     dia = DIAS_SEMANA[dt.weekday()]
@@ -34,114 +89,229 @@ def format_duration(start_ts: float, end_ts: float) -> str:
         return f"{m}min {s}s"
     return f"{s}s"
 
-def generar_pdf(total_procesos, actes, errors, start_ts, end_ts):
+
+class _Perezosa(list):
     """
-    total_procesos: int
-    actes:   list of (numero, fecha, actuacion, anotacion, url)
-    errors:  list of (numero, mensaje)
-    start_ts, end_ts: floats
+    Lista de flowables que se rellena desde un iterador a medida que
+    doc.build la consume (build solo usa len(), [0], del e insert).
     """
-    os.makedirs(os.path.dirname(PDF_PATH), exist_ok=True)
-    doc = SimpleDocTemplate(PDF_PATH, pagesize=A4, title="Reporte de Actuaciones")
-    styles = getSampleStyleSheet()
-
-    # Estilo que envuelve texto y permite celdas altas
-    styleWrap = ParagraphStyle(
-        'wrap',
-        parent=styles['Normal'],
-        wordWrap='LTR',      # envuelve en espacios
-        leading=12           # espacio entre líneas
-    )
 
-    elements = []
+    def __init__(self, iterable, lote=64):
+        super().__init__()
+        self._fuente = iter(iterable)
+        self._lote = lote
 
-    # --- Encabezado con día de la semana, formato AM/PM y duración dinámica
-    start_dt = datetime.fromtimestamp(start_ts)
-    end_dt   = datetime.fromtimestamp(end_ts)
+    def __len__(self):
+        n = super().__len__()
+        if n < self._lote and self._fuente is not None:
+            nuevos = list(islice(self._fuente, self._lote))
+            if len(nuevos) < self._lote:
+                self._fuente = None
+            self.extend(nuevos)
+            n = super().__len__()
+        return n
 
-    # Rango de búsqueda
-    cutoff_date = date.today() - timedelta(days=DIAS_BUSQUEDA)
-    rango_text = (
-        f"<b>RANGO DE BÚSQUEDA:</b> ÚLTIMOS {DIAS_BUSQUEDA} DÍAS "
-        f"({cutoff_date.isoformat()} al {date.today().isoformat()})"
-    )
 
-    elements.append(Paragraph("REPORTE DIARIO DE ACTUACIONES", styles['Title']))
-    elements.append(Spacer(1, 12))
-    elements.append(Paragraph(rango_text, styles['Normal']))
-    elements.append(Spacer(1, 6))
-    elements.append(Paragraph(
-        f"<b>INICIO:</b> {format_datetime(start_dt)}<br/>"
-        f"<b>FIN:</b>   {format_datetime(end_dt)}<br/>"
-        f"<b>TIEMPO TRANSCURRIDO:</b> {format_duration(start_ts, end_ts)}",
-        styles['Normal']
-    ))
-    elements.append(Spacer(1, 12))
+# ---------- FLOWABLES ----------
+
+class _Marcador(Flowable):
+    """Entrada del índice del PDF en la posición actual; no ocupa espacio."""
+
+    def __init__(self, titulo):
+        super().__init__()
+        self.titulo = titulo
 
-    # --- Conteos generales en negrita
-    errores  = len(errors)
-    escaneos = total_procesos - errores
+    def wrap(self, *args):
+        return 0, 0
 
-    # Agrupo actuaciones por proceso
-    por_proceso = defaultdict(list)
-    for num, fecha, actu, anota, url in actes:
-        por_proceso[num].append((fecha, actu, anota))
+    def draw(self):
+        clave = f"rad-{self.titulo}"
+        self.canv.bookmarkPage(clave)
+        self.canv.addOutlineEntry(self.titulo, clave, level=0)
 
-    con_actos = len(por_proceso)
-    sin_actos = escaneos - con_actos
 
-    elements.append(Paragraph(
-        f"<b>Total procesos:</b>       {total_procesos}<br/>"
+def _encabezado(cabecera):
+    """Título, rango, tiempos y conteos generales."""
+    styles = estilos()
+    start_ts, end_ts = cabecera["start_ts"], cabecera["end_ts"]
+    cutoff_date = cabecera["cutoff"]
+    dias = (date.today() - cutoff_date).days
+    rango_text = (
+        f"<b>RANGO DE BÚSQUEDA:</b> ÚLTIMOS {dias} DÍAS "
+        f"({cutoff_date.isoformat()} al {date.today().isoformat()})"
+    )
+    yield Paragraph("REPORTE DIARIO DE ACTUACIONES", styles['Title'])
+    yield Spacer(1, 12)
+    yield Paragraph(rango_text, styles['Normal'])
+    yield Spacer(1, 6)
+    yield Paragraph(
+        f"<b>INICIO:</b> {format_datetime(datetime.fromtimestamp(start_ts))}<br/>"
+        f"<b>FIN:</b>   {format_datetime(datetime.fromtimestamp(end_ts))}<br/>"
+        f"<b>TIEMPO TRANSCURRIDO:</b> {format_duration(start_ts, end_ts)}",
+        styles['Normal']
+    )
+    yield Spacer(1, 12)
+    yield Paragraph(
+        f"<b>Total procesos:</b>       {cabecera['total']}<br/>"
         f"<b>----------------------------------------------------------------------------------------------------------------------------</b><br/>"
-        f"<b>Escaneados:</b>           {escaneos}<br/>"
-        f"<b>Con errores:</b>          {errores}<br/>"
-        f"<b>Con actuaciones:</b>     {con_actos}<br/>"
-        f"<b>Sin actuaciones:</b>     {sin_actos}<br/>",
+        f"<b>Escaneados:</b>           {cabecera['escaneos']}<br/>"
+        f"<b>Con errores:</b>          {cabecera['errores']}<br/>"
+        f"<b>Con actuaciones:</b>     {cabecera['con_actos']}<br/>"
+        f"<b>Sin actuaciones:</b>     {cabecera['escaneos'] - cabecera['con_actos']}<br/>"
+        + (f"<b>Ya enviadas (omitidas):</b> {cabecera['omitidas']}<br/>" if cabecera.get('omitidas') else ""),
         styles['Normal']
-    ))
-    elements.append(Spacer(1, 12))
+    )
+    yield Spacer(1, 12)
 
-    # --- Detalle de actuaciones
-    for num in sorted(por_proceso):
-        elements.append(Paragraph(f"Num. Radicación {num}", styles['Heading3']))
+
+def _proceso(num, filas, ancho):
+    """Encabezado del proceso y sus actuaciones en tablas de REPORTE_FILAS_TABLA filas."""
+    styles = estilos()
+    normal, wrap = styles['Normal'], styles['wrap']
+    col_widths = [60, 150, ancho - 210]
+    yield _Marcador(num)
+    yield Paragraph(f"Num. Radicación {num}", styles['Heading3'])
+    for i in range(0, len(filas), REPORTE_FILAS_TABLA):
         data = [["Fecha", "Actuación", "Anotación"]]
-        for fecha, actu, anota in por_proceso[num]:
+        for _, fecha, actu, anota, _url in filas[i:i + REPORTE_FILAS_TABLA]:
             data.append([
-                Paragraph(fecha, styles['Normal']),
-                Paragraph(actu, styles['Normal']),
-                Paragraph(escape(anota), styleWrap)
+                fecha,
+                Paragraph(escape(actu), normal),
+                Paragraph(escape(anota), wrap)
             ])
-        col_widths = [60, 150, doc.width - 210]
-        tbl = Table(data, colWidths=col_widths)
-        tbl.setStyle(TableStyle([
-            ('BACKGROUND', (0,0), (-1,0), colors.lightblue),
-            ('LINEBELOW',  (0,0), (-1,0), 1, colors.grey),
-            ('LINEBELOW',  (0,1), (-1,-1), 0.5, colors.grey),
-            ('VALIGN',     (0,0), (-1,-1), 'TOP'),
-        ]))
-        elements.append(tbl)
-        elements.append(Spacer(1, 8))
-
-    # --- Procesos con error
-    if errors:
-        elements.append(Paragraph("Procesos con ERROR", styles['Heading2']))
+        yield Table(data, colWidths=col_widths, repeatRows=1, style=ESTILO_ACTUACIONES)
+    yield Spacer(1, 8)
+
+
+def _errores(errors, ancho):
+    styles = estilos()
+    if not errors:
+        yield Paragraph("No hubo errores en ningún proceso.", styles['Normal'])
+        return
+    yield Paragraph("Procesos con ERROR", styles['Heading2'])
+    for i in range(0, len(errors), REPORTE_FILAS_TABLA):
         data_e = [["Número", "Mensaje"]]
-        for num, msg in errors:
-            p = Paragraph(msg.replace("\n", "<br/>"), styleWrap)
-            data_e.append([str(num), p])
-        col_widths = [150, doc.width - 150]
-        tbl_e = Table(data_e, colWidths=col_widths)
-        tbl_e.setStyle(TableStyle([
-            ('BACKGROUND', (0,0), (-1,0), colors.pink),
-            ('LINEBELOW',  (0,0), (-1,0), 1, colors.grey),
-            ('LINEBELOW',  (0,1), (-1,-1), 0.5, colors.grey),
-            ('VALIGN',     (0,0), (-1,-1), 'TOP'),
-        ]))
-        elements.append(tbl_e)
-    else:
-        elements.append(Paragraph("No hubo errores en ningún proceso.", styles['Normal']))
-
-    # --- Generar PDF
-    doc.build(elements)
-    log.exito(f"PDF generado: {PDF_PATH}")  # Cambiado de print a log
+        for num, msg in errors[i:i + REPORTE_FILAS_TABLA]:
+            data_e.append([str(num), Paragraph(escape(msg).replace("\n", "<br/>"), styles['wrap'])])
+        yield Table(data_e, colWidths=[150, ancho - 150], repeatRows=1, style=ESTILO_ERRORES)
+
+
+def _render(ruta, cabecera, grupos, errors):
+    """
+    Genera un PDF. cabecera: dict para el encabezado (None en secciones
+    intermedias); grupos: iterable de (numero, filas); errors: lista, o None
+    si la sección no lleva la tabla de errores.
+    """
+    doc = SimpleDocTemplate(ruta, pagesize=A4, title="Reporte de Actuaciones")
+
+    def flowables():
+        if cabecera is not None:
+            yield from _encabezado(cabecera)
+        for num, filas in grupos:
+            yield from _proceso(num, filas, doc.width)
+        if errors is not None:
+            yield from _errores(errors, doc.width)
+
+    doc.build(_Perezosa(flowables()))
+    return ruta
+
+
+# ---------- ORQUESTACIÓN ----------
+
+def _agrupar(ordenadas):
+    """(numero, filas) por radicación, sobre actuaciones ya ordenadas."""
+    for num, filas in groupby(ordenadas, key=itemgetter(0)):
+        yield num, list(filas)
+
+
+def _secciones(grupos, filas_por_seccion):
+    """Reparte los grupos en secciones de ~filas_por_seccion actuaciones."""
+    seccion, filas = [], 0
+    for num, grupo in grupos:
+        seccion.append((num, grupo))
+        filas += len(grupo)
+        if filas >= filas_por_seccion:
+            yield seccion
+            seccion, filas = [], 0
+    if seccion:
+        yield seccion
+
+
+def _render_paralelo(ruta, cabecera, ordenadas, errors, paralelo):
+    """Secciones en procesos separados, concatenadas en `ruta`. Retorna la cantidad de secciones."""
+    from pypdf import PdfWriter
+
+    secciones = list(_secciones(_agrupar(ordenadas), REPORTE_FILAS_SECCION))
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(ruta) or ".") as tmp:
+        rutas = [os.path.join(tmp, f"seccion_{i:04d}.pdf") for i in range(len(secciones))]
+        ultima = len(secciones) - 1
+        with ProcessPoolExecutor(max_workers=paralelo) as pool:
+            futuros = [
+                pool.submit(_render, r, cabecera if i == 0 else None, seccion,
+                            errors if i == ultima else None)
+                for i, (r, seccion) in enumerate(zip(rutas, secciones))
+            ]
+            for f in futuros:
+                f.result()
+        writer = PdfWriter()
+        for r in rutas:
+            writer.append(r)
+        with open(ruta, "wb") as f:
+            writer.write(f)
+        writer.close()
+    return len(secciones)
+
+
+def radicaciones_hasta(ruta, paginas):
+    """
+    Radicaciones del PDF cuyas actuaciones están completas en sus primeras
+    `paginas` páginas, según el índice. Cada una termina, a más tardar, en
+    la página donde empieza la siguiente; la última, al final del PDF.
+    """
+    from pypdf import PdfReader
+
+    lector = PdfReader(ruta)
+    inicios = [(lector.get_destination_page_number(d), d.title)
+               for d in lector.outline if not isinstance(d, list)]
+    fines = [pagina for pagina, _ in inicios[1:]] + [len(lector.pages) - 1]
+    return [titulo for (_, titulo), fin in zip(inicios, fines) if fin < paginas]
+
+
+def generar_pdf(total_procesos, actes, errors, start_ts, end_ts, cutoff=None,
+                ruta=PDF_PATH, paralelo=REPORTE_PARALELO, omitidas=0):
+    """
+    total_procesos: int
+    actes:   list of (numero, fecha, actuacion, anotacion, url)
+    errors:  list of (numero, mensaje)
+    start_ts, end_ts: floats
+    cutoff:  fecha de corte usada en el ciclo (por defecto hoy - DIAS_BUSQUEDA)
+    ruta:    archivo de salida
+    paralelo: procesos para generar secciones en paralelo (1 = secuencial)
+    omitidas: actuaciones del ciclo que no se incluyen por haberse enviado antes
+    """
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+
+    # Orden estable: cada proceso conserva el orden de sus actuaciones
+    ordenadas = sorted(actes, key=itemgetter(0))
+    escaneos = total_procesos - len(errors)
+    cabecera = {
+        "start_ts": start_ts,
+        "end_ts": end_ts,
+        "cutoff": cutoff or date.today() - timedelta(days=DIAS_BUSQUEDA),
+        "total": total_procesos,
+        "escaneos": escaneos,
+        "errores": len(errors),
+        "con_actos": sum(1 for _ in groupby(ordenadas, key=itemgetter(0))),
+        "omitidas": omitidas,
+    }
+
+    if paralelo > 1 and len(ordenadas) > REPORTE_FILAS_SECCION:
+        try:
+            secciones = _render_paralelo(ruta, cabecera, ordenadas, list(errors), paralelo)
+            log.exito(f"PDF generado: {ruta} ({secciones} secciones en paralelo)")
+            return
+        except ImportError:
+            log.advertencia("pypdf no está instalado; el PDF se genera en secuencia")
 
+    _render(ruta, cabecera, _agrupar(ordenadas), list(errors))
+    log.exito(f"PDF generado: {ruta}")  # Cambiado de print a log
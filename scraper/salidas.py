@@ -0,0 +1,313 @@
+# scraper/salidas.py
+"""
+Salidas de resultados en streaming.
+
+Antes las actuaciones se acumulaban en una lista compartida (bajo un lock)
+y actuaciones.csv se escribía recién al terminar el ciclo. Salidas recibe
+cada actuación apenas se encuentra y la escribe a disco desde un único
+hilo escritor:
+
+- los workers solo encolan (cola acotada a SALIDAS_BUFFER: si el disco no
+  da abasto, los workers esperan en lugar de crecer la memoria);
+- el hilo escritor agrupa lo encolado y lo pasa a cada escritor
+  configurado en SALIDAS (csv, jsonl, parquet), con flush + fsync cada
+  SALIDAS_FLUSH_SEGUNDOS;
+- si el proceso muere, lo ya escrito es utilizable (CSV y JSONL por línea;
+  Parquet en partes cerradas);
+- el reporte final se arma leyendo las actuaciones de vuelta (leer()).
+
+Salidas se comporta como la lista `actes` (extend/append/len), así los
+motores de escaneo no cambian. El journal sigue siendo la fuente para
+reanudar: al retomar un ciclo, las salidas se reescriben con lo que el
+journal tiene registrado.
+"""
+import csv
+import glob
+import json
+import os
+import queue
+import threading
+import time
+from datetime import date
+
+from .config import OUTPUT_DIR, SALIDAS, SALIDAS_BUFFER, SALIDAS_FLUSH_SEGUNDOS
+from .logger import log
+
+# Filas por parte del escritor Parquet
+PARQUET_FILAS = 5000
+# Máximo de actuaciones que el hilo escritor toma de la cola por vuelta
+LOTE = 500
+
+ENCABEZADO_CSV = ["idInterno", "quienRegistro", "fechaRegistro", "fechaEstado", "etapa", "actuacion",
+                  "observacion"]
+
+
+class EscritorCSV:
+    """output/actuaciones.csv con el formato de siempre (ver ENCABEZADO_CSV)."""
+
+    nombre = "csv"
+
+    def __init__(self, directorio, fecha_registro):
+        self.path = os.path.join(directorio, "actuaciones.csv")
+        self.fecha_registro = fecha_registro
+        self._f = None
+        self._writer = None
+
+    def abrir(self):
+        self._f = open(self.path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._f)
+        self._writer.writerow(ENCABEZADO_CSV)
+
+    def escribir(self, lote):
+        for numero, fecha, actu, anota, _url in lote:
+            self._writer.writerow([numero, "Sistema", self.fecha_registro, fecha, "", actu, anota])
+
+    def sincronizar(self):
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    def cerrar(self):
+        if self._f is not None:
+            self.sincronizar()
+            self._f.close()
+            self._f = None
+
+    def leer(self):
+        """Actuaciones escritas (sin la URL, que el CSV no guarda)."""
+        with open(self.path, newline="", encoding="utf-8") as f:
+            lector = csv.reader(f)
+            next(lector, None)
+            for fila in lector:
+                if len(fila) == len(ENCABEZADO_CSV):
+                    yield fila[0], fila[3], fila[5], fila[6], ""
+
+
+class EscritorJSONL:
+    """output/actuaciones.jsonl: una actuación por línea."""
+
+    nombre = "jsonl"
+
+    def __init__(self, directorio, fecha_registro):
+        self.path = os.path.join(directorio, "actuaciones.jsonl")
+        self._f = None
+
+    def abrir(self):
+        self._f = open(self.path, "w", encoding="utf-8")
+
+    def escribir(self, lote):
+        self._f.writelines(
+            json.dumps({"numero": numero, "fecha": fecha, "actuacion": actu, "anotacion": anota,
+                        "url": url}, ensure_ascii=False) + "\n"
+            for numero, fecha, actu, anota, url in lote
+        )
+
+    def sincronizar(self):
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    def cerrar(self):
+        if self._f is not None:
+            self.sincronizar()
+            self._f.close()
+            self._f = None
+
+    def leer(self):
+        with open(self.path, encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    r = json.loads(linea)
+                except ValueError:
+                    # Última línea truncada por una caída
+                    continue
+                yield r["numero"], r["fecha"], r["actuacion"], r["anotacion"], r.get("url", "")
+
+
+class EscritorParquet:
+    """
+    output/actuaciones_parquet/parte_NNNNN.parquet. Cada parte se escribe
+    completa y se renombra al final, así las partes presentes siempre se
+    pueden leer. Requiere pyarrow.
+    """
+
+    nombre = "parquet"
+    COLUMNAS = ["numero", "fecha", "actuacion", "anotacion", "url"]
+
+    def __init__(self, directorio, fecha_registro):
+        import pyarrow  # noqa: F401 (falla aquí si no está instalado)
+        self.directorio = os.path.join(directorio, "actuaciones_parquet")
+        self._pendientes = []
+        self._partes = 0
+
+    def abrir(self):
+        os.makedirs(self.directorio, exist_ok=True)
+        for path in glob.glob(os.path.join(self.directorio, "parte_*.parquet")):
+            os.remove(path)
+
+    def escribir(self, lote):
+        self._pendientes.extend(lote)
+        if len(self._pendientes) >= PARQUET_FILAS:
+            self._volcar()
+
+    def _volcar(self):
+        if not self._pendientes:
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        columnas = list(zip(*self._pendientes))
+        tabla = pa.table({nombre: list(valores) for nombre, valores in zip(self.COLUMNAS, columnas)})
+        path = os.path.join(self.directorio, f"parte_{self._partes:05d}.parquet")
+        pq.write_table(tabla, path + ".tmp")
+        os.replace(path + ".tmp", path)
+        self._partes += 1
+        self._pendientes = []
+
+    def sincronizar(self):
+        # Las partes se escriben enteras; lo pendiente espera a completar PARQUET_FILAS
+        pass
+
+    def cerrar(self):
+        self._volcar()
+
+    def leer(self):
+        import pyarrow.parquet as pq
+        for path in sorted(glob.glob(os.path.join(self.directorio, "parte_*.parquet"))):
+            for fila in pq.read_table(path).to_pylist():
+                yield tuple(fila[c] for c in self.COLUMNAS)
+
+
+ESCRITORES = {
+    "csv": EscritorCSV,
+    "jsonl": EscritorJSONL,
+    "parquet": EscritorParquet,
+}
+
+
+class Salidas:
+    """Cola acotada + hilo escritor hacia los escritores configurados."""
+
+    def __init__(self, start_ts, formatos=SALIDAS, directorio=OUTPUT_DIR,
+                 buffer=SALIDAS_BUFFER, intervalo=SALIDAS_FLUSH_SEGUNDOS):
+        fecha_registro = date.fromtimestamp(start_ts).isoformat()
+        self.directorio = directorio
+        self.escritores = []
+        for formato in formatos:
+            if formato not in ESCRITORES:
+                log.advertencia(f"Formato de salida desconocido: {formato}")
+                continue
+            try:
+                self.escritores.append(ESCRITORES[formato](directorio, fecha_registro))
+            except ImportError as e:
+                log.advertencia(f"Salida {formato} desactivada: {e}")
+        self.intervalo = intervalo
+        self.total = 0
+        self._cola = queue.Queue(maxsize=buffer)
+        self._lock = threading.Lock()
+        self._hilo = None
+
+    # ========== CICLO DE VIDA ==========
+
+    def iniciar(self, previas=()):
+        """Crea los archivos (vacíos, o con `previas` al reanudar) y arranca el hilo escritor."""
+        os.makedirs(self.directorio, exist_ok=True)
+        for escritor in list(self.escritores):
+            try:
+                escritor.abrir()
+            except OSError as e:
+                log.error(f"No se pudo abrir la salida {escritor.nombre}: {e}")
+                self.escritores.remove(escritor)
+        self._hilo = threading.Thread(target=self._escribir, name="salidas", daemon=True)
+        self._hilo.start()
+        self.extend(previas)
+        log.debug("Salidas: %s", ', '.join(e.nombre for e in self.escritores) or 'ninguna')
+        return self
+
+    def cerrar(self):
+        """Espera a que se escriba todo lo encolado y cierra los archivos."""
+        if self._hilo is None:
+            return
+        self._cola.put(None)
+        self._hilo.join()
+        self._hilo = None
+        for escritor in self.escritores:
+            try:
+                escritor.cerrar()
+            except Exception as e:
+                log.error(f"Error cerrando la salida {escritor.nombre}: {e}")
+
+    # ========== INTERFAZ DE LISTA ==========
+
+    def append(self, actuacion):
+        self._cola.put(actuacion)
+        with self._lock:
+            self.total += 1
+
+    def extend(self, actuaciones):
+        for actuacion in actuaciones:
+            self.append(actuacion)
+
+    def __len__(self):
+        return self.total
+
+    # ========== ESCRITURA ==========
+
+    def _escribir(self):
+        ultimo_sync = time.time()
+        fin = False
+        while not fin:
+            try:
+                primero = self._cola.get(timeout=self.intervalo)
+            except queue.Empty:
+                primero = ()
+            lote = []
+            if primero is None:
+                fin = True
+            elif primero:
+                lote.append(primero)
+                while len(lote) < LOTE:
+                    try:
+                        item = self._cola.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        fin = True
+                        break
+                    lote.append(item)
+            if lote:
+                self._a_escritores("escribir", lote)
+            if fin or time.time() - ultimo_sync >= self.intervalo:
+                self._a_escritores("sincronizar")
+                ultimo_sync = time.time()
+
+    def _a_escritores(self, metodo, *args):
+        for escritor in list(self.escritores):
+            try:
+                getattr(escritor, metodo)(*args)
+            except Exception as e:
+                log.error(f"Salida {escritor.nombre} desactivada: {e}")
+                self.escritores.remove(escritor)
+                try:
+                    escritor.cerrar()
+                except Exception:
+                    pass
+
+    # ========== LECTURA ==========
+
+    def leer(self):
+        """
+        Actuaciones escritas, desde el primer escritor que las pueda leer
+        (JSONL primero: conserva la URL). None si ninguno se puede leer.
+        """
+        orden = sorted(self.escritores, key=lambda e: e.nombre != "jsonl")
+        for escritor in orden:
+            try:
+                return list(escritor.leer())
+            except Exception as e:
+                log.advertencia(f"No se pudo leer la salida {escritor.nombre}: {e}")
+        return None
+
+
+def exportar(actes, start_ts, formatos=SALIDAS, directorio=OUTPUT_DIR):
+    """Escribe de una vez una lista de actuaciones en todas las salidas."""
+    salidas = Salidas(start_ts, formatos, directorio).iniciar(actes)
+    salidas.cerrar()
+    return salidas
@@ -0,0 +1,200 @@
+# scraper/state_store.py
+"""
+Estado persistente por radicación (SQLite en output/).
+
+Guarda, para cada proceso, la última "fecha última actuación" vista, un
+hash del contenido de sus actuaciones y la fecha del último escaneo. Con
+esto worker_task evita entrar al detalle de procesos sin cambios y solo
+reporta actuaciones que no se habían visto antes.
+
+También registra las ejecuciones completadas para ampliar la fecha de corte
+cuando se saltó una ejecución programada.
+"""
+import hashlib
+import sqlite3
+import threading
+from datetime import date, timedelta
+
+from .config import STATE_DB_PATH, DIAS_BUSQUEDA
+from .logger import log
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS procesos (
+    numero          TEXT PRIMARY KEY,
+    fecha_ultima    TEXT,
+    hash            TEXT,
+    ultimo_escaneo  TEXT
+);
+CREATE TABLE IF NOT EXISTS actuaciones (
+    numero  TEXT NOT NULL,
+    clave   TEXT NOT NULL,
+    fecha   TEXT NOT NULL,
+    PRIMARY KEY (numero, clave)
+);
+CREATE TABLE IF NOT EXISTS ejecuciones (
+    fecha       TEXT PRIMARY KEY,
+    finalizada  TEXT NOT NULL
+);
+"""
+
+
+def clave_actuacion(fecha, actuacion, anotacion):
+    """Identificador estable de una actuación (fecha + textos)."""
+    texto = "\x1f".join((str(fecha), actuacion.strip(), anotacion.strip()))
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()
+
+
+def hash_actuaciones(filas):
+    """Hash del conjunto de actuaciones (independiente del orden)."""
+    claves = sorted(clave_actuacion(f, a, n) for f, a, n in filas)
+    return hashlib.sha1("".join(claves).encode("ascii")).hexdigest()
+
+
+class StateStore:
+    def __init__(self, path=STATE_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(ESQUEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ========== PROCESOS ==========
+
+    def obtener(self, numero):
+        """Dict con el estado guardado del proceso, o None si nunca se escaneó."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fecha_ultima, hash, ultimo_escaneo FROM procesos WHERE numero = ?",
+                (numero,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"fecha_ultima": row[0], "hash": row[1], "ultimo_escaneo": row[2]}
+
+    def estados(self):
+        """{numero: (fecha_ultima, ultimo_escaneo)} de todos los procesos (fechas o None)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT numero, fecha_ultima, ultimo_escaneo FROM procesos"
+            ).fetchall()
+        return {
+            numero: (date.fromisoformat(fecha) if fecha else None,
+                     date.fromisoformat(escaneo) if escaneo else None)
+            for numero, fecha, escaneo in rows
+        }
+
+    def sin_cambios(self, numero, fecha_ultima):
+        """
+        True si no hace falta abrir el detalle: la fecha de última actuación
+        es la misma que ya se procesó y el escaneo anterior fue en un día
+        posterior (así ya se vieron todas las actuaciones de esa fecha).
+        """
+        estado = self.obtener(numero)
+        if not estado or not estado["hash"] or not estado["ultimo_escaneo"]:
+            return False
+        fecha = fecha_ultima.isoformat()
+        return estado["fecha_ultima"] == fecha and estado["ultimo_escaneo"] > fecha
+
+    def marcar_escaneado(self, numero, fecha_ultima, hoy=None):
+        """Registra un escaneo sin detalle (fuera de período o sin cambios)."""
+        hoy = (hoy or date.today()).isoformat()
+        fecha = fecha_ultima.isoformat() if fecha_ultima else None
+        with self._lock:
+            self._conn.execute(
+                """INSERT INTO procesos (numero, fecha_ultima, ultimo_escaneo) VALUES (?, ?, ?)
+                   ON CONFLICT(numero) DO UPDATE SET
+                       ultimo_escaneo = excluded.ultimo_escaneo,
+                       hash = CASE WHEN procesos.fecha_ultima = excluded.fecha_ultima
+                                   THEN procesos.hash END,
+                       fecha_ultima = excluded.fecha_ultima""",
+                (numero, fecha, hoy)
+            )
+
+    def nuevas(self, numero, filas):
+        """
+        Filtra, sin registrar nada, las filas (fecha, actuacion, anotacion)
+        que no se habían visto antes.
+        """
+        if not filas:
+            return []
+        with self._lock:
+            vistas = {clave for clave, in self._conn.execute(
+                "SELECT clave FROM actuaciones WHERE numero = ?", (numero,)
+            )}
+        return [fila for fila in filas if clave_actuacion(*fila) not in vistas]
+
+    def registrar(self, numero, fecha_ultima, filas, hoy=None):
+        """
+        Guarda las actuaciones extraídas del detalle.
+        filas: lista de (fecha, actuacion, anotacion).
+        Retorna solo las filas que no se habían visto antes.
+        """
+        hoy = (hoy or date.today()).isoformat()
+        nuevas = []
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for fila in filas:
+                    cur = self._conn.execute(
+                        "INSERT OR IGNORE INTO actuaciones (numero, clave, fecha) VALUES (?, ?, ?)",
+                        (numero, clave_actuacion(*fila), str(fila[0]))
+                    )
+                    if cur.rowcount:
+                        nuevas.append(fila)
+                self._conn.execute(
+                    """INSERT INTO procesos (numero, fecha_ultima, hash, ultimo_escaneo)
+                       VALUES (?, ?, ?, ?)
+                       ON CONFLICT(numero) DO UPDATE SET
+                           fecha_ultima = excluded.fecha_ultima,
+                           hash = excluded.hash,
+                           ultimo_escaneo = excluded.ultimo_escaneo""",
+                    (numero, fecha_ultima.isoformat(), hash_actuaciones(filas), hoy)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return nuevas
+
+    def purgar(self, antes_de):
+        """Borra claves de actuaciones anteriores a la fecha dada."""
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM actuaciones WHERE fecha < ?", (antes_de.isoformat(),))
+        return cur.rowcount
+
+    # ========== EJECUCIONES ==========
+
+    def ultima_ejecucion(self):
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(fecha) FROM ejecuciones").fetchone()
+        return date.fromisoformat(row[0]) if row and row[0] else None
+
+    def registrar_ejecucion(self, fecha=None):
+        fecha = fecha or date.today()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ejecuciones (fecha, finalizada) VALUES (?, datetime('now'))",
+                (fecha.isoformat(),)
+            )
+
+
+def calcular_cutoff(store=None, hoy=None):
+    """
+    Fecha de corte del ciclo: hoy - DIAS_BUSQUEDA, ampliada hasta la última
+    ejecución completada si desde entonces se saltó alguna.
+    """
+    hoy = hoy or date.today()
+    cutoff = hoy - timedelta(days=DIAS_BUSQUEDA)
+    if store is None:
+        return cutoff
+    ultima = store.ultima_ejecucion()
+    if ultima and ultima < cutoff:
+        log.advertencia(f"Última ejecución completada: {ultima}. "
+                        f"Ampliando fecha de corte de {cutoff} a {ultima}")
+        return ultima
+    return cutoff
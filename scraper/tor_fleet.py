@@ -0,0 +1,215 @@
+# scraper/tor_fleet.py
+"""
+Flota de instancias TOR.
+
+Un solo cliente TOR se vuelve el cuello de botella (ancho de banda y
+construcción de circuitos) al subir NUM_THREADS. TorFleet lanza N procesos
+tor, cada uno con su SocksPort, ControlPort y DataDirectory, los supervisa
+y asigna cada worker a la instancia sana con menos carga. Si una instancia
+deja de estar sana, sus workers se reasignan en la siguiente tarea.
+
+Con TOR_INSTANCIAS=0 no se usa la flota y todo sale por el TOR del sistema
+(127.0.0.1:9050/9051).
+"""
+import os
+import subprocess
+import threading
+import time
+from queue import Queue, Empty
+
+from stem.control import Controller
+
+from .config import (
+    TOR_BIN, TOR_INSTANCIAS, TOR_FLEET_PUERTO_BASE, TOR_FLEET_DIR, TOR_FLEET_CHEQUEO, TOR_ESPERA_TIMEOUT
+)
+from .browser import new_chrome_driver
+from .arranque_tor import esperar_tor
+from .logger import log
+
+
+class TorInstance:
+    """Un proceso tor con sus propios puertos y directorio de datos."""
+
+    def __init__(self, indice, socks_port, control_port, data_dir):
+        self.indice = indice
+        self.socks_port = socks_port
+        self.control_port = control_port
+        self.data_dir = data_dir
+        self.proceso = None
+        self.sana = False
+        self.reinicios = 0
+
+    @property
+    def nombre(self):
+        return f"tor-{self.indice}"
+
+    @property
+    def proxy(self):
+        return f"socks5h://127.0.0.1:{self.socks_port}"
+
+    def iniciar(self):
+        os.makedirs(self.data_dir, mode=0o700, exist_ok=True)
+        cmd = [
+            TOR_BIN,
+            "--SocksPort", f"127.0.0.1:{self.socks_port}",
+            "--ControlPort", f"127.0.0.1:{self.control_port}",
+            "--DataDirectory", self.data_dir,
+            "--CookieAuthentication", "1",
+            "--Log", f"notice file {os.path.join(self.data_dir, 'tor.log')}",
+        ]
+        self.proceso = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.sana = False
+        log.tor("%s iniciado (socks %s, control %s, pid %s)",
+                self.nombre, self.socks_port, self.control_port, self.proceso.pid)
+
+    def vivo(self):
+        return self.proceso is not None and self.proceso.poll() is None
+
+    def circuito_establecido(self):
+        """Consulta al puerto de control si ya hay un circuito utilizable."""
+        try:
+            with Controller.from_port(port=self.control_port) as controller:
+                controller.authenticate()
+                return controller.get_info("status/circuit-established") == "1"
+        except Exception as e:
+            log.debug("%s: control no disponible (%s)", self.nombre, e)
+            return False
+
+    def detener(self):
+        if self.vivo():
+            self.proceso.terminate()
+            try:
+                self.proceso.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.proceso.kill()
+        self.sana = False
+
+
+class TorFleet:
+    def __init__(self, instancias=TOR_INSTANCIAS, puerto_base=TOR_FLEET_PUERTO_BASE,
+                 data_root=TOR_FLEET_DIR, intervalo_chequeo=TOR_FLEET_CHEQUEO):
+        self.instancias = [
+            TorInstance(i, puerto_base + 2 * i, puerto_base + 2 * i + 1,
+                        os.path.join(data_root, f"tor_{i}"))
+            for i in range(instancias)
+        ]
+        self.intervalo_chequeo = intervalo_chequeo
+        self._asignaciones = {}
+        self._lock = threading.Lock()
+        self._lock_revision = threading.Lock()
+        self._parar = threading.Event()
+        self._supervisor = None
+
+    # ========== CICLO DE VIDA ==========
+
+    def iniciar(self):
+        """Lanza todas las instancias y el hilo supervisor."""
+        log.progreso(f"Iniciando flota TOR de {len(self.instancias)} instancias...")
+        for inst in self.instancias:
+            inst.iniciar()
+        self._supervisor = threading.Thread(target=self._supervisar, name="tor-fleet", daemon=True)
+        self._supervisor.start()
+
+    def detener(self):
+        self._parar.set()
+        for inst in self.instancias:
+            inst.detener()
+        log.tor("Flota TOR detenida")
+
+    def esperar_listas(self, timeout=TOR_ESPERA_TIMEOUT, minimo=1):
+        """
+        Espera hasta que al menos `minimo` instancias tengan circuito. Cada
+        instancia se sigue en su propio hilo con los eventos de arranque de
+        su puerto de control; se retorna en cuanto bastan (las demás se
+        marcan sanas al terminar). True si se alcanzó antes del timeout.
+        """
+        inicio = time.time()
+        self.revisar()
+        pendientes = [inst for inst in self.instancias if not inst.sana]
+        sanas = len(self.instancias) - len(pendientes)
+        resultados = Queue()
+
+        def esperar(inst):
+            listo = esperar_tor(inst.control_port, inst.socks_port, timeout=timeout, nombre=inst.nombre)
+            if listo:
+                inst.sana = True
+            resultados.put(listo)
+
+        for inst in pendientes:
+            threading.Thread(target=esperar, args=(inst,), name=f"espera-{inst.nombre}", daemon=True).start()
+        for _ in pendientes:
+            if sanas >= minimo:
+                break
+            try:
+                sanas += resultados.get(timeout=max(0.1, timeout - (time.time() - inicio)))
+            except Empty:
+                break
+        if sanas >= minimo:
+            log.exito(f"Flota TOR lista: {sanas}/{len(self.instancias)} instancias "
+                      f"({int(time.time() - inicio)}s)")
+            return True
+        log.error(f"❌ Flota TOR sin circuitos después de {int(time.time() - inicio)} segundos")
+        return False
+
+    # ========== SALUD ==========
+
+    def revisar(self):
+        """Actualiza la salud de cada instancia y reinicia las que murieron."""
+        with self._lock_revision:
+            for inst in self.instancias:
+                if not inst.vivo():
+                    if inst.proceso is not None:
+                        log.advertencia(f"{inst.nombre} terminó inesperadamente, reiniciando")
+                        inst.reinicios += 1
+                    inst.iniciar()
+                    continue
+                estaba_sana = inst.sana
+                inst.sana = inst.circuito_establecido()
+                if estaba_sana and not inst.sana:
+                    log.advertencia(f"{inst.nombre} perdió su circuito; se reasignarán sus workers")
+
+    def _supervisar(self):
+        while not self._parar.wait(self.intervalo_chequeo):
+            try:
+                self.revisar()
+            except Exception as e:
+                log.debug("Error supervisando flota TOR: %s", e)
+
+    # ========== ASIGNACIÓN ==========
+
+    def _carga(self, inst):
+        return sum(1 for asignada in self._asignaciones.values() if asignada is inst)
+
+    def asignar(self, worker_id):
+        """
+        Devuelve la instancia del worker. Si no tiene una, o la suya no está
+        sana, lo mueve a la instancia sana con menos workers.
+        """
+        with self._lock:
+            actual = self._asignaciones.get(worker_id)
+            if actual is not None and actual.sana:
+                return actual
+            candidatas = [inst for inst in self.instancias if inst.sana] or self.instancias
+            elegida = min(candidatas, key=lambda inst: (self._carga(inst), inst.indice))
+            self._asignaciones[worker_id] = elegida
+            if actual is not None and actual is not elegida:
+                log.tor("Worker %s: %s → %s", worker_id, actual.nombre, elegida.nombre)
+            return elegida
+
+    def asignacion_sana(self, worker_id):
+        """False si el worker debe recrear su conexión en otra instancia."""
+        with self._lock:
+            inst = self._asignaciones.get(worker_id)
+            return inst is not None and inst.sana
+
+    def proxies(self):
+        """Un proxy SOCKS por instancia (para los clientes HTTP)."""
+        return [inst.proxy for inst in self.instancias]
+
+    def driver_factory(self):
+        """Fábrica para DriverPool: crea cada driver sobre la instancia asignada."""
+        def crear(worker_id):
+            inst = self.asignar(worker_id)
+            return new_chrome_driver(worker_id, socks_port=inst.socks_port,
+                                     control_port=inst.control_port)
+        return crear
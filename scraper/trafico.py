@@ -0,0 +1,127 @@
+# scraper/trafico.py
+"""
+Política de recursos y contabilidad de tráfico de los drivers de Chrome.
+
+Sobre TOR el ancho de banda es lo más escaso: cada consulta del SPA
+descarga además fuentes de Google, CSS, íconos, imágenes y analítica que
+el scraper no necesita. aplicar_politica() los bloquea con CDP
+(Network.setBlockedURLs) antes de cargar el sitio.
+
+ContadorTrafico acumula, por driver, las peticiones, los bytes recibidos y
+las peticiones bloqueadas, leyendo los eventos Network.* del log de
+rendimiento de ChromeDriver (goog:loggingPrefs).
+"""
+import json
+import threading
+
+from .config import RECURSOS_POLITICA, RECURSOS_BLOQUEO_EXTRA
+from .logger import log
+
+# Patrones (comodín '*') por categoría de recurso
+PATRONES = {
+    "imagenes": ["*.png", "*.png?*", "*.jpg", "*.jpg?*", "*.jpeg", "*.gif", "*.webp",
+                 "*.svg", "*.svg?*", "*.ico", "*.ico?*"],
+    "fuentes": ["*fonts.googleapis.com*", "*fonts.gstatic.com*", "*.woff", "*.woff?*",
+                "*.woff2", "*.woff2?*", "*.ttf", "*.ttf?*", "*.eot", "*.otf"],
+    "analitica": ["*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+                  "*hotjar.com*", "*facebook.net*"],
+    "estilos": ["*.css", "*.css?*"],
+    "medios": ["*.mp4", "*.webm", "*.mp3"],
+}
+
+# Categorías bloqueadas por cada política
+POLITICAS = {
+    # Solo el JS del SPA y las llamadas XHR al backend
+    "estricta": ("imagenes", "fuentes", "analitica", "estilos", "medios"),
+    # Conserva los estilos (por si algún selector depende de la visibilidad)
+    "ligera": ("imagenes", "fuentes", "analitica", "medios"),
+    "ninguna": (),
+}
+
+
+def patrones_bloqueo(politica=RECURSOS_POLITICA):
+    """Lista de patrones de URL que se bloquean con la política dada."""
+    if politica not in POLITICAS:
+        log.advertencia(f"Política de recursos desconocida '{politica}', se usa 'ligera'")
+        politica = "ligera"
+    patrones = [p for categoria in POLITICAS[politica] for p in PATRONES[categoria]]
+    return patrones + list(RECURSOS_BLOQUEO_EXTRA)
+
+
+def aplicar_politica(driver, politica=RECURSOS_POLITICA):
+    """Activa el bloqueo de URLs por CDP en el driver. Retorna la cantidad de patrones."""
+    patrones = patrones_bloqueo(politica)
+    if not patrones:
+        return 0
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patrones})
+        log.debug("Bloqueo de recursos '%s': %d patrones", politica, len(patrones))
+    except Exception as e:
+        log.advertencia(f"No se pudo aplicar el bloqueo de recursos: {e}")
+        return 0
+    return len(patrones)
+
+
+class ContadorTrafico:
+    """Peticiones, bytes recibidos y bloqueos de un driver (acumulados)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.peticiones = 0
+        self.bytes = 0
+        self.bloqueadas = 0
+
+    def sumar(self, peticiones=0, bytes_=0, bloqueadas=0):
+        with self._lock:
+            self.peticiones += peticiones
+            self.bytes += bytes_
+            self.bloqueadas += bloqueadas
+
+    def reiniciar(self):
+        with self._lock:
+            self.peticiones = self.bytes = self.bloqueadas = 0
+
+    def __repr__(self):
+        return (f"{self.peticiones} peticiones, {self.bytes / 1024:.1f} KB, "
+                f"{self.bloqueadas} bloqueadas")
+
+
+# Total de todos los drivers del ciclo (lo reinicia y reporta ejecutar_ciclo)
+TOTAL = ContadorTrafico()
+
+
+def drenar(driver):
+    """
+    Lee los eventos de red pendientes del log de rendimiento del driver y
+    los suma a su contador y al total. Retorna (peticiones, bytes, bloqueadas)
+    de este tramo. El log se vacía en cada lectura, así que conviene llamarlo
+    tras cada proceso para que no crezca.
+    """
+    contador = getattr(driver, "trafico", None)
+    if contador is None:
+        return 0, 0, 0
+    try:
+        entradas = driver.get_log("performance")
+    except Exception as e:
+        log.debug("No se pudo leer el log de rendimiento: %s", e)
+        return 0, 0, 0
+
+    peticiones = bytes_ = bloqueadas = 0
+    for entrada in entradas:
+        try:
+            mensaje = json.loads(entrada["message"])["message"]
+        except (KeyError, ValueError, TypeError):
+            continue
+        metodo = mensaje.get("method")
+        if metodo == "Network.requestWillBeSent":
+            peticiones += 1
+        elif metodo == "Network.loadingFinished":
+            bytes_ += int(mensaje.get("params", {}).get("encodedDataLength", 0))
+        elif metodo == "Network.loadingFailed":
+            if mensaje.get("params", {}).get("blockedReason"):
+                bloqueadas += 1
+
+    contador.sumar(peticiones, bytes_, bloqueadas)
+    TOTAL.sumar(peticiones, bytes_, bloqueadas)
+    return peticiones, bytes_, bloqueadas
@@ -1,6 +1,5 @@
 # scraper/worker.py
 import time
-import random
 import itertools
 import os
 from datetime import date, timedelta, datetime
@@ -9,8 +8,15 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 
-from .config import DIAS_BUSQUEDA, DEBUG_SCRAPER
-from .browser import handle_modal_error, renew_tor_circuit
+from .config import DIAS_BUSQUEDA, DEBUG_SCRAPER, CONSULTA_URL
+from .browser import handle_modal_error, is_page_maintenance
+from .reintentos import FalloScraper
+from .page_state import esperar_estado
+from .extractor import (extraer_tablas, fila_resultado, click_fecha, parse_actuaciones, parse_fecha,
+                        hay_actuaciones)
+from .pacing import pacer
+from .trafico import drenar
+from .metricas import METRICAS
 from .logger import log
 
 # Directorios de debug (solo se usan si DEBUG_SCRAPER=True)
@@ -23,6 +29,13 @@ if DEBUG_SCRAPER:
 
 process_counter = itertools.count(1)
 TOTAL_PROCESSES = 0
+# Fijados por ejecutar_ciclo: fecha de corte del ciclo y StateStore (escaneo incremental)
+CUTOFF = None
+STATE_STORE = None
+# Fecha de corte propia de los procesos que se saltaron días (ver prioridad.py)
+CUTOFFS = {}
+
+INPUT_XPATH = "//input[@maxlength='23']"
 
 
 def save_debug_info(driver, numero, step_name):
@@ -36,7 +49,7 @@ def save_debug_info(driver, numero, step_name):
         driver.save_screenshot(ss_path)
         with open(html_path, "w", encoding="utf-8") as f:
             f.write(driver.page_source)
-        log.debug(f"Screenshot guardado: {step_name}")
+        log.debug("Screenshot guardado: %s", step_name)
     except Exception as e:
         log.error(f"Error guardando debug {step_name}: {e}")
 
@@ -46,40 +59,30 @@ def wait_for_results(driver, timeout=60):
     Espera a que la página cargue resultados o muestre modal.
     Retorna: 'success', 'no_results', 'modal', 'timeout'
     """
-    start_time = time.time()
-    while time.time() - start_time < timeout:
-        try:
-            # Modal activo
-            modals = driver.find_elements(By.XPATH, "//div[contains(@class, 'v-dialog--active')]")
-            if modals:
-                return 'modal'
-
-            # Tablas de resultados
-            tables = driver.find_elements(By.XPATH, "//table")
-            if tables:
-                for table in tables:
-                    rows = table.find_elements(By.XPATH, ".//tbody//tr")
-                    if rows:
-                        return 'success'
-
-            # Mensaje de "no se encontraron"
-            no_results = driver.find_elements(By.XPATH,
-                "//*[contains(text(), 'No se encontraron') or contains(text(), 'Sin resultados')]")
-            if no_results:
-                return 'no_results'
-
-            # Indicadores de carga
-            loading = driver.find_elements(By.XPATH, "//*[contains(@class, 'v-progress-circular')]")
-            if not loading:
-                time.sleep(2)
+    estado, segundos = esperar_estado(driver, timeout=timeout)
+    log.detalle("Estado '%s' detectado en %.2fs", estado, segundos)
+    return estado
 
-        except Exception as e:
-            log.debug(f"Error en wait_for_results: {e}")
-        time.sleep(2)
-    return 'timeout'
+
+def cutoff_de(numero):
+    """Fecha de corte del proceso: la propia si se saltó días, si no la del ciclo."""
+    return CUTOFFS.get(numero) or CUTOFF or date.today() - timedelta(days=DIAS_BUSQUEDA)
+
+
+def registrar_etapa(etapas, nombre, inicio):
+    """Acumula la duración de una etapa del proceso (segundos desde `inicio`)."""
+    segundos = time.time() - inicio
+    etapas[nombre] = etapas.get(nombre, 0) + segundos
+    METRICAS.observar("etapa_segundos", segundos, etapa=nombre)
+    log.evento("etapa", etapa=nombre, segundos=round(segundos, 3))
 
 
 def worker_task(numero, driver, results, actes, errors, lock):
+    """
+    Un intento de consulta con Selenium. Agrega a `actes` las actuaciones
+    del período y retorna la fecha de la última actuación si hay filas que
+    registrar en el StateStore (ver main.procesar); si no, None.
+    """
     idx = next(process_counter)
     total = TOTAL_PROCESSES or idx
 
@@ -87,160 +90,156 @@ def worker_task(numero, driver, results, actes, errors, lock):
     log.progreso(f"[{idx}/{total}] {numero}")
     log.separador()
 
-    cutoff = date.today() - timedelta(days=DIAS_BUSQUEDA)
-    log.debug(f"Fecha corte: {cutoff}")
+    cutoff = cutoff_de(numero)
+    log.debug("Fecha corte: %s", cutoff)
+    store = STATE_STORE
+    etapas = {}
+    pendiente = None
 
-    max_retries = 3
-    for attempt in range(max_retries):
+    try:
+        # Cargar página
+        t = time.time()
+        driver.get(CONSULTA_URL)
+        input_field = pacer.esperar(
+            "carga", driver, EC.presence_of_element_located((By.XPATH, INPUT_XPATH))
+        )
+        registrar_etapa(etapas, "carga", t)
+        save_debug_info(driver, numero, "01_pagina_cargada")
+
+        # Campo de texto
+        t = time.time()
+        pacer.escribir(driver, input_field, numero)
+        log.debug("Número ingresado: %s", numero)
         try:
-            log.accion(f"Intento {attempt+1}/{max_retries}")
-
-            # Cargar página
-            driver.get("https://consultaprocesos.ramajudicial.gov.co/Procesos/NumeroRadicacion")
-            time.sleep(5)
-            save_debug_info(driver, numero, f"01_pagina_cargada_a{attempt}")
-
-            # Campo de texto
-            input_field = WebDriverWait(driver, 20).until(
-                EC.presence_of_element_located((By.XPATH, "//input[@maxlength='23']"))
-            )
-            input_field.clear()
-            for char in str(numero):
-                input_field.send_keys(char)
-                time.sleep(random.uniform(0.05, 0.1))
-            log.debug(f"Número ingresado: {numero}")
-            try:
-                counter = driver.find_element(By.XPATH, "//div[contains(@class, 'v-counter')]")
-                log.debug(f"Contador: {counter.text}")
-            except:
-                pass
-            save_debug_info(driver, numero, f"03_numero_ingresado_a{attempt}")
-            time.sleep(random.uniform(1, 2))
-
-            # Radio button "Todos los Procesos"
-            try:
-                radios = driver.find_elements(By.XPATH, "//div[contains(@class, 'v-radio')]//label")
-                for r in radios:
-                    if "Todos los Procesos" in r.text:
-                        log.accion("Opción: Todos los Procesos")
-                        r.click()
-                        time.sleep(1)
-                        break
-            except Exception as e:
-                log.debug(f"No se pudo seleccionar radio: {e}")
-
-            # Click en Consultar
-            consultar_btn = WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable((By.XPATH, "//button[.//span[contains(text(), 'Consultar')]]"))
-            )
-            driver.execute_script("arguments[0].click();", consultar_btn)
-            log.accion("Consultando...")
-
-            # Esperar resultados
-            result_status = wait_for_results(driver, timeout=45)
-            save_debug_info(driver, numero, f"04_despues_consultar_a{attempt}")
-
-            if result_status == 'success':
-                log.proceso("Resultados encontrados")
-                # Procesar tabla (similar a tu código actual)
-                tables = driver.find_elements(By.XPATH, "//table")
-                for table in tables:
-                    rows = table.find_elements(By.XPATH, ".//tbody//tr")
-                    if rows:
-                        log.debug(f"Tabla con {len(rows)} filas")
-                        save_debug_info(driver, numero, f"05_tabla_resultados_a{attempt}")
-                        cells = rows[0].find_elements(By.TAG_NAME, "td")
-                        if len(cells) >= 3:
-                            # Extraer fecha
-                            try:
-                                fecha_btn = cells[2].find_element(By.TAG_NAME, "button")
-                                fecha_text = fecha_btn.text.strip()
-                                log.proceso(f"Fecha: {fecha_text}")
-                                fecha_obj = datetime.strptime(fecha_text, "%Y-%m-%d").date()
-                                if fecha_obj >= cutoff:
-                                    log.exito("✓ DENTRO del período")
-                                    driver.execute_script("arguments[0].click();", fecha_btn)
-                                    time.sleep(8)
-                                    save_debug_info(driver, numero, f"06_click_fecha_a{attempt}")
-
-                                    # Extraer actuaciones
-                                    act_tables = driver.find_elements(By.XPATH, "//table")
-                                    for act_table in act_tables:
-                                        act_rows = act_table.find_elements(By.XPATH, ".//tbody//tr")
-                                        if len(act_rows) > 1:
-                                            log.proceso("Extrayendo actuaciones...")
-                                            log.debug(f"Encontradas {len(act_rows)-1} actuaciones")
-                                            for row in act_rows[1:]:
-                                                act_cells = row.find_elements(By.TAG_NAME, "td")
-                                                if len(act_cells) >= 3:
-                                                    act_fecha = act_cells[0].text.strip()
-                                                    act_nombre = act_cells[1].text.strip()
-                                                    act_anotacion = act_cells[2].text.strip()
-                                                    try:
-                                                        act_fecha_obj = datetime.strptime(act_fecha, "%Y-%m-%d").date()
-                                                        if act_fecha_obj >= cutoff:
-                                                            with lock:
-                                                                actes.append((
-                                                                    numero,
-                                                                    act_fecha,
-                                                                    act_nombre,
-                                                                    act_anotacion,
-                                                                    driver.current_url
-                                                                ))
-                                                            log.debug(f"✅ {act_fecha}: {act_nombre[:50]}...")
-                                                    except:
-                                                        continue
-                                            break
-                                    driver.back()
-                                    time.sleep(5)
-                                else:
-                                    log.proceso("⏭️ Fuera de período")
-                            except Exception as e:
-                                log.debug(f"No se pudo extraer fecha: {e}")
-                        break
-                break  # Éxito, salir del bucle de reintentos
-
-            elif result_status == 'no_results':
-                log.proceso("No hay resultados para este proceso")
-                break
-
-            elif result_status == 'modal':
-                log.advertencia(f"Modal detectado en intento {attempt+1}")
-                save_debug_info(driver, numero, f"modal_a{attempt}")
-                handle_modal_error(driver, numero)
-                if renew_tor_circuit():
-                    log.exito("Circuito TOR renovado, reintentando...")
-                    continue
-                else:
-                    log.error("No se pudo renovar circuito TOR")
-                    if attempt == max_retries - 1:
-                        raise Exception("Error de red no recuperable después de reintentos")
-                    else:
-                        continue
-
-            elif result_status == 'timeout':
-                log.advertencia("Timeout esperando resultados")
-                if attempt == max_retries - 1:
-                    raise Exception("Timeout después de reintentos")
-                else:
-                    if renew_tor_circuit():
-                        log.exito("Circuito TOR renovado, reintentando...")
-                        continue
-                    else:
-                        continue
+            counter = driver.find_element(By.XPATH, "//div[contains(@class, 'v-counter')]")
+            log.debug("Contador: %s", counter.text)
+        except:
+            pass
+        save_debug_info(driver, numero, "03_numero_ingresado")
+        pacer.pausa("input")
+
+        registrar_etapa(etapas, "input", t)
 
+        # Radio button "Todos los Procesos"
+        t = time.time()
+        try:
+            radios = driver.find_elements(By.XPATH, "//div[contains(@class, 'v-radio')]//label")
+            for r in radios:
+                if "Todos los Procesos" in r.text:
+                    log.accion("Opción: Todos los Procesos")
+                    r.click()
+                    pacer.pausa("radio")
+                    break
         except Exception as e:
-            log.error(f"Error en intento {attempt+1}: {e}")
-            if attempt == max_retries - 1:
-                raise
+            log.debug("No se pudo seleccionar radio: %s", e)
+
+        # Click en Consultar
+        consultar_btn = WebDriverWait(driver, 10).until(
+            EC.element_to_be_clickable((By.XPATH, "//button[.//span[contains(text(), 'Consultar')]]"))
+        )
+        driver.execute_script("arguments[0].click();", consultar_btn)
+        log.accion("Consultando...")
+        registrar_etapa(etapas, "consultar", t)
+
+        # Esperar resultados
+        t = time.time()
+        result_status = wait_for_results(driver, timeout=45)
+        registrar_etapa(etapas, "espera", t)
+        save_debug_info(driver, numero, "04_despues_consultar")
+
+        if result_status == 'success':
+            log.proceso("Resultados encontrados")
+            tablas = extraer_tablas(driver)
+            save_debug_info(driver, numero, "05_tabla_resultados")
+            resultado = fila_resultado(tablas)
+            if resultado is None:
+                log.debug("No se encontró la fecha en la tabla de resultados")
             else:
-                if renew_tor_circuit():
-                    log.exito("Circuito TOR renovado, reintentando...")
-                    continue
+                indice_tabla, fecha_text = resultado
+                log.debug("Tabla con %d filas", len(tablas[indice_tabla]))
+                log.proceso(f"Fecha: {fecha_text}")
+                fecha_obj = parse_fecha(fecha_text)
+                if fecha_obj is None:
+                    log.debug("No se pudo extraer fecha: %r", fecha_text)
+                elif fecha_obj >= cutoff and store is not None and store.sin_cambios(numero, fecha_obj):
+                    log.proceso("⏭️ Sin cambios desde el último escaneo")
+                    store.marcar_escaneado(numero, fecha_obj)
+                elif fecha_obj >= cutoff:
+                    log.exito("✓ DENTRO del período")
+                    t = time.time()
+                    click_fecha(driver, indice_tabla)
+                    pacer.esperar("detalle", driver, hay_actuaciones)
+                    registrar_etapa(etapas, "detalle", t)
+                    save_debug_info(driver, numero, "06_click_fecha")
+
+                    # Extraer actuaciones (una sola llamada al navegador)
+                    t = time.time()
+                    log.proceso("Extrayendo actuaciones...")
+                    encontradas = parse_actuaciones(extraer_tablas(driver), cutoff)
+                    log.debug("Encontradas %d actuaciones en el período", len(encontradas))
+                    registrar_etapa(etapas, "extraccion", t)
+
+                    # El StateStore no se toca aquí: quien llama descarta las ya vistas
+                    # y registra las filas solo cuando el intento terminó bien y
+                    # quedaron en el journal.
+                    # Sin filas no se registra nada: el próximo ciclo reintenta el detalle.
+                    if encontradas:
+                        pendiente = fecha_obj
+                    url = driver.current_url
+                    with lock:
+                        for act_fecha, act_nombre, act_anotacion in encontradas:
+                            actes.append((numero, act_fecha, act_nombre, act_anotacion, url))
+                    for act_fecha, act_nombre, _ in encontradas:
+                        log.debug("✅ %s: %.50s...", act_fecha, act_nombre)
+
+                    # Con las actuaciones ya extraídas, volver al formulario es opcional:
+                    # la próxima tarea del driver empieza cargando CONSULTA_URL
+                    t = time.time()
+                    try:
+                        driver.back()
+                        pacer.esperar(
+                            "volver", driver, EC.presence_of_element_located((By.XPATH, INPUT_XPATH))
+                        )
+                        registrar_etapa(etapas, "volver", t)
+                    except Exception as e:
+                        log.advertencia(f"No se pudo volver al formulario ({type(e).__name__}); "
+                                        f"se conservan las actuaciones")
                 else:
-                    continue
+                    log.proceso("⏭️ Fuera de período")
+                    if store is not None:
+                        store.marcar_escaneado(numero, fecha_obj)
+            pacer.resultado(True)
+
+        elif result_status == 'no_results':
+            log.proceso("No hay resultados para este proceso")
+            pacer.resultado(True)
+
+        elif result_status == 'modal':
+            log.advertencia("Modal detectado")
+            METRICAS.incrementar("modales")
+            log.evento("modal", radicacion=numero)
+            save_debug_info(driver, numero, "modal")
+            handle_modal_error(driver, numero)
+            raise FalloScraper("modal", "El sitio respondió con un modal de error")
+
+        else:
+            tipo = "mantenimiento" if is_page_maintenance(driver) else "timeout"
+            log.advertencia(f"Sin resultados a tiempo ({tipo})")
+            raise FalloScraper(tipo, "Timeout esperando resultados")
+
+    except Exception:
+        pacer.resultado(False)
+        raise
+    finally:
+        # También tras un fallo: lo que quede en el log se contaría al próximo proceso del driver
+        peticiones, recibidos, bloqueadas = drenar(driver)
 
     with lock:
-        results.append((numero, driver.current_url))
+        results.append((numero, CONSULTA_URL))
     log.exito("Proceso completado")
-    save_debug_info(driver, numero, "99_completado")
\ No newline at end of file
+    log.detalle("Tiempos por etapa: %s", ", ".join(f"{k}={v:.2f}s" for k, v in etapas.items()))
+    if peticiones:
+        log.detalle("Tráfico: %d peticiones, %.1f KB, %d bloqueadas", peticiones, recibidos / 1024, bloqueadas)
+    log.debug("Pacing: %s", pacer.resumen())
+    save_debug_info(driver, numero, "99_completado")
+    return pendiente
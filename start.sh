@@ -64,11 +64,6 @@ cleanup() {
 }
 trap cleanup EXIT
 
-# Log de IP saliente
-echo "🌐 Obteniendo IP de salida..."
-IP=$(curl -s https://api.ipify.org || echo "No disponible")
-echo "📡 IP saliente: $IP"
-
 # Ejecutar la aplicación principal
 echo "🚀 Iniciando aplicación Python..."
 echo "=========================================="
@@ -0,0 +1,10 @@
+# tests/conftest.py
+"""Configuración común: nada de red real ni servidores auxiliares en los tests."""
+import os
+
+# Antes de importar scraper.config
+os.environ.setdefault("METRICAS_PUERTO", "0")
+os.environ.setdefault("LOG_EVENTOS", "0")
+os.environ.setdefault("LOG_NIVEL", "WARNING")
+os.environ.setdefault("EMAIL_USER", "scraper@example.com")
+os.environ.setdefault("EMAIL_TO", "abogado@example.com")
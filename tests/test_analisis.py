@@ -0,0 +1,21 @@
+# tests/test_analisis.py
+"""Resumen de analisis.Corrida a partir de eventos sueltos."""
+import pytest
+
+from scraper.analisis import Corrida
+
+
+@pytest.mark.parametrize("top", [1, 5])
+def test_lentos_con_empate(top):
+    corrida = Corrida("e1", 1, top)
+    # Misma radicación y mismos segundos: el desempate no debe comparar los detalles
+    corrida.agregar({"evento": "proceso", "radicacion": "n1", "resultado": "ok", "segundos": 1.0, "ts": 10})
+    corrida.agregar({"evento": "proceso", "radicacion": "n1", "resultado": "error", "segundos": 1.0,
+                     "tipo": "red", "error": "caída", "ts": 11})
+    corrida.agregar({"evento": "proceso", "radicacion": "n2", "resultado": "ok", "segundos": 0.5, "ts": 12})
+
+    lentos = corrida.resumen(60)["lentos"]
+
+    assert len(lentos) == min(top, 3)
+    assert all(d["segundos"] == 1.0 for d in lentos[:min(top, 2)])
+    assert [d["radicacion"] for d in lentos][:min(top, 2)] == ["n1"] * min(top, 2)
@@ -0,0 +1,151 @@
+# tests/test_api_client.py
+"""ApiClient y api_worker_task contra el backend /api/v2 de mock_sitio."""
+import threading
+from datetime import date, timedelta
+
+import pytest
+
+from scraper import worker
+from scraper.api_client import ApiClient, api_worker_task, filtrar_nuevas, registrar_vistas
+from scraper.mock_sitio import Catalogo, MockSitio, POR_PAGINA
+from scraper.reintentos import FalloScraper
+from scraper.state_store import StateStore
+
+HOY = date(2026, 10, 17)
+
+
+@pytest.fixture
+def sitio_con():
+    """Levanta un MockSitio sin latencia con el catálogo dado y lo detiene al final."""
+    sitios = []
+
+    def crear(catalogo, errores=0.0):
+        sitio = MockSitio(latencia=0, errores=errores, catalogo=catalogo).iniciar()
+        sitios.append(sitio)
+        return sitio, ApiClient(base_url=f"{sitio.url}/api/v2", proxy="", timeout=5, control_port=None)
+
+    yield crear
+    for sitio in sitios:
+        sitio.detener()
+
+
+def _radicacion(catalogo, condicion):
+    """Primera radicación sintética cuyo proceso cumple la condición."""
+    for i in range(5000):
+        numero = f"11001310300120{i:09d}"
+        proceso = catalogo.proceso(numero)
+        if proceso is not None and condicion(proceso, catalogo.actuaciones_de(proceso["idProceso"])):
+            return numero, proceso
+    raise AssertionError("ninguna radicación cumple la condición")
+
+
+def test_pagina_todas_las_actuaciones(sitio_con):
+    catalogo = Catalogo(sin_resultados=0, activos=1, max_actuaciones=150, hoy=HOY)
+    sitio, cliente = sitio_con(catalogo)
+    numero, proceso = _radicacion(catalogo, lambda p, acts: len(acts) > 2 * POR_PAGINA)
+    esperadas = catalogo.actuaciones_de(proceso["idProceso"])
+
+    antes = sitio.peticiones
+    actuaciones = cliente.obtener_actuaciones(proceso["idProceso"])
+
+    assert actuaciones == esperadas
+    assert sitio.peticiones - antes == -(-len(esperadas) // POR_PAGINA)
+
+
+def test_deja_de_paginar_al_pasar_el_corte(sitio_con):
+    catalogo = Catalogo(sin_resultados=0, activos=1, max_actuaciones=150, hoy=HOY)
+    sitio, cliente = sitio_con(catalogo)
+    # La primera página ya llega a fechas anteriores al corte
+    numero, proceso = _radicacion(
+        catalogo, lambda p, acts: len(acts) > 2 * POR_PAGINA
+        and acts[POR_PAGINA - 1]["fechaActuacion"] < acts[0]["fechaActuacion"])
+    corte = date.fromisoformat(proceso["fechaUltimaActuacion"][:10])
+
+    antes = sitio.peticiones
+    actuaciones = cliente.obtener_actuaciones(proceso["idProceso"], cutoff=corte)
+
+    assert sitio.peticiones - antes == 1
+    assert len(actuaciones) == POR_PAGINA
+
+
+def test_sin_resultados(sitio_con):
+    _, cliente = sitio_con(Catalogo(sin_resultados=1, hoy=HOY))
+    assert cliente.consultar_actuaciones("11001310300120080020700", HOY - timedelta(days=3)) == \
+        ('no_results', [], None)
+
+
+def test_filtra_por_fecha_de_corte(sitio_con):
+    catalogo = Catalogo(sin_resultados=0, activos=1, max_actuaciones=60, hoy=HOY)
+    _, cliente = sitio_con(catalogo)
+    corte = HOY - timedelta(days=10)
+    numero, proceso = _radicacion(
+        catalogo, lambda p, acts: any(a["fechaActuacion"][:10] < corte.isoformat() for a in acts)
+        and any(a["fechaActuacion"][:10] >= corte.isoformat() for a in acts))
+    esperadas = [a for a in catalogo.actuaciones_de(proceso["idProceso"])
+                 if a["fechaActuacion"][:10] >= corte.isoformat()]
+
+    estado, filas, fecha_ultima = cliente.consultar_actuaciones(numero, corte)
+
+    assert estado == 'success'
+    assert fecha_ultima == date.fromisoformat(proceso["fechaUltimaActuacion"][:10])
+    assert [(f[0], f[1], f[2]) for f in filas] == \
+        [(numero, a["fechaActuacion"][:10], a["actuacion"]) for a in esperadas]
+    assert all(f[1] >= corte.isoformat() for f in filas)
+
+
+def test_proceso_fuera_de_periodo(sitio_con):
+    catalogo = Catalogo(sin_resultados=0, activos=0, dias_activo=3, hoy=HOY)
+    sitio, cliente = sitio_con(catalogo)
+    numero, _ = _radicacion(catalogo, lambda p, acts: True)
+
+    antes = sitio.peticiones
+    assert cliente.consultar_actuaciones(numero, HOY - timedelta(days=3)) == ('success', [], None)
+    # No se piden las actuaciones de un proceso sin movimiento en el período
+    assert sitio.peticiones - antes == 1
+
+
+def test_api_worker_task_reporta_actuaciones(sitio_con, monkeypatch):
+    catalogo = Catalogo(sin_resultados=0, activos=1, hoy=HOY)
+    _, cliente = sitio_con(catalogo)
+    numero, _ = _radicacion(catalogo, lambda p, acts: True)
+    monkeypatch.setattr(worker, "CUTOFF", HOY - timedelta(days=30))
+    monkeypatch.setattr(worker, "STATE_STORE", None)
+    results, actes, errors = [], [], []
+
+    api_worker_task(numero, cliente, results, actes, errors, threading.Lock())
+
+    assert [r[0] for r in results] == [numero]
+    assert actes and all(fila[0] == numero for fila in actes)
+    assert errors == []
+
+
+def test_api_error_se_clasifica_como_red(sitio_con, monkeypatch):
+    _, cliente = sitio_con(Catalogo(sin_resultados=0, hoy=HOY), errores=1.0)
+    monkeypatch.setattr(worker, "CUTOFF", HOY - timedelta(days=3))
+    results, actes = [], []
+
+    with pytest.raises(FalloScraper) as exc:
+        api_worker_task("11001310300120080020700", cliente, results, actes, [], threading.Lock())
+
+    assert exc.value.tipo == "red"
+    assert "HTTP 500" in str(exc.value)
+    assert results == [] and actes == []
+
+
+def test_filtrar_nuevas_no_marca_hasta_registrar(sitio_con, tmp_path):
+    catalogo = Catalogo(sin_resultados=0, activos=1, hoy=HOY)
+    _, cliente = sitio_con(catalogo)
+    numero, _ = _radicacion(catalogo, lambda p, acts: True)
+    store = StateStore(str(tmp_path / "estado.db"))
+    try:
+        _, filas, fecha_ultima = cliente.consultar_actuaciones(numero, HOY - timedelta(days=30), store)
+        assert filas and fecha_ultima is not None
+
+        # Sin registrar (p. ej. una caída antes del journal), siguen siendo nuevas
+        assert filtrar_nuevas(store, numero, filas) == filas
+        assert filtrar_nuevas(store, numero, filas) == filas
+
+        registrar_vistas(store, numero, fecha_ultima, filas)
+        assert filtrar_nuevas(store, numero, filas) == []
+    finally:
+        store.close()
@@ -0,0 +1,82 @@
+# tests/test_async_engine.py
+"""Reintentos de async_engine._procesar con un cliente falso (sin red)."""
+import asyncio
+from datetime import date
+
+import pytest
+
+from scraper import async_engine
+from scraper.reintentos import Presupuesto
+
+HOY = date(2026, 10, 17)
+
+
+class _Circuito:
+    nombre = "circ-0"
+
+
+class _Cliente:
+    """Responde a cada intento con lo siguiente del guion: una excepción o filas."""
+
+    def __init__(self, guion):
+        self.guion = list(guion)
+
+    def siguiente_circuito(self):
+        return _Circuito()
+
+    async def consultar_actuaciones(self, circuito, numero, cutoff, store=None):
+        paso = self.guion.pop(0)
+        if isinstance(paso, BaseException):
+            raise paso
+        return 'success', paso, None
+
+
+@pytest.fixture
+def sin_espera(monkeypatch):
+    monkeypatch.setattr(async_engine, "espera", lambda intento, politica: 0.05)
+
+
+def _correr(cliente, limite_cupos=1, aplazados=None, antes=None):
+    results, actes, errors = [], [], []
+
+    async def principal():
+        limite = asyncio.Semaphore(limite_cupos)
+        tareas = [async_engine._procesar(cliente, "n1", HOY, None, None, limite, Presupuesto(10),
+                                         aplazados, results, actes, errors)]
+        if antes is not None:
+            tareas.append(antes(limite))
+        await asyncio.gather(*tareas)
+
+    asyncio.run(principal())
+    return results, actes, errors
+
+
+def test_error_inesperado_se_reintenta(sin_espera):
+    fila = ("n1", "2026-10-16", "Auto", "", "url")
+    # AttributeError: p. ej. un cuerpo JSON que no es un objeto
+    results, actes, errors = _correr(_Cliente([AttributeError("'list' object has no attribute 'get'"), [fila]]))
+
+    assert [r[0] for r in results] == ["n1"]
+    assert actes == [fila]
+    assert errors == []
+
+
+def test_error_inesperado_agotado_no_aborta(sin_espera):
+    results, actes, errors = _correr(_Cliente([AttributeError("x")] * 5))
+
+    assert results == [] and actes == []
+    assert errors and errors[0][0] == "n1" and errors[0][1].startswith("[desconocido]")
+
+
+def test_backoff_libera_el_cupo(sin_espera):
+    cupo_libre = []
+
+    async def vecino(limite):
+        # Mientras n1 espera su reintento, otra tarea debe poder tomar el único cupo
+        await asyncio.sleep(0.02)
+        cupo_libre.append(not limite.locked())
+
+    results, _, _ = _correr(_Cliente([ConnectionError("caída"), []]), antes=vecino)
+
+    assert cupo_libre == [True]
+    assert [r[0] for r in results] == ["n1"]
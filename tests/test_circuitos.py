@@ -0,0 +1,63 @@
+# tests/test_circuitos.py
+"""Atribución de consultas a salidas en GestorCircuitos (eventos STREAM simulados)."""
+from types import SimpleNamespace
+
+import pytest
+
+from scraper import circuitos
+from scraper.circuitos import GestorCircuitos
+
+
+class _Controller:
+    """Solo lo que usa _al_stream: circuitos por id con su salida y usuario SOCKS."""
+
+    def __init__(self):
+        self.circuitos = {}
+
+    def get_circuit(self, circ_id):
+        return self.circuitos[circ_id]
+
+
+@pytest.fixture
+def gestor(monkeypatch):
+    g = GestorCircuitos(control_port=1)
+    g._controller = _Controller()
+    monkeypatch.setattr(g, "_conectar", lambda: g._controller)
+    return g
+
+
+def _stream(gestor, circ_id, salida, usuario=None):
+    gestor._controller.circuitos[circ_id] = SimpleNamespace(path=[(salida, salida.lower())],
+                                                            socks_username=usuario)
+    gestor._al_stream(SimpleNamespace(status="SUCCEEDED", circ_id=circ_id,
+                                      target_address=circuitos.HOST_OBJETIVO))
+
+
+def test_cada_credencial_se_atribuye_a_su_salida(gestor):
+    a, b = gestor.consulta("w1"), gestor.consulta("w2")
+    _stream(gestor, "1", "SALIDA_A", "w1")
+    _stream(gestor, "2", "SALIDA_B", "w2")
+
+    assert gestor.salida(a) == "salida_a"
+    gestor.registrar(a, True, 1.0)
+    gestor.registrar(b, False)
+
+    assert gestor.salidas["SALIDA_A"].muestras == 1 and gestor.salidas["SALIDA_A"].fallos == 0
+    assert gestor.salidas["SALIDA_B"].muestras == 1 and gestor.salidas["SALIDA_B"].fallos > 0
+
+
+def test_sin_credencial_compartida_no_puntua(gestor):
+    a, b = gestor.consulta(), gestor.consulta()
+    _stream(gestor, "1", "SALIDA_A")
+    _stream(gestor, "2", "SALIDA_B")
+
+    assert gestor.salida(a) is None
+    gestor.registrar(a, True, 1.0)
+    gestor.registrar(b, True, 1.0)
+    assert all(s.muestras == 0 for s in gestor.salidas.values())
+
+    # Ya sola en la instancia, la consulta sin credencial vuelve a puntuar
+    c = gestor.consulta()
+    _stream(gestor, "3", "SALIDA_C")
+    gestor.registrar(c, True, 1.0)
+    assert gestor.salidas["SALIDA_C"].muestras == 1
@@ -0,0 +1,103 @@
+# tests/test_coordinacion.py
+"""Varios procesos (nodos) sobre un mismo directorio de coordinación."""
+import multiprocessing
+import os
+
+import pytest
+
+from scraper import coordinacion
+from scraper.coordinacion import ColaNodo, nueva_cola
+
+CICLO = "2026-10-17"
+META = {"cutoff": "2026-10-14"}
+PROCESOS = [f"1100131030012020{i:07d}" for i in range(40)]
+
+# spawn: los nodos no heredan hilos ni conexiones SQLite del proceso de pytest
+ctx = multiprocessing.get_context("spawn")
+
+
+def _fila(numero):
+    return (numero, "2026-10-16", "Auto resuelve solicitud", "", "http://local")
+
+
+def _nodo(backend, directorio, nodo, lease, salida):
+    """Un nodo completo: publica, procesa hasta que no quede nada y compite por el cierre."""
+    coordinacion.ESPERA_OTROS = 0.05
+    cola = nueva_cola(backend, directorio)
+    cola.publicar(CICLO, PROCESOS, META)
+    vista = ColaNodo(cola, CICLO, nodo=nodo, lote=3, lease=lease)
+    tomados = []
+    while (numero := vista.get()) is not None:
+        tomados.append(numero)
+        vista.registrar(numero, [_fila(numero)])
+    vista.cerrar()
+    gano = cola.reclamar_cierre(CICLO, nodo)
+    actes = cola.resultados(CICLO)[0] if gano else None
+    cola.close()
+    salida.put((nodo, tomados, gano, actes))
+
+
+def _nodo_caido(backend, directorio, nodo, lease, salida):
+    """Toma un lote y muere sin completarlo ni liberar los leases."""
+    cola = nueva_cola(backend, directorio)
+    cola.publicar(CICLO, PROCESOS, META)
+    salida.put((nodo, cola.tomar(CICLO, nodo, 5, lease)))
+    # La cola envía desde un hilo propio: vaciarla antes de morir de golpe
+    salida.close()
+    salida.join_thread()
+    os._exit(1)
+
+
+def _lanzar(objetivo, backend, directorio, nodos, lease):
+    salida = ctx.Queue()
+    procesos = [ctx.Process(target=objetivo, args=(backend, directorio, nodo, lease, salida))
+                for nodo in nodos]
+    for p in procesos:
+        p.start()
+    resultados = [salida.get(timeout=120) for _ in procesos]
+    for p in procesos:
+        p.join(timeout=30)
+    return resultados
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "archivos"])
+def test_cada_radicacion_se_toma_una_vez(backend, tmp_path):
+    resultados = _lanzar(_nodo, backend, str(tmp_path), [f"nodo-{i}" for i in range(4)], lease=30)
+
+    tomados = [numero for _, nums, _, _ in resultados for numero in nums]
+    assert sorted(tomados) == sorted(PROCESOS)
+
+    ganadores = [r for r in resultados if r[2]]
+    assert len(ganadores) == 1
+    # El que cierra ve los resultados de todos los nodos, en el orden del plan
+    assert ganadores[0][3] == [_fila(numero) for numero in PROCESOS]
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "archivos"])
+def test_lease_vencido_se_retoma(backend, tmp_path):
+    [(_, perdidos)] = _lanzar(_nodo_caido, backend, str(tmp_path), ["caido"], lease=1)
+    assert len(perdidos) == 5
+
+    [(_, tomados, gano, actes)] = _lanzar(_nodo, backend, str(tmp_path), ["sobreviviente"], lease=1)
+
+    assert set(perdidos) <= set(tomados)
+    assert sorted(tomados) == sorted(PROCESOS)
+    assert gano
+    assert actes == [_fila(numero) for numero in PROCESOS]
+
+
+def test_marca_de_publicacion_vencida_se_retoma(tmp_path):
+    # Un publicador murió tras crear la marca y algunos pendientes, sin escribir el meta
+    cola = coordinacion.ColaArchivos(str(tmp_path))
+    marca = cola._dir(CICLO, "publicando")
+    os.makedirs(cola._dir(CICLO, "pendiente"))
+    open(marca, "w").close()
+    open(os.path.join(cola._dir(CICLO, "pendiente"), "00_restos"), "w").close()
+    viejo = os.path.getmtime(marca) - coordinacion.ESPERA_PUBLICACION - 60
+    os.utime(marca, (viejo, viejo))
+
+    resultados = _lanzar(_nodo, "archivos", str(tmp_path), [f"nodo-{i}" for i in range(3)], lease=30)
+
+    tomados = [numero for _, nums, _, _ in resultados for numero in nums]
+    assert sorted(tomados) == sorted(PROCESOS)
+    assert sum(1 for r in resultados if r[2]) == 1
@@ -0,0 +1,66 @@
+# tests/test_entregas.py
+"""Registro de entregas: cada actuación llega una sola vez, aunque un envío falle."""
+from datetime import date
+
+import pytest
+
+from scraper.entregas import Entregas
+
+URL = "http://local/Procesos/NumeroRadicacion"
+
+
+def _acte(numero, fecha, actuacion, anotacion=""):
+    return (numero, fecha, actuacion, anotacion, URL)
+
+
+CICLO_1 = [
+    _acte("11001310300120080020700", "2026-10-15", "Al despacho"),
+    _acte("11001310300120080020700", "2026-10-16", "Auto resuelve solicitud"),
+    _acte("08296408900120190029100", "2026-10-16", "Fijacion estado", "Actuación registrada."),
+]
+
+
+@pytest.fixture
+def entregas(tmp_path):
+    registro = Entregas(str(tmp_path / "entregas.db"))
+    yield registro
+    registro.close()
+
+
+def test_no_reenvia_lo_entregado(entregas):
+    filas, omitidas = entregas.pendientes(CICLO_1)
+    assert sorted(filas) == sorted(CICLO_1)
+    assert omitidas == 0
+    entregas.marcar(filas)
+
+    nueva = _acte("08296408900120190029100", "2026-10-17", "Recepción memorial")
+    filas, omitidas = entregas.pendientes(CICLO_1 + [nueva])
+
+    assert filas == [nueva]
+    assert omitidas == len(CICLO_1)
+
+
+def test_reenvia_tras_un_envio_fallido(entregas):
+    filas, _ = entregas.pendientes(CICLO_1)
+    # El correo falló: no se marca nada
+
+    nueva = _acte("11001310300120080020700", "2026-10-17", "Constancia secretarial")
+    filas, omitidas = entregas.pendientes([nueva])
+
+    assert sorted(filas) == sorted(CICLO_1 + [nueva])
+    assert omitidas == 0
+
+
+def test_pendientes_ordenadas_por_radicacion(entregas):
+    filas, _ = entregas.pendientes(CICLO_1)
+    assert [f[0] for f in filas] == sorted(f[0] for f in CICLO_1)
+
+
+def test_purgar(entregas):
+    entregas.marcar(entregas.pendientes(CICLO_1)[0])
+    assert entregas.purgar(date(2026, 10, 16)) == 1
+
+    # Lo purgado vuelve a contar como no entregado
+    filas, omitidas = entregas.pendientes(CICLO_1)
+    assert filas == [CICLO_1[0]]
+    assert omitidas == 2
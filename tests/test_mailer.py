@@ -0,0 +1,238 @@
+# tests/test_mailer.py
+"""Entrega del reporte contra el servidor SMTP local (mock_smtp)."""
+import os
+import random
+import smtplib
+import zipfile
+from email.message import EmailMessage
+
+import pytest
+from pypdf import PdfReader
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+from scraper import mailer
+from scraper.entregas import Entregas
+from scraper.mailer import ConexionSMTP, enviar_reporte, preparar_adjuntos
+from scraper.reporter import generar_pdf
+from scraper.mock_smtp import MockSMTP
+
+RESUMEN = {"nuevas": 3, "procesos": 2, "omitidas": 0, "errores": 0}
+
+
+@pytest.fixture
+def smtp():
+    """Fábrica de servidores MockSMTP; todos se detienen al final."""
+    servidores = []
+
+    def crear(**kwargs):
+        servidor = MockSMTP(**kwargs).iniciar()
+        servidores.append(servidor)
+        return servidor
+
+    yield crear
+    for servidor in servidores:
+        servidor.detener()
+
+
+@pytest.fixture
+def pausas(monkeypatch):
+    """Registra las pausas entre reintentos en lugar de dormir."""
+    registro = []
+    monkeypatch.setattr(mailer.time, "sleep", registro.append)
+    return registro
+
+
+def _conexion(servidor, **kwargs):
+    return ConexionSMTP(host="127.0.0.1", port=servidor.puerto, ssl=False, usuario="u", clave="c",
+                        timeout=10, **kwargs)
+
+
+def _mensaje(asunto, relleno=""):
+    msg = EmailMessage()
+    msg["Subject"] = asunto
+    msg["From"] = "scraper@example.com"
+    msg["To"] = "abogado@example.com"
+    msg.set_content("cuerpo\n" + relleno)
+    return msg
+
+
+def _pdf(ruta, paginas, compresible):
+    """PDF sin compresión interna: texto repetido (compresible) o aleatorio (no)."""
+    rng = random.Random(7)
+    c = canvas.Canvas(str(ruta), pagesize=A4, pageCompression=0)
+    for _ in range(paginas):
+        for y in range(40, 800, 12):
+            if compresible:
+                texto = "Auto resuelve solicitud 11001310300120080020700 " * 2
+            else:
+                texto = "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789") for _ in range(90))
+            c.drawString(20, y, texto)
+        c.showPage()
+    c.save()
+    return str(ruta)
+
+
+# ========== CONEXIÓN ==========
+
+def test_reutiliza_una_conexion(smtp):
+    servidor = smtp()
+    with _conexion(servidor) as conexion:
+        for i in range(3):
+            conexion.enviar(_mensaje(f"Parte {i}"))
+
+    assert servidor.conexiones == 1
+    assert [m["Subject"] for m in servidor.mensajes] == ["Parte 0", "Parte 1", "Parte 2"]
+
+
+def test_reintenta_tras_421(smtp, pausas):
+    servidor = smtp(fallos=1)
+    with _conexion(servidor, intentos=3) as conexion:
+        conexion.enviar(_mensaje("Reporte"))
+
+    assert servidor.conexiones == 2
+    assert len(pausas) == 1
+    assert len(servidor.mensajes) == 1
+
+
+def test_5xx_falla_sin_reintentar(smtp, pausas):
+    servidor = smtp(max_mb=0.01)
+    with _conexion(servidor, intentos=3) as conexion:
+        with pytest.raises(smtplib.SMTPDataError) as exc:
+            conexion.enviar(_mensaje("Reporte", relleno="x" * 20_000))
+
+    assert exc.value.smtp_code == 552
+    assert servidor.conexiones == 1
+    assert pausas == []
+    assert servidor.mensajes == []
+
+
+# ========== ADJUNTOS ==========
+
+def test_pdf_que_cabe_va_tal_cual(tmp_path):
+    ruta = _pdf(tmp_path / "reporte.pdf", 2, compresible=True)
+    assert preparar_adjuntos(ruta, limite=os.path.getsize(ruta)) == [ruta]
+
+
+def test_comprime_si_no_cabe(tmp_path):
+    ruta = _pdf(tmp_path / "reporte.pdf", 20, compresible=True)
+    limite = os.path.getsize(ruta) // 3
+
+    [adjunto] = preparar_adjuntos(ruta, limite=limite)
+
+    assert adjunto.endswith(".zip")
+    assert os.path.getsize(adjunto) <= limite
+    with zipfile.ZipFile(adjunto) as z:
+        assert z.namelist() == ["reporte.pdf"]
+
+
+def test_divide_si_ni_comprimido_cabe(tmp_path):
+    ruta = _pdf(tmp_path / "reporte.pdf", 12, compresible=False)
+    limite = os.path.getsize(ruta) // 4
+
+    partes = preparar_adjuntos(ruta, limite=limite)
+
+    assert len(partes) > 1
+    assert all(os.path.getsize(p) <= limite for p in partes)
+    paginas = sum(len(PdfReader(p).pages) for p in partes if p.endswith(".pdf"))
+    assert paginas == 12
+
+
+# ========== REPORTE ==========
+
+def test_reporte_dividido_en_una_conexion(smtp, tmp_path, monkeypatch):
+    servidor = smtp()
+    ruta = _pdf(tmp_path / "reporte.pdf", 12, compresible=False)
+    monkeypatch.setattr(mailer, "limite_adjunto", lambda: os.path.getsize(ruta) // 4)
+
+    with _conexion(servidor) as conexion:
+        assert enviar_reporte(RESUMEN, ruta=ruta, conexion=conexion)
+
+    n = len(servidor.mensajes)
+    assert n > 1 and servidor.conexiones == 1
+    assert [m["Subject"].rsplit("(", 1)[1] for m in servidor.mensajes] == \
+        [f"parte {i}/{n})" for i in range(1, n + 1)]
+    # Las partes temporales se borran; el PDF original queda
+    assert os.listdir(tmp_path) == ["reporte.pdf"]
+
+
+def test_sin_novedades_no_adjunta(smtp, tmp_path):
+    servidor = smtp()
+    ruta = _pdf(tmp_path / "reporte.pdf", 1, compresible=True)
+
+    with _conexion(servidor) as conexion:
+        assert enviar_reporte(dict(RESUMEN, nuevas=0), ruta=ruta, conexion=conexion)
+
+    [msg] = servidor.mensajes
+    assert not list(msg.iter_attachments())
+
+
+def test_envio_fallido_se_reenvia_en_el_proximo_ciclo(smtp, tmp_path):
+    """El flujo de main._cerrar_ciclo: solo se marca lo entregado si el correo salió."""
+    entregas = Entregas(str(tmp_path / "entregas.db"))
+    actes = [("11001310300120080020700", "2026-10-16", "Auto resuelve solicitud", "", "http://local")]
+    ruta = _pdf(tmp_path / "reporte.pdf", 30, compresible=False)
+
+    # El servidor rechaza el mensaje (552): no se marca
+    rechaza = smtp(max_mb=0.01)
+    filas, _ = entregas.pendientes(actes)
+    with _conexion(rechaza) as conexion:
+        assert not enviar_reporte(RESUMEN, ruta=ruta, conexion=conexion)
+
+    # Próximo ciclo, sin actuaciones nuevas en el sitio: la pendiente vuelve a salir
+    acepta = smtp()
+    filas, omitidas = entregas.pendientes([])
+    assert filas == actes and omitidas == 0
+    with _conexion(acepta) as conexion:
+        assert enviar_reporte(RESUMEN, ruta=ruta, conexion=conexion)
+    entregas.marcar(filas)
+
+    assert entregas.pendientes(actes) == ([], 1)
+    entregas.close()
+
+
+class _CortaTras:
+    """Conexión que entrega los primeros `n` correos y luego falla."""
+
+    def __init__(self, n):
+        self.n = n
+        self.mensajes = []
+
+    def enviar(self, msg):
+        if len(self.mensajes) >= self.n:
+            raise smtplib.SMTPServerDisconnected("conexión perdida")
+        self.mensajes.append(msg)
+
+
+def test_envio_cortado_informa_lo_entregado(tmp_path, monkeypatch):
+    rng = random.Random(7)
+    # Anotaciones aleatorias: el ZIP no alcanza y el reporte se divide
+    actes = [(f"1100131030012008{i:07d}", "2026-10-16", "Auto resuelve solicitud",
+              " ".join("".join(rng.choice("abcdefghij") for _ in range(8)) for _ in range(60)), "u")
+             for i in range(30) for _ in range(5)]
+    ruta = str(tmp_path / "reporte.pdf")
+    generar_pdf(30, actes, [], 0.0, 1.0, ruta=ruta, paralelo=1)
+    monkeypatch.setattr(mailer, "limite_adjunto", lambda: os.path.getsize(ruta) // 4)
+
+    paginas = []
+    original = mailer.radicaciones_hasta
+    monkeypatch.setattr(mailer, "radicaciones_hasta", lambda r, n: paginas.append(n) or original(r, n))
+    entregadas = []
+
+    assert not enviar_reporte(RESUMEN, ruta=ruta, conexion=_CortaTras(2), entregadas=entregadas)
+
+    # Salieron dos partes: las radicaciones que empiezan y terminan en ellas, en orden
+    numeros = sorted({fila[0] for fila in actes})
+    assert 0 < len(entregadas) < len(numeros)
+    assert entregadas == numeros[:len(entregadas)]
+    # La siguiente ya empezaba en las páginas enviadas: la última entregada terminó antes
+    enviadas = "".join(p.extract_text() for p in PdfReader(ruta).pages[:paginas[0]])
+    assert f"Radicación {numeros[len(entregadas)]}" in enviadas
+
+
+def test_envio_fallido_sin_partes_no_informa(tmp_path):
+    ruta = _pdf(tmp_path / "reporte.pdf", 2, compresible=True)
+    entregadas = []
+
+    assert not enviar_reporte(RESUMEN, ruta=ruta, conexion=_CortaTras(0), entregadas=entregadas)
+    assert entregadas == []